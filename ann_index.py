@@ -0,0 +1,255 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(__file__)
+
+INDEX_PATH = os.path.join(BASE_DIR, "abstract_similarity_datasets/abstract_ann_index.npz")
+
+# Below this many vectors a single list is used, i.e. queries are exact
+MIN_TRAINING_SIZE = 1000
+
+# Lists are retrained once the index has grown by this factor since the last training
+RETRAIN_GROWTH = 4
+
+# Lists searched per query, more lists raise recall at the cost of more candidates
+DEFAULT_PROBES = 8
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def spherical_kmeans(unit_vectors:np.ndarray, n_clusters:int, iterations:int = 10, seed:int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity, returns the unit-length centroids."""
+    # Only needed for training, so the app can load and query an index without scipy
+    from scipy import sparse
+
+    rng = np.random.default_rng(seed)
+    centroids = unit_vectors[rng.choice(len(unit_vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(unit_vectors @ centroids.T, axis=1)
+        members = sparse.csr_matrix((np.ones(len(assignment), dtype=np.float32), (assignment, np.arange(len(assignment)))),
+                                    shape=(n_clusters, len(unit_vectors)))
+        sums = np.asarray(members @ unit_vectors)
+        # Empty clusters keep their previous centroid
+        filled = np.asarray(members.sum(axis=1)).ravel() > 0
+        centroids[filled] = _normalize(sums[filled])
+    return centroids
+
+
+class IVFIndex:
+    """Approximate cosine nearest neighbours with an inverted file over k-means lists.
+
+    The vectors are split into about 4 * sqrt(N) lists around spherical k-means centroids. A query
+    only ranks the vectors of the n_probe lists whose centroids are closest to it, by their exact
+    cosine similarity. New vectors are appended to their closest list, the lists are retrained
+    when the index has grown considerably since the last training.
+    """
+
+    def __init__(self, dim:int, seed:int = 0):
+        self.dim = dim
+        self.seed = seed
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.ids = []
+        self.position = {}
+        self.deleted = np.zeros(0, dtype=bool)
+        self.centroids = np.zeros((1, dim), dtype=np.float32)
+        self.assignment = np.zeros(0, dtype=np.int64)
+        self.lists = [[]]
+        self.trained_size = 0
+
+    def __len__(self):
+        return len(self.position)
+
+    def __contains__(self, item_id):
+        return item_id in self.position
+
+    def _assign(self, unit_vectors:np.ndarray) -> np.ndarray:
+        if len(self.centroids) == 1:
+            return np.zeros(len(unit_vectors), dtype=np.int64)
+        return np.argmax(unit_vectors @ self.centroids.T, axis=1)
+
+    def _rebuild_lists(self):
+        self.lists = [[] for _ in range(len(self.centroids))]
+        for position in np.flatnonzero(~self.deleted):
+            self.lists[self.assignment[position]].append(int(position))
+
+    def train(self):
+        """Recompute the lists from the current vectors."""
+        live = np.flatnonzero(~self.deleted)
+        self.trained_size = len(live)
+        if len(live) < MIN_TRAINING_SIZE:
+            self.centroids = np.zeros((1, self.dim), dtype=np.float32)
+        else:
+            n_lists = int(4 * np.sqrt(len(live)))
+            # A sample of about 32 vectors per list is enough to place the centroids
+            sample = np.random.default_rng(self.seed).choice(live, min(len(live), 32 * n_lists), replace=False)
+            self.centroids = spherical_kmeans(self.vectors[sample], n_lists, seed=self.seed)
+        self.assignment = self._assign(self.vectors)
+        self._rebuild_lists()
+
+    def add(self, ids:list, vectors):
+        """Insert vectors, an ID that is already indexed is replaced (e.g. after its abstract changed)."""
+        unit_vectors = _normalize(vectors)
+        if unit_vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {unit_vectors.shape[1]}")
+        self.remove([item_id for item_id in ids if item_id in self.position])
+
+        first_position = len(self.ids)
+        assignment = self._assign(unit_vectors)
+        self.vectors = np.vstack([self.vectors, unit_vectors])
+        self.assignment = np.concatenate([self.assignment, assignment])
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(ids), dtype=bool)])
+        for offset, item_id in enumerate(ids):
+            self.ids.append(item_id)
+            self.position[item_id] = first_position + offset
+            self.lists[assignment[offset]].append(first_position + offset)
+
+        if len(self) >= max(MIN_TRAINING_SIZE, RETRAIN_GROWTH * self.trained_size):
+            self.train()
+
+    def remove(self, ids:list):
+        # Positions are only marked as deleted, queries skip them and save() drops them
+        for item_id in ids:
+            position = self.position.pop(item_id, None)
+            if position is not None:
+                self.deleted[position] = True
+                self.lists[self.assignment[position]].remove(position)
+
+    def query(self, vector, k:int = 10, n_probe:int = DEFAULT_PROBES, exclude_id=None) -> list:
+        """Return up to k (id, cosine similarity) pairs of the most similar indexed vectors, best first."""
+        unit_vector = _normalize(vector)[0]
+        probed = np.argsort(-(self.centroids @ unit_vector), kind="stable")[:n_probe]
+        candidates = np.fromiter((p for list_id in probed for p in self.lists[list_id]), dtype=np.int64)
+        if exclude_id is not None and exclude_id in self.position:
+            candidates = candidates[candidates != self.position[exclude_id]]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.vectors[candidates] @ unit_vector
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in best]
+
+    def query_id(self, item_id, k:int = 10, n_probe:int = DEFAULT_PROBES) -> list:
+        """Neighbours of an indexed item, without the item itself."""
+        return self.query(self.vectors[self.position[item_id]], k, n_probe, exclude_id=item_id)
+
+    def save(self, path:str = INDEX_PATH):
+        live = np.flatnonzero(~self.deleted)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, vectors=self.vectors[live], assignment=self.assignment[live], centroids=self.centroids,
+                            ids=np.asarray([self.ids[i] for i in live], dtype=np.int64),
+                            meta=np.asarray([self.dim, self.seed, self.trained_size]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path:str = INDEX_PATH):
+        with np.load(path) as data:
+            dim, seed, trained_size = (int(v) for v in data['meta'])
+            index = cls(dim, seed)
+            index.vectors = data['vectors']
+            index.assignment = data['assignment']
+            index.centroids = data['centroids']
+            index.ids = [int(i) for i in data['ids']]
+        index.trained_size = trained_size
+        index.position = {item_id: position for position, item_id in enumerate(index.ids)}
+        index.deleted = np.zeros(len(index.ids), dtype=bool)
+        index._rebuild_lists()
+        return index
+
+
+def update_index(index:IVFIndex, ids:list, vectors) -> tuple:
+    """Bring the index in line with the given items, only new or changed vectors are inserted again.
+
+    Returns the number of (inserted or replaced, removed) items.
+    """
+    unit_vectors = _normalize(vectors) if len(ids) else np.zeros((0, index.dim), dtype=np.float32)
+    changed = [i for i, item_id in enumerate(ids)
+               if item_id not in index or not np.allclose(index.vectors[index.position[item_id]], unit_vectors[i], atol=1e-6)]
+    wanted = set(ids)
+    removed = [item_id for item_id in list(index.position) if item_id not in wanted]
+
+    index.remove(removed)
+    if changed:
+        index.add([ids[i] for i in changed], unit_vectors[changed])
+    return len(changed), len(removed)
+
+
+## RECALL BENCHMARK
+
+def recall_benchmark(vectors, k:int = 10, n_queries:int = 200, n_probe:int = DEFAULT_PROBES, seed:int = 0) -> dict:
+    """Compare index queries against the exact neighbours of sklearn's cosine_similarity."""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    ids = list(range(len(vectors)))
+    query_ids = np.random.default_rng(seed).choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+
+    start = time.perf_counter()
+    index = IVFIndex(vectors.shape[1], seed)
+    index.add(ids, vectors)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    approximate = [[item_id for item_id, _ in index.query_id(int(q), k, n_probe)] for q in query_ids]
+    query_seconds = time.perf_counter() - start
+
+    # One query at a time, like a request to the app
+    start = time.perf_counter()
+    exact_similarity = np.vstack([cosine_similarity(vectors[[q]], vectors) for q in query_ids])
+    exact_seconds = time.perf_counter() - start
+    exact_similarity[np.arange(len(query_ids)), query_ids] = -np.inf
+    exact = np.argsort(-exact_similarity, axis=1)[:, :k]
+
+    hits = sum(len(set(a) & set(e.tolist())) for a, e in zip(approximate, exact))
+    probed = np.argsort(-(index.vectors[[index.position[int(q)] for q in query_ids]] @ index.centroids.T), axis=1)[:, :n_probe]
+    candidates = np.mean([sum(len(index.lists[list_id]) for list_id in row) for row in probed])
+    return {
+        'n': len(vectors),
+        'lists': len(index.centroids),
+        'recall': hits / (len(query_ids) * k),
+        'mean_candidates': float(candidates),
+        'build_seconds': build_seconds,
+        'query_ms': 1000 * query_seconds / len(query_ids),
+        'exact_query_ms': 1000 * exact_seconds / len(query_ids),
+    }
+
+
+def clustered_vectors(n:int, dim:int, n_clusters:int = 50, spread:float = 0.5, seed:int = 0) -> np.ndarray:
+    # Synthetic stand-in for abstract embeddings, which form topical clusters rather than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    return (centers[rng.integers(n_clusters, size=n)] + spread * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the recall of the abstract ANN index against exact cosine similarity.")
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark on this many synthetic clustered vectors instead of the stored embeddings")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=DEFAULT_PROBES, help="lists searched per query")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = clustered_vectors(args.synthetic, args.dim)
+    else:
+        from update_similarity_matrices_and_author_connections import read_embeddings
+        vectors = np.array(read_embeddings()['Gemini-Embedding'].tolist(), dtype=np.float32)
+        if len(vectors) == 0:
+            raise SystemExit("No stored embeddings found, run the embeddings stage or use --synthetic")
+
+    result = recall_benchmark(vectors, args.k, args.queries, args.probes)
+    print(f"{result['n']} vectors in {result['lists']} lists, {args.probes} probed per query")
+    print(f"recall@{args.k}: {result['recall']:.3f} ({result['mean_candidates']:.0f} candidates per query)")
+    print(f"build: {result['build_seconds']:.2f} s, query: {result['query_ms']:.2f} ms, exact query: {result['exact_query_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
-from flask import Flask, render_template, request, jsonify, url_for, redirect
+from flask import Flask, render_template, request, jsonify, url_for, redirect, make_response, copy_current_request_context
 from flask_mailman import Mail, EmailMessage
 from typing import List
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
+import hashlib
 import json
 import os
 
+from ann_index import IVFIndex
+from dataset_snapshot import SnapshotManager
+from insights import VENUES_PATH, compute_insights
+from offload import DEFAULT_MAX_PENDING, DEFAULT_WORKERS, OffloadPool, PoolBusy
+from search_index import SearchIndex
+from similarity_blend import BlendedSimilarity, LRUCache, load_blended_similarity, subset_key
+from study_store import load_study_store
+
 # Categories that should not be filtered for
 EXCLUDED_SIDEBAR_CATEGORIES = ['ID', 'Abstract', 'Study Link', 'Title', 'Authors']
 
@@ -47,6 +57,35 @@ START_CATEGORY_FILTERS = json.dumps(["INFO", "Main Author", "Year", "Location",
 # Categories whose explanations should be formatted in a special way
 SPECIAL_FORMAT_EXPLANATIONS = ["Interaction_PANEL_Discreetness of Interaction Techniques", "Interaction_PANEL_Social Acceptability of Interaction Techniques", "Interaction_PANEL_Accuracy of Interaction Recognition", "Interaction_PANEL_Robustness of Interaction Detection", "Motivations_PANEL_Motivations"]
 
+# Input files of the views, the app reloads its data in the background when one of them changes
+WATCHED_FILES = [
+    'data.csv',
+    'explanations.csv',
+    'abstract_similarity_datasets/normalized_abstract_similarity.csv',
+    'abstract_similarity_datasets/abstract_ann_index.npz',
+    'database_similarity_datasets/normalized_database_similarity.csv',
+    'interconnections_datasets/citation_metrics.csv',
+    # The venues export that the insights read, relative like the other entries
+    os.path.relpath(VENUES_PATH, os.path.dirname(os.path.abspath(__file__))),
+]
+
+# Pages kept per dataset version, they only depend on the snapshot
+PAGE_CACHE_SIZE = 8
+
+# Serialized similarity responses kept per dataset version, cache hits skip the offload pool
+RESPONSE_CACHE_SIZE = 64
+
+def code_version():
+    # Part of the ETags, so pages rendered by an older version of the code are not reused after a deploy
+    digest = hashlib.sha256()
+    base_dir = os.path.dirname(__file__)
+    for name in ["app.py"] + sorted(os.path.join("templates", t) for t in os.listdir(os.path.join(base_dir, "templates"))):
+        with open(os.path.join(base_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+CODE_VERSION = code_version()
+
 app = Flask(__name__)
 
 load_dotenv() # Load environment variables from .env file
@@ -64,6 +103,10 @@ print(f"Default sender: {os.getenv('MAIL_DEFAULT_SENDER')}")
 
 mail = Mail(app)
 
+# Pages and similarity responses are computed on a few threads, so a burst of them does not slow down the cheap
+# routes; OFFLOAD_WORKERS=0 computes them in the request thread
+offload_pool = OffloadPool(int(os.getenv("OFFLOAD_WORKERS", DEFAULT_WORKERS)), int(os.getenv("OFFLOAD_MAX_PENDING", DEFAULT_MAX_PENDING)))
+
 # Template classes for sidebar panel
 class Slider:
     def __init__(self, value:str, min_value:int, max_value:int, explanation:str = None):
@@ -100,32 +143,22 @@ def filter_categories(data):
     # Filter out categories that should not be filtered for
     return [category for category in data[0].keys() if category not in EXCLUDED_SIDEBAR_CATEGORIES]
 
-def load_data():
-    # Load data from CSV file into data variable
+def load_store():
+    # Read-only, the committed study_store.npz is only rewritten by the update script
     try:
-        csv_path = os.path.join(os.path.dirname(__file__), "data.csv")
-        df = pd.read_csv(csv_path)
-        df = df.fillna('N/A')  # Replace actual NaN values
-        df = df.replace('nan', 'N/A')  # Replace string 'nan' values
-        data = df.to_dict(orient="records")
+        return load_study_store(os.path.join(os.path.dirname(__file__), "data.csv"))
     except FileNotFoundError:
-        return "data.csv file not found"
+        raise ValueError("data.csv file not found")
     except pd.errors.EmptyDataError:
-        return "data.csv file is empty"
-    except Exception as e:
-        return f"Error loading data.csv: {e}"
-    
-    # delete the 'Abstract' column from the data
-    for data_entry in data:
-        if 'Abstract' in data_entry:
-            del data_entry['Abstract']
+        raise ValueError("data.csv file is empty")
 
-    # delete the 'Title' column from the data
-    for data_entry in data:
-        if 'Title' in data_entry:
-            del data_entry['Title']
+def load_data(store):
+    # Load the studies from the study store into data variable, without 'Abstract' and 'Title'
+    return store.records(exclude=['Abstract', 'Title'])
 
-    return data
+def load_data_values(store):
+    # Split and cleaned values per study for filtering in the browser, see getDataValues in dataUtility.mjs
+    return json.dumps(store.client_payload(PARENTHICAL_COLUMNS))
 
 def load_explanations():
     # Load explanations from CSV file into explanations variable
@@ -144,63 +177,14 @@ def load_explanations():
     
     return explanations
 
-def load_abstracts():
-    try:
-        csv_path = os.path.join(os.path.dirname(__file__), "data.csv")
-        df = pd.read_csv(csv_path, usecols=["Abstract", "ID"])  # Load only the Abstract column
-        df = df.fillna('N/A')  # Replace actual NaN values
-        df = df.replace('nan', 'N/A')  # Replace string 'nan' values
-        abstracts = df.to_dict(orient="records")
-    except FileNotFoundError:
-        return "data.csv file not found"
-    except pd.errors.EmptyDataError:
-        return "data.csv file is empty"
-    except Exception as e:
-        return f"Error loading data.csv: {e}"
-    
-    return abstracts
-
-def load_titles():
-    try:
-        csv_path = os.path.join(os.path.dirname(__file__), "data.csv")
-        df = pd.read_csv(csv_path, usecols=["Title", "ID"])  # Load only the Title column
-        df = df.fillna('N/A')  # Replace actual NaN values
-        df = df.replace('nan', 'N/A')  # Replace string 'nan' values
-        titles = df.to_dict(orient="records")
-    except FileNotFoundError:
-        return "data.csv file not found"
-    except pd.errors.EmptyDataError:
-        return "data.csv file is empty"
-    except Exception as e:
-        return f"Error loading data.csv: {e}"
-    
-    return titles
+def load_study_summary(store, study_id:int):
+    # Title and abstract of a single study, fetched by the study modal instead of shipping all of them with every page
+    if study_id not in store.ids:
+        return None
+    position = store.ids.tolist().index(study_id)
+    return {"Title": store.text["Title"][position], "Abstract": store.text["Abstract"][position]}
 
-def additional_data():
-    try:
-        csv_path = os.path.join(os.path.dirname(__file__), "data.csv")
-        df = pd.read_csv(csv_path, usecols=["Gesture", "Keywords"])
-        df = df.fillna('N/A')  # Replace actual NaN values
-        df = df.replace('nan', 'N/A')  # Replace string 'nan' values
-        additional_data = df.to_dict(orient="records")
-    except FileNotFoundError:
-        return "data.csv file not found"
-    except pd.errors.EmptyDataError:
-        return "data.csv file is empty"
-    except Exception as e:
-        return f"Error loading data.csv: {e}"
-    
-    helper = {}
-    for entry in additional_data:
-        for key in entry.keys():
-            if key not in helper:
-                helper[key] = [entry[key]]
-            else:    
-                helper[key].append(entry[key])
-    
-    return helper
-
-def generate_sidebar_panels(data, explanations):
+def generate_sidebar_panels(data, explanations, store):
     # Create a list for the panels on the side bar
     sidebar_panels = []
     panels = {}
@@ -227,8 +211,8 @@ def generate_sidebar_panels(data, explanations):
           # for numerical columns, get min and max values and add Slider to the respective panel
           if col in SLIDER_CATEGORIES:
             # determine min and max values for the slider
-            min_value = min(list(map(lambda entry: entry[col], data)))
-            max_value = max(list(map(lambda entry: entry[col], data)))
+            min_value = int(np.nanmin(store.numeric[col]))
+            max_value = int(np.nanmax(store.numeric[col]))
 
             # create a new slider
             new_slider = Slider(value=col, min_value=min_value, max_value=max_value)
@@ -237,18 +221,9 @@ def generate_sidebar_panels(data, explanations):
             # add the slider to the respective panel
             new_panel.sliders.append(new_slider)
           else:
-            # for categorical columns, get unique values
-            unique_values = set()
-            for row in data:
-              # some cells contain multiple values separated by commas
-              cell_values = row[col].split(",")
-              for value in cell_values:
-                  # trim values
-                  trimmed_value = value.strip()
-
-                  # remove parentheses and choose the first value for values containing parentheses
-                  base_value = trimmed_value.split("(")[0].strip() if col in PARENTHICAL_COLUMNS else trimmed_value
-                  unique_values.add(base_value)
+            # for categorical columns, get unique values, multi-value cells are already split in the store
+            # and for PARENTHICAL_COLUMNS only the part before the parentheses is used
+            unique_values = store.unique_values(col, strip_parenthetical=col in PARENTHICAL_COLUMNS)
 
             # sort the unique values using custom_sort function
             sorted_unique_values = custom_sort(list(unique_values))
@@ -288,187 +263,319 @@ def generate_sidebar_panels(data, explanations):
 
 def load_similarity_data():
     try:
-        # Read the similarity matrix with the first column as index
-        csv_path_as = os.path.join(os.path.dirname(__file__), "abstract_similarity_datasets/normalized_abstract_similarity.csv")
-        abstract_similarity_df = pd.read_csv(csv_path_as, index_col=0)
-        abstract_similarity_df = abstract_similarity_df.fillna('N/A')  # Replace actual NaN values
-        abstract_similarity_df = abstract_similarity_df.replace('nan', 'N/A')  # Replace string 'nan' values
-        csv_path_ds = os.path.join(os.path.dirname(__file__), "database_similarity_datasets/normalized_database_similarity.csv")
-        database_similarity_df = pd.read_csv(csv_path_ds, index_col=0)
-        database_similarity_df = database_similarity_df.fillna('N/A')  # Replace actual NaN values
-        database_similarity_df = database_similarity_df.replace('nan', 'N/A')  # Replace string 'nan' values
-
-        # Prepare data structure that preserves row/column information
-        similarity_data = {
-            'abstract_study_ids': abstract_similarity_df.columns.tolist(),
-            'abstract_index_ids': abstract_similarity_df.index.tolist(),
-            'abstract_matrix': abstract_similarity_df.values.tolist(),
-
-            'database_study_ids': database_similarity_df.columns.tolist(),
-            'database_index_ids': database_similarity_df.index.tolist(),
-            'database_matrix': database_similarity_df.values.tolist(),
-        }
+        # Both z-standardized matrices, blended and thresholded on request by /api/similarity
+        return load_blended_similarity({
+            'abstract': os.path.join(os.path.dirname(__file__), "abstract_similarity_datasets/normalized_abstract_similarity.csv"),
+            'database': os.path.join(os.path.dirname(__file__), "database_similarity_datasets/normalized_database_similarity.csv"),
+        })
     except FileNotFoundError:
         return "similarity.csv file not found"
     except pd.errors.EmptyDataError:
         return "similarity.csv file is empty"
     except Exception as e:
         return f"Error loading similarity.csv: {e}"
-    
-    return similarity_data
 
-def load_citation_data():
-    # Load citation and co-author matrices for timeline view
-    citation_matrix = []
-    coauthor_matrix = []
-    
+def load_abstract_index():
+    # Optional, the /api/similar endpoint answers 503 until the update script has built the index
+    index_path = os.path.join(os.path.dirname(__file__), "abstract_similarity_datasets/abstract_ann_index.npz")
+    if not os.path.exists(index_path):
+        return None
+    return IVFIndex.load(index_path)
+
+def load_citation_metrics():
+    # Per-study metrics and neighbour lists of the citation and coauthor graph from the citation_metrics pipeline stage, keyed by ID
+    csv_path = os.path.join(os.path.dirname(__file__), "interconnections_datasets/citation_metrics.csv")
+    if not os.path.exists(csv_path):
+        return {}
     try:
-        # Read CSV - convert index to a column for proper processing in JS
-        csv_path = os.path.join(os.path.dirname(__file__), "interconnections_datasets/citation_matrix.csv")
-        citation_df = pd.read_csv(csv_path, index_col=0)
-        
-        # Get column names and index
-        col_headers = citation_df.columns.tolist()
-        row_indices = citation_df.index.tolist()
-        
-        # Create header row with empty first cell plus column names
-        header_row = [""] + col_headers
-        
-        # Create matrix with header row and data rows (index + values)
-        citation_matrix = [header_row]
-        for idx in row_indices:
-            row_data = [idx] + citation_df.loc[idx].tolist()
-            citation_matrix.append(row_data)
-                
-    except Exception as e:
-        return f"Error loading citation matrix: {e}"
-    
-    try:
-        # Read CSV - convert index to a column for proper processing in JS
-        csv_path = os.path.join(os.path.dirname(__file__), "interconnections_datasets/coauthor_matrix.csv")
-        coauthor_df = pd.read_csv(csv_path, index_col=0)
-        
-        # Get column names and index
-        col_headers = coauthor_df.columns.tolist()
-        row_indices = coauthor_df.index.tolist()
-        
-        # Create header row with empty first cell plus column names
-        header_row = [""] + col_headers
-        
-        # Create matrix with header row and data rows (index + values)
-        coauthor_matrix = [header_row]
-        for idx in row_indices:
-            row_data = [idx] + coauthor_df.loc[idx].tolist()
-            coauthor_matrix.append(row_data)
-            
+        # Comma-separated study IDs, a single ID must not become a number
+        id_lists = ['Cites Later Studies', 'Cited Studies', 'Citing Studies', 'Coauthor Studies']
+        metrics_df = pd.read_csv(csv_path, dtype={column: str for column in id_lists}, keep_default_na=False)
     except Exception as e:
-        return f"Error loading coauthor matrix: {e}"
-    
-    return citation_matrix, coauthor_matrix
+        return f"Error loading citation metrics: {e}"
+    return {str(row['ID']): row for row in metrics_df.to_dict(orient='records')}
 
-@app.get("/")
-def home():
-    data = load_data()
-    if not isinstance(data, list):
-        return render_template("error.html", error=data), 500
+def build_snapshot():
+    # Everything the views need, derived once per version of the input files; raising keeps the previous snapshot
+    store = load_store()
+    data = load_data(store)
 
     explanations = load_explanations()
     if not isinstance(explanations, dict):
-        return render_template("error.html", error=explanations), 500
-    
-    sidebar_panels = generate_sidebar_panels(data, explanations)
+        raise ValueError(explanations)
+
+    similarity = load_similarity_data()
+    if not isinstance(similarity, BlendedSimilarity):
+        raise ValueError(similarity)
+
+    citation_metrics = load_citation_metrics()
+    if not isinstance(citation_metrics, dict):
+        raise ValueError(citation_metrics)
+
+    return {
+        'store': store,
+        'data': data,
+        'explanations': explanations,
+        'sidebar_panels': generate_sidebar_panels(data, explanations, store),
+        'filter_categories': json.dumps(filter_categories(data)),
+        'data_values': load_data_values(store),
+        'similarity': similarity,
+        'citation_metrics': json.dumps(citation_metrics),
+        'abstract_index': load_abstract_index(),
+        'search_index': SearchIndex.from_store(store),
+        # Serialized once, /api/insights only sends the string
+        'insights': json.dumps(compute_insights(store)),
+        'pages': LRUCache(PAGE_CACHE_SIZE),
+        'responses': LRUCache(RESPONSE_CACHE_SIZE),
+    }
+
+snapshots = SnapshotManager(build_snapshot, WATCHED_FILES)
+try:
+    snapshots.reload()
+    print(f"Loaded dataset version {snapshots.snapshot.version[:12]}")
+except Exception as e:
+    print(f"Could not load the dataset: {e}")
+
+def snapshot_etag(snapshot):
+    return f"{snapshot.version[:16]}-{CODE_VERSION}"
+
+def not_modified(snapshot):
+    # Answers conditional requests for an unchanged dataset without rendering anything
+    if request.if_none_match.contains(snapshot_etag(snapshot)):
+        response = make_response("", 304)
+        response.set_etag(snapshot_etag(snapshot))
+        return response
+    return None
+
+def with_etag(body, snapshot):
+    response = make_response(body)
+    response.set_etag(snapshot_etag(snapshot))
+    response.headers["X-Dataset-Version"] = snapshot.version[:16]
+    return response
+
+def snapshot_error():
+    return render_template("error.html", error=snapshots.last_error or "The dataset could not be loaded"), 500
+
+def render_page(snapshot, template, **context):
+    # Rendered once per dataset version on the offload pool, requests arriving during the rendering share it.
+    # The links of url_for start with the script root (SCRIPT_NAME, e.g. behind a proxy under /earxplore), so
+    # the pages are cached per root. Anything else of the request must not be read by these templates
+    key = (template, request.script_root)
+    render = copy_current_request_context(lambda: render_template(template, **context))
+    return snapshot['pages'].get_or_compute(key, lambda: offload_pool.run(("page", snapshot.version, *key), render))
+
+@app.errorhandler(PoolBusy)
+def pool_busy(e):
+    # More expensive requests are pending than the offload pool accepts, clients should retry shortly
+    print(f"Offload pool busy ({request.path}): {e}")
+    if request.path.startswith("/api/"):
+        response = make_response(jsonify({"success": False, "message": "The server is busy, please try again"}), 503)
+    else:
+        response = make_response(render_template("error.html", error="The server is busy, please try again in a moment"), 503)
+    response.headers["Retry-After"] = "1"
+    return response
+
+@app.get("/")
+def home():
+    # One snapshot per request, a reload in between does not mix two dataset versions
+    snapshot = snapshots.current()
+    if snapshot is None:
+        return snapshot_error()
 
     # Check for success message
     success_message = request.args.get('success')
     if success_message:
         print(f"Success message detected: {success_message}")
+    else:
+        cached = not_modified(snapshot)
+        if cached:
+            return cached
 
-    return render_template("table-view.html", current_view="tableView", data=data, sidebar_panels=sidebar_panels, explanations=json.dumps(explanations), abstracts=json.dumps(load_abstracts()), titles=json.dumps(load_titles()), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), filter_categories=json.dumps(filter_categories(data)), start_categories=START_CATEGORY_FILTERS, success_message=success_message)
+    context = dict(current_view="tableView", data=snapshot['data'], sidebar_panels=snapshot['sidebar_panels'], explanations=json.dumps(snapshot['explanations']), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), data_values=snapshot['data_values'], filter_categories=snapshot['filter_categories'], start_categories=START_CATEGORY_FILTERS)
+    if success_message:
+        # Not cached, the message is part of the page
+        return with_etag(render_template("table-view.html", success_message=success_message, **context), snapshot)
+    return with_etag(render_page(snapshot, "table-view.html", success_message=None, **context), snapshot)
 
 @app.get("/bar-chart")
 def bar_chart():
-    data = load_data()
-    if not isinstance(data, list):
-        return render_template("error.html", error=data), 500
-
-    explanations = load_explanations()
-    if not isinstance(explanations, dict):
-        return render_template("error.html", error=explanations), 500
-    
-    sidebar_panels = generate_sidebar_panels(data, explanations)
+    snapshot = snapshots.current()
+    if snapshot is None:
+        return snapshot_error()
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
 
-    categories = []
-    for category in data[0].keys():
-        if category in EXCLUDED_SIDEBAR_CATEGORIES:
-            continue
-        categories.append(category)
-
-    abstracts = load_abstracts()
-    if not isinstance(abstracts, list):
-        return render_template("error.html", error=abstracts), 500
-    
-    titles = load_titles()
-    if not isinstance(titles, list):
-        return render_template("error.html", error=titles), 500
-
-    return render_template("bar-chart.html", current_view="chartView", data=data, sidebar_panels=sidebar_panels, explanations=json.dumps(explanations), abstracts=json.dumps(load_abstracts()), titles=json.dumps(load_titles()), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), filter_categories=json.dumps(filter_categories(data)), start_categories=START_CATEGORY_FILTERS,)
+    return with_etag(render_page(snapshot, "bar-chart.html", current_view="chartView", data=snapshot['data'], sidebar_panels=snapshot['sidebar_panels'], explanations=json.dumps(snapshot['explanations']), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), data_values=snapshot['data_values'], filter_categories=snapshot['filter_categories'], start_categories=START_CATEGORY_FILTERS,), snapshot)
 
 @app.get("/similarity")
 def similarity():
-    data = load_data()
-    if not isinstance(data, list):
-        return render_template("error.html", error=data), 500
-
-    explanations = load_explanations()
-    if not isinstance(explanations, dict):
-        return render_template("error.html", error=explanations), 500
-    
-    sidebar_panels = generate_sidebar_panels(data, explanations)
+    snapshot = snapshots.current()
+    if snapshot is None:
+        return snapshot_error()
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
 
-    similarity_data = load_similarity_data()
-    if not isinstance(similarity_data, dict):
-        return render_template("error.html", error=similarity_data), 500
-    
     excluded_categories = EXCLUDED_SIDEBAR_CATEGORIES + ADVANCED_SIDEBAR_CATEGORIES + ["Year"]
 
-    return render_template("similarity.html", current_view="similarityView", data=data, sidebar_panels=sidebar_panels, explanations=explanations, abstracts=json.dumps(load_abstracts()), titles=json.dumps(load_titles()), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), filter_categories=json.dumps(filter_categories(data)), similarity_data=json.dumps(similarity_data), excluded_categories=json.dumps(excluded_categories))
+    return with_etag(render_page(snapshot, "similarity.html", current_view="similarityView", data=snapshot['data'], sidebar_panels=snapshot['sidebar_panels'], explanations=snapshot['explanations'], parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), data_values=snapshot['data_values'], filter_categories=snapshot['filter_categories'], excluded_categories=json.dumps(excluded_categories)), snapshot)
 
 @app.get("/timeline")
 def timeline():
-    data = load_data()
-    if not isinstance(data, list):
-        return render_template("error.html", error=data), 500
-
-    explanations = load_explanations()
-    if not isinstance(explanations, dict):
-        return render_template("error.html", error=explanations), 500
-    
-    sidebar_panels = generate_sidebar_panels(data, explanations)
-
-    categories = []
-    for category in data[0].keys():
-        if category in EXCLUDED_SIDEBAR_CATEGORIES or category == "Year":
-            continue
-        categories.append(category)
+    snapshot = snapshots.current()
+    if snapshot is None:
+        return snapshot_error()
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
 
-    citation_matrix, coauthor_matrix = load_citation_data()
     excluded_categories = EXCLUDED_SIDEBAR_CATEGORIES + ADVANCED_SIDEBAR_CATEGORIES + ["Year"]
 
-    return render_template("timeline.html", current_view="timeView", data=data, sidebar_panels=sidebar_panels, explanations=explanations, abstracts=json.dumps(load_abstracts()), titles=json.dumps(load_titles()), parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), filter_categories=json.dumps(filter_categories(data)), citation_matrix=json.dumps(citation_matrix), coauthor_matrix=json.dumps(coauthor_matrix), excluded_categories=json.dumps(excluded_categories))
+    return with_etag(render_page(snapshot, "timeline.html", current_view="timeView", data=snapshot['data'], sidebar_panels=snapshot['sidebar_panels'], explanations=snapshot['explanations'], parenthical_columns=json.dumps(PARENTHICAL_COLUMNS), data_values=snapshot['data_values'], filter_categories=snapshot['filter_categories'], citation_metrics=snapshot['citation_metrics'], excluded_categories=json.dumps(excluded_categories)), snapshot)
+
+def api_snapshot():
+    # (snapshot, None) or (None, error response) for the JSON endpoints
+    snapshot = snapshots.current()
+    if snapshot is None:
+        return None, (jsonify({"success": False, "message": snapshots.last_error or "The dataset could not be loaded"}), 503)
+    return snapshot, None
+
+@app.get("/api/similar/<int:study_id>")
+def similar_studies(study_id):
+    # Most similar studies by abstract embedding, answered from the ANN index instead of the full matrix
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    index = snapshot['abstract_index']
+    if index is None:
+        return jsonify({"success": False, "message": "abstract index not found"}), 503
+    if study_id not in index:
+        return jsonify({"success": False, "message": f"study {study_id} is not indexed"}), 404
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
+
+    k = min(max(request.args.get("k", 10, type=int), 1), 100)
+    neighbours = index.query_id(study_id, k)
+    return with_etag(jsonify({"success": True, "id": study_id, "neighbours": [{"id": neighbour_id, "similarity": similarity} for neighbour_id, similarity in neighbours]}), snapshot)
+
+@app.route("/api/similarity", methods=["GET", "POST"])
+def similarity_edges():
+    # Edges of the similarity graph above a threshold, for a weighted blend of abstract and database similarity
+    # Parameters come as JSON (POST, the list of filtered IDs can be long) or as query arguments (GET, ids comma separated)
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    try:
+        weights = {name: float(params.get(name, 0)) for name in ("abstract", "database")}
+        threshold = float(params.get("threshold", 1.0))
+        ids = params.get("ids")
+        if isinstance(ids, str):
+            ids = [int(i) for i in ids.split(",") if i.strip()]
+        elif ids is not None:
+            ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "abstract, database and threshold must be numbers and ids a list of study IDs"}), 400
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    if request.method == "GET":
+        cached = not_modified(snapshot)
+        if cached:
+            return cached
+
+    similarity = snapshot['similarity']
+    try:
+        # Blended and serialized on the offload pool, identical concurrent requests share the work
+        key = ("edges", snapshot.version, similarity.normalize_weights(weights), subset_key(ids), threshold)
+        body = snapshot['responses'].get_or_compute(key, lambda: offload_pool.run(
+            key, lambda: json.dumps({"success": True, "threshold": threshold, **similarity.edges(weights, ids, threshold)})))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    response = make_response(body)
+    response.mimetype = "application/json"
+    return with_etag(response, snapshot) if request.method == "GET" else response
+
+@app.get("/api/similarity/matrix")
+def similarity_matrix():
+    # Full (blended) similarity matrix of all studies as quantized upper triangle, for clients that threshold it themselves
+    weights = {name: request.args.get(name, 0, type=float) for name in ("abstract", "database")}
+    bits = request.args.get("bits", 16, type=int)
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
+
+    similarity = snapshot['similarity']
+    try:
+        key = ("matrix", snapshot.version, similarity.normalize_weights(weights), bits)
+        payload = snapshot['responses'].get_or_compute(key, lambda: offload_pool.run(key, lambda: similarity.encoded_matrix(weights, bits)))
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    response = with_etag(payload, snapshot)
+    response.mimetype = "application/octet-stream"
+    return response
+
+@app.get("/api/insights")
+def insights():
+    # Statistics of the database (papers per year, trends, keywords, evaluation overlaps, venues), computed once per dataset version
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
+    response = with_etag(snapshot['insights'], snapshot)
+    response.mimetype = "application/json"
+    return response
+
+@app.get("/api/search")
+def search_studies():
+    # Ranked IDs of the studies matching all terms of q in title, abstract, keywords or authors ("gest*" for prefixes)
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"success": False, "message": "missing query parameter q"}), 400
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
+
+    limit = request.args.get("k", type=int)
+    results = snapshot['search_index'].search(query, max(limit, 1) if limit is not None else None)
+    return with_etag(jsonify({"success": True, "query": query, "results": [{"id": study_id, "score": score} for study_id, score in results]}), snapshot)
+
+@app.get("/api/study/<int:study_id>")
+def study_summary(study_id):
+    # Title and abstract for the study modal
+    snapshot, error = api_snapshot()
+    if error:
+        return error
+    summary = load_study_summary(snapshot['store'], study_id)
+    if summary is None:
+        return jsonify({"success": False, "message": f"study {study_id} not found"}), 404
+    cached = not_modified(snapshot)
+    if cached:
+        return cached
+    return with_etag(jsonify({"success": True, "id": study_id, **summary}), snapshot)
 
 @app.get('/add_study')
 def add_study():
     try:
         # Load the data
-        csv_path = os.path.join(os.path.dirname(__file__), "data.csv")
-        df = pd.read_csv(csv_path)
+        snapshot = snapshots.current()
+        if snapshot is None:
+            return snapshot_error()
+        store = snapshot['store']
         
         # Extract categories and their options for the form
         form_categories = {}
         
         # Identify panel categories from column names
         panels = {}
-        for col in df.columns:
+        for col in store.columns:
             if '_PANEL_' in col:
                 panel_name = col.split('_PANEL_')[0]
                 if panel_name not in panels:
@@ -500,30 +607,16 @@ def add_study():
                     panel_options[col] = {
                         'type': 'numeric',
                         'name': display_name,
-                        'min': int(df[col].min()),
-                        'max': int(df[col].max())
+                        'min': int(np.nanmin(store.numeric[col])),
+                        'max': int(np.nanmax(store.numeric[col]))
                     }
                     continue
                 
-                # Extract unique values from the column
-                unique_values = []
-                for cell in df[col].dropna():
-                    # Handle comma-separated values
-                    if isinstance(cell, str):
-                        for value in cell.split(','):
-                            clean_value = value.strip()
-                            
-                            # For specific fields, remove parenthetical content
-                            if col in PARENTHICAL_COLUMNS and '(' in clean_value:
-                                base_value = clean_value.split('(')[0].strip()
-                                if base_value and base_value not in unique_values:
-                                    unique_values.append(base_value)
-                            # For other fields, keep parenthetical content
-                            elif clean_value and clean_value not in unique_values:
-                                unique_values.append(clean_value)
+                # Extract unique values from the column, without 'N/A' and for specific fields without parenthetical content
+                unique_values = store.unique_values(col, strip_parenthetical=col in PARENTHICAL_COLUMNS, include_missing=False)
                 
                 # Use custom_sort instead of default sorting
-                unique_values = custom_sort(unique_values)
+                unique_values = custom_sort(list(unique_values))
                 
                 # Determine field type and properties
                 field_type = 'checkbox' if len(unique_values) > 1 else 'text'
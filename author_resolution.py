@@ -0,0 +1,246 @@
+import os
+import re
+import unicodedata
+import zlib
+import difflib
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Manual merges that the automatic matching cannot (or should not) decide, one "Alias,Canonical" pair per row
+AUTHOR_OVERRIDES_PATH = os.path.join(os.path.dirname(__file__), "interconnections_datasets/author_overrides.csv")
+
+# MinHash/LSH parameters: 16 bands of 4 rows put the candidate threshold at a Jaccard similarity of about 0.5
+NGRAM_SIZE = 3
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# Candidates found only via LSH (different blocking keys) are verified against these thresholds,
+# short surnames are excluded because "li"/"liu" or "chen"/"cheng" are different names, not typos
+MIN_ESTIMATED_JACCARD = 0.6
+MIN_SURNAME_RATIO = 0.85
+MIN_SURNAME_LENGTH = 5
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_name(name: str) -> str:
+    # strip accents, lowercase, drop dots and collapse internal whitespace
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r"[^\w\s-]", " ", name.lower())
+    return " ".join(name.split())
+
+
+def split_author_string(value) -> list:
+    # Accept list or single comma-separated string
+    if isinstance(value, list):
+        names = value
+    elif isinstance(value, str):
+        names = value.split(",")
+    else:
+        names = []
+    names = (normalize_name(n) for n in names if isinstance(n, str))
+    return [n for n in names if n]
+
+
+def _given_and_surname(normalized_name: str):
+    tokens = normalized_name.split()
+    return tokens[:-1], tokens[-1]
+
+
+def blocking_key(normalized_name: str) -> str:
+    # surname plus first initial, e.g. "hummel|j" for both "J. Hummel" and "Jonas Hummel"
+    given, surname = _given_and_surname(normalized_name)
+    return f"{surname}|{given[0][0]}" if given else surname
+
+
+def _is_initial(token: str) -> bool:
+    return len(token) == 1
+
+
+def _tokens_compatible(token_a: str, token_b: str) -> bool:
+    if _is_initial(token_a) or _is_initial(token_b):
+        return token_a[0] == token_b[0]
+    return token_a == token_b
+
+
+def given_names_compatible(name_a: str, name_b: str) -> bool:
+    # "j hummel" ~ "jonas hummel" and "michel gauthier" ~ "michel j a gauthier", but "jonas" !~ "janet"
+    given_a, _ = _given_and_surname(name_a)
+    given_b, _ = _given_and_surname(name_b)
+    if not given_a or not given_b:
+        return True
+    return all(_tokens_compatible(a, b) for a, b in zip(given_a, given_b))
+
+
+def _has_full_first_name(normalized_name: str) -> bool:
+    given, _ = _given_and_surname(normalized_name)
+    return bool(given) and not _is_initial(given[0])
+
+
+def _shingle_hashes(normalized_name: str) -> np.ndarray:
+    padded = f" {normalized_name.replace('-', ' ')} "
+    shingles = {padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))}
+    return np.array([zlib.crc32(s.encode("utf-8")) % _MERSENNE_PRIME for s in shingles], dtype=np.uint64)
+
+
+def minhash_signatures(normalized_names, num_permutations=NUM_PERMUTATIONS, seed=0) -> np.ndarray:
+    """Return a (len(names), num_permutations) MinHash signature matrix over character n-grams."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _MERSENNE_PRIME, size=num_permutations, dtype=np.uint64)
+    b = rng.integers(0, _MERSENNE_PRIME, size=num_permutations, dtype=np.uint64)
+
+    signatures = np.empty((len(normalized_names), num_permutations), dtype=np.uint64)
+    for i, name in enumerate(normalized_names):
+        hashes = _shingle_hashes(name)
+        # (a * h + b) mod p stays below 2^63 because a, b and h are all below 2^31
+        signatures[i] = ((a[:, None] * hashes[None, :] + b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands=LSH_BANDS) -> set:
+    # Names that agree on all rows of at least one band become candidate pairs
+    rows = signatures.shape[1] // bands
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        band_slice = signatures[:, band * rows:(band + 1) * rows]
+        for i, row in enumerate(band_slice):
+            buckets[row.tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidates.add((members[x], members[y]))
+    return candidates
+
+
+class _UnionFind:
+    def __init__(self, size:int):
+        self.parent = list(range(size))
+
+    def find(self, i:int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i:int, j:int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def load_author_overrides(path=AUTHOR_OVERRIDES_PATH) -> list:
+    # Return (alias, canonical) pairs of normalized names, an absent file means no overrides
+    if not os.path.exists(path):
+        return []
+    overrides_df = pd.read_csv(path).dropna(subset=["Alias", "Canonical"])
+    return [(normalize_name(alias), normalize_name(canonical)) for alias, canonical in zip(overrides_df["Alias"], overrides_df["Canonical"])]
+
+
+def resolve_authors(author_names, overrides=None):
+    """Map author names to canonical author IDs.
+
+    Returns a tuple (name_to_id, id_to_name): the first maps every normalized input name to its
+    canonical ID, the second maps every ID to the most frequent spelling in its cluster.
+    """
+    counts = Counter(normalize_name(n) for n in author_names)
+    counts.pop("", None)
+    overrides = overrides if overrides is not None else load_author_overrides()
+    # Cells without any letters (blank, "-", ...) normalize to "" and would reintroduce the empty name
+    overrides = [(alias, canonical) for alias, canonical in overrides if alias and canonical]
+    for alias, canonical in overrides:
+        counts.setdefault(alias, 0)
+        counts.setdefault(canonical, 0)
+
+    names = sorted(counts)
+    index = {name: i for i, name in enumerate(names)}
+    union_find = _UnionFind(len(names))
+
+    # Stage 1: exact blocking on surname plus first initial
+    blocks = defaultdict(list)
+    for i, name in enumerate(names):
+        blocks[blocking_key(name)].append(i)
+
+    for members in blocks.values():
+        full = [i for i in members if _has_full_first_name(names[i])]
+        initials = [i for i in members if not _has_full_first_name(names[i])]
+
+        for x in range(len(full)):
+            for y in range(x + 1, len(full)):
+                if given_names_compatible(names[full[x]], names[full[y]]):
+                    union_find.union(full[x], full[y])
+
+        # An abbreviated name only joins a full name when that is unambiguous within the block,
+        # otherwise "y wang" would chain "yuntao wang" and "yong wang" into one person
+        for i in initials:
+            roots = {union_find.find(j) for j in full if given_names_compatible(names[i], names[j])}
+            if len(roots) == 1:
+                union_find.union(i, roots.pop())
+            elif not roots:
+                for j in initials:
+                    if j != i and given_names_compatible(names[i], names[j]):
+                        union_find.union(i, j)
+
+    # Stage 2: MinHash/LSH over character n-grams catches spelling variants of the surname
+    # ("roeddiger" / "roddiger") that land in different blocks
+    signatures = minhash_signatures(names)
+    for i, j in lsh_candidate_pairs(signatures):
+        if blocking_key(names[i]) == blocking_key(names[j]):
+            continue
+        given_i, surname_i = _given_and_surname(names[i])
+        given_j, surname_j = _given_and_surname(names[j])
+        if not given_i or not given_j or given_i[0] != given_j[0] or _is_initial(given_i[0]):
+            continue
+        if min(len(surname_i), len(surname_j)) < MIN_SURNAME_LENGTH:
+            continue
+        estimated_jaccard = np.mean(signatures[i] == signatures[j])
+        if estimated_jaccard < MIN_ESTIMATED_JACCARD:
+            continue
+        if difflib.SequenceMatcher(None, surname_i, surname_j).ratio() >= MIN_SURNAME_RATIO:
+            union_find.union(i, j)
+
+    # Stage 3: manual merges always win
+    for alias, canonical in overrides:
+        union_find.union(index[alias], index[canonical])
+
+    clusters = defaultdict(list)
+    for i, name in enumerate(names):
+        clusters[union_find.find(i)].append(name)
+
+    name_to_id = {}
+    id_to_name = {}
+    # Order clusters by their canonical spelling so IDs are stable between runs
+    canonical_names = sorted((max(members, key=lambda n: (counts[n], len(n), n)), members) for members in clusters.values())
+    for author_id, (canonical, members) in enumerate(canonical_names, start=1):
+        id_to_name[author_id] = canonical
+        for name in members:
+            name_to_id[name] = author_id
+
+    return name_to_id, id_to_name
+
+
+def resolve_paper_authors(df: pd.DataFrame, id_column="ID", authors_column="Authors", overrides=None):
+    """Return {paper ID: set of canonical author IDs} and the id_to_name mapping for a data.csv frame."""
+    paper_names = {int(paper_id): split_author_string(value) for paper_id, value in zip(df[id_column], df[authors_column])}
+    name_to_id, id_to_name = resolve_authors([n for names in paper_names.values() for n in names], overrides=overrides)
+    paper_authors = {paper_id: {name_to_id[n] for n in names} for paper_id, names in paper_names.items()}
+    return paper_authors, id_to_name
+
+
+if __name__ == "__main__":
+    # Print every merged cluster so the automatic decisions can be reviewed and overridden
+    df = pd.read_csv(os.path.join(os.path.dirname(__file__), "data.csv"))
+    names = [n for value in df["Authors"] for n in split_author_string(value)]
+    name_to_id, id_to_name = resolve_authors(names)
+
+    members = defaultdict(set)
+    for name, author_id in name_to_id.items():
+        members[author_id].add(name)
+
+    print(f"Resolved {len(name_to_id)} distinct author strings to {len(id_to_name)} authors")
+    for author_id, variants in sorted(members.items()):
+        if len(variants) > 1:
+            print(f"{author_id}: {id_to_name[author_id]} <- {', '.join(sorted(variants))}")
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Starts the app on the threaded development server, like app.py does but without the debugger and reloader
+SERVER_CODE = "import sys, app; app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)"
+
+DEFAULT_DURATION = 15
+DEFAULT_HEAVY_CLIENTS = 16
+
+# Seconds between two requests of the client measuring the cheap routes
+PROBE_INTERVAL = 0.05
+
+# Share of the heavy requests that use the default graph settings (all studies, pure abstract similarity),
+# like visitors opening the similarity page at the same time; the others move the sliders and filters
+POPULAR_SHARE = 0.5
+
+# Files of the app that --studies does not need in its copy
+COPY_IGNORE = shutil.ignore_patterns(".git", "__pycache__", "*.ipynb", "extracted_citations", "benchmarks")
+SIMILARITY_FILES = ['abstract_similarity_datasets/normalized_abstract_similarity.csv',
+                    'database_similarity_datasets/normalized_database_similarity.csv']
+
+CHEAP_ROUTES = ["/api/study/{id}", "/api/search?q=gest*", "/api/insights"]
+PAGES = ["/", "/similarity", "/timeline", "/bar-chart"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(base_url:str, path:str, body:dict = None, timeout:float = 60) -> tuple:
+    """Return (status, seconds) of one request, status is None if the connection failed."""
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, headers={"Content-Type": "application/json"} if data else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - start
+
+
+def synthetic_app(n:int, directory:str, seed:int = 0):
+    """Copy the app into directory with random similarity matrices of n studies, so the similarity routes
+    do as much work as they would for a database of that size (the pages keep the real studies)."""
+    shutil.copytree(BASE_DIR, directory, ignore=COPY_IGNORE, dirs_exist_ok=True)
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    for path in SIMILARITY_FILES:
+        # Symmetric standard normal values, like the z-scores of the real matrices
+        values = rng.standard_normal((n, n)).astype(np.float32)
+        values = (values + values.T) / np.sqrt(2)
+        np.fill_diagonal(values, np.nan)
+        pd.DataFrame(values, index=ids, columns=ids).to_csv(os.path.join(directory, path), float_format="%.4f")
+
+
+def start_server(port:int, workers:int = None, app_dir:str = BASE_DIR) -> subprocess.Popen:
+    env = dict(os.environ)
+    if workers is not None:
+        env["OFFLOAD_WORKERS"] = str(workers)
+    server = subprocess.Popen([sys.executable, "-c", SERVER_CODE, str(port)], cwd=app_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # The app builds its snapshot before it starts listening
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"the app exited with status {server.returncode}")
+        if request(f"http://127.0.0.1:{port}", "/api/insights", timeout=5)[0] == 200:
+            return server
+        time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("the app did not start within 120 s")
+
+
+def heavy_request(rng:random.Random, study_ids:list) -> tuple:
+    """(route name, path, JSON body) of a request for one of the expensive routes."""
+    kind = rng.random()
+    if kind < POPULAR_SHARE:
+        return "similarity (popular)", "/api/similarity", {"abstract": 1, "database": 0, "threshold": 1.0}
+    if kind < 0.9:
+        # Slider positions and filters that are unlikely to be cached
+        weight = round(rng.random(), 2)
+        ids = rng.sample(study_ids, rng.randint(len(study_ids) // 2, len(study_ids)))
+        return "similarity (blend)", "/api/similarity", {"abstract": weight, "database": 1 - weight, "threshold": round(rng.uniform(1.5, 3), 2), "ids": ids}
+    weight = round(rng.random(), 1)
+    return "similarity matrix", f"/api/similarity/matrix?abstract={weight}&database={1 - weight:.1f}&bits=16", None
+
+
+def run_load(base_url:str, duration:float, heavy_clients:int, seed:int = 0) -> dict:
+    """Hammer the expensive routes from heavy_clients threads while one client times the cheap routes.
+
+    Returns the latencies in seconds and the statuses per route name.
+    """
+    # Studies of the similarity matrices (synthetic with --studies) and of data.csv
+    with urllib.request.urlopen(base_url + "/api/similarity?abstract=1&threshold=1000") as response:
+        study_ids = json.loads(response.read())["ids"]
+    probe_ids = pd.read_csv(os.path.join(BASE_DIR, "data.csv"), usecols=['ID'])['ID'].astype(int).tolist()
+    results = {}
+    lock = threading.Lock()
+    stop = time.time() + duration
+
+    def record(name, status, seconds):
+        with lock:
+            entry = results.setdefault(name, {"seconds": [], "statuses": {}})
+            entry["seconds"].append(seconds)
+            entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+
+    def heavy_client(client_seed):
+        rng = random.Random(client_seed)
+        while time.time() < stop:
+            if rng.random() < 0.1:
+                # Pages are rendered once per dataset version, a conditional request would skip them entirely
+                path = rng.choice(PAGES)
+                record("pages", *request(base_url, path))
+                continue
+            name, path, body = heavy_request(rng, study_ids)
+            record(name, *request(base_url, path, body))
+
+    def probe_client():
+        rng = random.Random(seed)
+        while time.time() < stop:
+            path = rng.choice(CHEAP_ROUTES).format(id=rng.choice(probe_ids))
+            record("cheap routes", *request(base_url, path))
+            time.sleep(PROBE_INTERVAL)
+
+    threads = [threading.Thread(target=heavy_client, args=(seed + i + 1,)) for i in range(heavy_clients)]
+    threads.append(threading.Thread(target=probe_client))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def percentile(values:list, q:float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def print_results(title:str, results:dict, duration:float):
+    print(f"\n{title}")
+    print(f"  {'route':<22} {'requests':>8} {'per s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for name in sorted(results, key=lambda name: (name != "cheap routes", name)):
+        seconds = results[name]["seconds"]
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(results[name]["statuses"].items()))
+        print(f"  {name:<22} {len(seconds):>8} {len(seconds) / duration:>7.1f} {percentile(seconds, 50) * 1e3:>8.1f} "
+              f"{percentile(seconds, 95) * 1e3:>8.1f} {percentile(seconds, 99) * 1e3:>8.1f} {max(seconds) * 1e3:>8.1f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app: bursts of expensive similarity requests and pages, "
+                                                 "while a single client measures the latency of the cheap routes.")
+    parser.add_argument("--url", help="test a running app at this URL instead of starting one")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2],
+                        help="OFFLOAD_WORKERS of the apps to start and compare, 0 computes in the request threads")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds of load per run")
+    parser.add_argument("--heavy-clients", type=int, default=DEFAULT_HEAVY_CLIENTS, help="concurrent clients sending expensive requests")
+    parser.add_argument("--studies", type=int, help="serve random similarity matrices of this many studies instead of the real ones")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        results = run_load(args.url.rstrip("/"), args.duration, args.heavy_clients, args.seed)
+        print_results(f"{args.url}, {args.heavy_clients} heavy clients", results, args.duration)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app_dir = BASE_DIR
+        if args.studies:
+            print(f"Writing similarity matrices of {args.studies} studies")
+            app_dir = tmp
+            synthetic_app(args.studies, app_dir, args.seed)
+
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(port, workers, app_dir)
+            try:
+                results = run_load(f"http://127.0.0.1:{port}", args.duration, args.heavy_clients, args.seed)
+            finally:
+                server.terminate()
+                server.wait()
+            print_results(f"OFFLOAD_WORKERS={workers}, {args.heavy_clients} heavy clients" + (f", {args.studies} studies" if args.studies else ""),
+                          results, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity_blend import decode_upper_triangle, load_blended_similarity  # noqa: E402
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIMILARITY_PATHS = {
+    'abstract': os.path.join(BASE_DIR, "abstract_similarity_datasets/normalized_abstract_similarity.csv"),
+    'database': os.path.join(BASE_DIR, "database_similarity_datasets/normalized_database_similarity.csv"),
+}
+
+
+def legacy_payload(similarity) -> bytes:
+    # Both full matrices as JSON with 'N/A' for missing values, as the similarity page embedded them before /api/similarity
+    payload = {}
+    for name, matrix in similarity.matrices.items():
+        payload[f'{name}_study_ids'] = [str(i) for i in similarity.ids]
+        payload[f'{name}_index_ids'] = similarity.ids
+        payload[f'{name}_matrix'] = [['N/A' if np.isnan(value) else value for value in row] for row in matrix.tolist()]
+    return json.dumps(payload).encode("utf-8")
+
+
+def report_row(name:str, payload:bytes, legacy_size:int, error:float = None):
+    compressed = len(gzip.compress(payload))
+    error_text = f"{error:10.5f}" if error is not None else f"{'-':>10}"
+    print(f"{name:<40} {len(payload):>10,} {compressed:>10,} {legacy_size / len(payload):>8.1f}x {error_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the size of the similarity payloads of the similarity view.")
+    parser.add_argument("--threshold", type=float, default=1.0, help="threshold of the edge payloads")
+    args = parser.parse_args()
+
+    similarity = load_blended_similarity(SIMILARITY_PATHS)
+    legacy = legacy_payload(similarity)
+    print(f"{len(similarity.ids)} studies, sizes in bytes (raw and gzip), reduction against the legacy JSON, largest quantization error")
+    print(f"{'payload':<40} {'raw':>10} {'gzip':>10} {'smaller':>9} {'max error':>10}")
+    report_row("legacy JSON, both full matrices", legacy, len(legacy))
+
+    for name in similarity.matrices:
+        for bits in (16, 8):
+            payload = similarity.encoded_matrix({name: 1}, bits)
+            _, decoded = decode_upper_triangle(payload)
+            error = np.nanmax(np.abs(decoded - similarity.matrices[name]))
+            report_row(f"{name} binary, {bits} bit", payload, len(legacy), error)
+
+    for weights in ({'abstract': 1}, {'database': 1}, {'abstract': 0.5, 'database': 0.5}):
+        payload = json.dumps(similarity.edges(weights, None, args.threshold)).encode("utf-8")
+        label = " + ".join(f"{weight:g} {name}" for name, weight in weights.items())
+        report_row(f"edges >= {args.threshold:g}, {label}", payload, len(legacy))
+
+
+if __name__ == "__main__":
+    main()
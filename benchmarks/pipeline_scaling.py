@@ -0,0 +1,336 @@
+import argparse
+import cProfile
+import hashlib
+import itertools
+import json
+import os
+import platform
+import pstats
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from citation_metrics import compute_citation_metrics  # noqa: E402
+from similarity_engine import encode_embeddings, pairwise_similarity  # noqa: E402
+from study_schema import multi_value_and_string_columns, numeric_cols, single_value_columns, transform_value  # noqa: E402
+from study_store import MISSING, build_study_store, load_study_store  # noqa: E402
+from update_similarity_matrices_and_author_connections import (  # noqa: E402
+    calculate_similarity, coauthor_pairs, database_similarity_features, standard_normalize, standardize_off_diagonal)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipeline_baseline.json")
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+# Gemini embeddings have 3072 dimensions, the default keeps the synthetic ones small enough for 50k studies
+DEFAULT_EMBEDDING_DIM = 768
+
+# The legacy calculate_similarity is timed on this many random pairs and extrapolated to all pairs
+DEFAULT_PAIR_SAMPLE = 2000
+
+# Full n x n matrices are only built while they (and the copies normalization makes) fit into this many bytes,
+# larger corpora are computed in row blocks into memory-mapped top-k files as similarity_engine.py does
+DEFAULT_MEMORY_LIMIT_GB = 2.0
+FULL_MATRIX_COPIES = 3
+
+# Top-k neighbours kept per study when the full matrices do not fit
+TOP_K = 20
+
+# Average number of citations of a synthetic study to earlier studies, and of authors per study
+CITATIONS_PER_STUDY = 4
+AUTHORS_PER_STUDY = 5
+
+# Size of the author pool per study and the exponent of its Zipf-like popularity, chosen like the real
+# corpus (about 4 distinct authors per study) so the busiest author's papers grow with the square root of n
+AUTHOR_POOL_PER_STUDY = 4
+AUTHOR_POPULARITY_EXPONENT = 0.5
+
+# A stage counts as regressed if it is this much slower than the baseline
+DEFAULT_MAX_SLOWDOWN = 1.5
+
+WORDS = ("earable interaction gesture sensing head mouth ear canal microphone accelerometer study users recognition "
+         "accuracy wearable hands-free eyes-free discreet input device audio vibration prototype evaluation").split()
+
+
+## Synthetic data
+
+def column_vocabularies(store) -> dict:
+    """Values of every categorical column of the real database, the synthetic studies draw from them."""
+    vocabularies = {}
+    for column in store.single_columns + store.multi_columns:
+        vocabularies[column] = [value for value in store.categories[column] if value != MISSING] or [MISSING]
+    return vocabularies
+
+
+def synthetic_authors(n_authors:int, rng:random.Random) -> list:
+    # Every author has a full and an abbreviated spelling, so author resolution has variants to merge
+    first_names = ["Anna", "Ben", "Chen", "David", "Eva", "Felix", "Greta", "Hao", "Ines", "Jonas", "Kai", "Lena"]
+    authors = []
+    for i in range(n_authors):
+        first = rng.choice(first_names)
+        surname = f"{rng.choice(['Sch', 'M', 'B', 'K', 'W', 'H'])}{rng.choice(['ull', 'ei', 'au', 'ra'])}{i:05d}"
+        authors.append((f"{first} {surname}", f"{first[0]}. {surname}"))
+    return authors
+
+
+def synthetic_corpus(n:int, store, seed:int = 0) -> pd.DataFrame:
+    """A data.csv with n studies whose values follow the vocabulary of the real database."""
+    rng = random.Random(seed)
+    vocabularies = column_vocabularies(store)
+    # Few prolific and many occasional authors, like in the real corpus
+    authors = synthetic_authors(AUTHOR_POOL_PER_STUDY * n, rng)
+    author_weights = list(itertools.accumulate((rank + 1) ** -AUTHOR_POPULARITY_EXPONENT for rank in range(len(authors))))
+
+    rows = []
+    for study_id in range(1, n + 1):
+        row = {'ID': str(study_id)}
+        for column in store.columns:
+            if column == 'ID':
+                continue
+            if column == 'Year':
+                row[column] = str(rng.randint(2003, 2025))
+            elif column == 'Interaction_PANEL_Number of Selected Gestures':
+                row[column] = str(rng.choice([1, 2, 3, 4, 6, 8, 10, 12, 20, 40]))
+            elif column == 'Authors':
+                chosen = rng.choices(authors, cum_weights=author_weights, k=rng.randint(1, 2 * AUTHORS_PER_STUDY - 1))
+                row[column] = ", ".join(rng.choice(spellings) for spellings in chosen)
+            elif column in ('Abstract', 'Title'):
+                row[column] = " ".join(rng.choices(WORDS, k=120 if column == 'Abstract' else 8))
+            elif column == 'Study Link':
+                row[column] = f"https://doi.org/10.0000/synthetic.{study_id}"
+            elif column in store.multi_columns:
+                values = vocabularies[column]
+                row[column] = ", ".join(rng.sample(values, min(len(values), rng.randint(1, 3))))
+            else:
+                row[column] = rng.choice(vocabularies.get(column, [MISSING]))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=store.columns)
+
+
+def stub_embedding(abstract:str, dim:int) -> np.ndarray:
+    # Stands in for the Gemini API: deterministic per abstract, no network access
+    seed = int.from_bytes(hashlib.sha256(abstract.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def synthetic_citations(n:int, seed:int = 0):
+    """Random citation graph where every study cites about CITATIONS_PER_STUDY earlier studies."""
+    from scipy import sparse
+
+    rng = np.random.default_rng(seed)
+    citing = np.repeat(np.arange(1, n), rng.poisson(CITATIONS_PER_STUDY, n - 1)) if n > 1 else np.zeros(0, dtype=np.int64)
+    cited = (rng.random(len(citing)) * citing).astype(np.int64)
+    return sparse.csr_matrix((np.ones(len(citing)), (citing, cited)), shape=(n, n))
+
+
+## Measurement
+
+class StageTimer:
+    """Times stages and records their peak traced memory, optionally profiling them with cProfile."""
+
+    def __init__(self, profile_dir:str = None, label:str = ""):
+        self.results = {}
+        self.profile_dir = profile_dir
+        self.label = label
+
+    def run(self, name:str, func, note:str = None):
+        profiler = cProfile.Profile() if self.profile_dir else None
+        tracemalloc.start()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            value = func()
+        finally:
+            if profiler:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self.results[name] = {'seconds': round(seconds, 4), 'peak_mb': round(peak / 2**20, 1)}
+        if note:
+            self.results[name]['note'] = note
+        if profiler:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{self.label}_{name}.prof")
+            profiler.dump_stats(path)
+            write_collapsed_stacks(pstats.Stats(profiler), path[:-len(".prof")] + ".folded")
+        print(f"  {name:<24} {seconds:9.3f} s {peak / 2**20:9.1f} MB" + (f"  ({note})" if note else ""))
+        return value
+
+
+def write_collapsed_stacks(stats:pstats.Stats, path:str):
+    """Write caller;callee lines weighted by the callee's own time in microseconds, in the folded format of
+    flamegraph.pl and speedscope. cProfile only knows direct callers, so the stacks are two frames deep."""
+    lines = []
+    for (filename, line, function), (_, _, own_time, _, callers) in stats.stats.items():
+        frame = f"{function} ({os.path.basename(filename)}:{line})"
+        if not callers:
+            lines.append((frame, own_time))
+        for (caller_file, caller_line, caller_function), caller_stats in callers.items():
+            # Own time of the callee spent in calls from this caller
+            lines.append((f"{caller_function} ({os.path.basename(caller_file)}:{caller_line});{frame}", caller_stats[2]))
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, seconds in sorted(lines):
+            if seconds > 0:
+                f.write(f"{stack} {int(seconds * 1e6)}\n")
+
+
+def benchmark_size(n:int, store, args) -> dict:
+    print(f"{n} studies")
+    timer = StageTimer(args.profile, f"n{n}")
+    fits_in_memory = n * n * 8 * FULL_MATRIX_COPIES <= args.memory_limit * 2**30
+    full_matrix_gb = n * n * 8 / 2**30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "data.csv")
+        corpus = synthetic_corpus(n, store, seed=args.seed)
+        corpus.to_csv(data_path, index=False)
+
+        synthetic_store = timer.run('study_store', lambda: build_study_store(data_path))
+
+        # Recoding of the single-value answers ("Yes (N=12)" -> 1.0), as the ingestion validates them
+        recode_columns = [c for c in single_value_columns if c in corpus.columns]
+        timer.run('transform_value', lambda: corpus[recode_columns].map(transform_value))
+
+        # The legacy per-pair Python similarity, on a sample of pairs
+        rng = random.Random(args.seed)
+        features = pd.read_csv(data_path, usecols=['ID'] + numeric_cols + multi_value_and_string_columns)
+        records = features.to_dict(orient='records')
+        pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(args.pair_sample)]
+        timer.run('calculate_similarity', lambda: [calculate_similarity(records[i], records[j], numeric_cols, multi_value_and_string_columns)
+                                                   for i, j in pairs])
+        sampled = timer.results['calculate_similarity']['seconds']
+        all_pairs = n * (n - 1) / 2
+        timer.results['calculate_similarity']['extrapolated_seconds'] = round(sampled / len(pairs) * all_pairs, 1)
+        timer.results['calculate_similarity']['note'] = f"{len(pairs)} sampled pairs, {sampled / len(pairs) * all_pairs:.0f} s for all pairs"
+        print(f"  {'':<24} {sampled / len(pairs) * all_pairs:9.1f} s extrapolated to all {all_pairs:.0f} pairs")
+
+        database_features = timer.run('database_features', lambda: database_similarity_features(synthetic_store))
+        if fits_in_memory:
+            database = timer.run('database_similarity', lambda: pd.DataFrame(
+                pairwise_similarity('database', database_features, n, diagonal=1.0, dtype=np.float64)))
+            timer.run('normalization', lambda: standardize_off_diagonal(database))
+            del database
+        else:
+            note = f"top-{TOP_K} in blocks, the full matrix needs {full_matrix_gb:.1f} GB"
+            timer.run('database_similarity', lambda: pairwise_similarity(
+                'database', database_features, n, os.path.join(tmp, "database.npy"), mode="topk", top_k=TOP_K, max_workers=args.workers), note)
+
+        abstracts = synthetic_store.text['Abstract']
+        embeddings = timer.run('embeddings', lambda: np.vstack([stub_embedding(abstract, args.dim) for abstract in abstracts]),
+                               "stubbed API, random vectors")
+        encoded = encode_embeddings(embeddings)
+        if fits_in_memory:
+            abstract = timer.run('cosine_similarity', lambda: pd.DataFrame(pairwise_similarity('cosine', encoded, n, dtype=np.float64)))
+            np.fill_diagonal(abstract.values, np.nan)
+            timer.run('abstract_normalization', lambda: standard_normalize(abstract))
+            del abstract
+        else:
+            note = f"top-{TOP_K} in blocks, the full matrix needs {full_matrix_gb:.1f} GB"
+            timer.run('cosine_similarity', lambda: pairwise_similarity(
+                'cosine', encoded, n, os.path.join(tmp, "abstract.npy"), mode="topk", top_k=TOP_K, max_workers=args.workers), note)
+        del embeddings, encoded
+
+        authors = synthetic_store.frame(['ID', 'Authors'])
+        pairs = timer.run('coauthor_pairs', lambda: coauthor_pairs(authors))
+        timer.results['coauthor_pairs']['note'] = f"{len(pairs)} coauthor links"
+
+        citations = synthetic_citations(n, args.seed)
+        coauthors = synthetic_coauthor_matrix(pairs, n)
+        years = synthetic_store.numeric['Year']
+        timer.run('citation_metrics', lambda: compute_citation_metrics(citations, coauthors, synthetic_store.ids, years),
+                  f"{citations.nnz} citations")
+
+    timer.results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return timer.results
+
+
+def synthetic_coauthor_matrix(pairs:list, n:int):
+    from scipy import sparse
+
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2) - 1
+    return sparse.csr_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+
+
+## Baseline
+
+def compare_with_baseline(results:dict, baseline:dict, max_slowdown:float) -> list:
+    """Print the change of every stage against the baseline, returns the regressed (size, stage) pairs."""
+    regressions = []
+    print(f"\nCompared with the baseline from {baseline.get('created', 'unknown date')} ({baseline.get('machine', 'unknown machine')})")
+    for size, stages in results['sizes'].items():
+        baseline_stages = baseline['sizes'].get(size)
+        if baseline_stages is None:
+            continue
+        for stage, measurement in stages.items():
+            if not isinstance(measurement, dict) or stage not in baseline_stages:
+                continue
+            before, after = baseline_stages[stage]['seconds'], measurement['seconds']
+            # Stages taking a few milliseconds are too noisy to compare
+            if max(before, after) < 0.05:
+                continue
+            ratio = after / before if before > 0 else float('inf')
+            flag = "  REGRESSION" if ratio > max_slowdown else ""
+            print(f"  {size:>6} {stage:<24} {before:9.3f} s -> {after:9.3f} s  {ratio:5.2f}x{flag}")
+            if ratio > max_slowdown:
+                regressions.append((size, stage))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the stages of the update pipeline on synthetic corpora of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of studies to benchmark")
+    parser.add_argument("--dim", type=int, default=DEFAULT_EMBEDDING_DIM, help="dimensions of the random embeddings")
+    parser.add_argument("--pair-sample", type=int, default=DEFAULT_PAIR_SAMPLE, help="pairs timed with calculate_similarity")
+    parser.add_argument("--memory-limit", type=float, default=DEFAULT_MEMORY_LIMIT_GB,
+                        help="GB the full similarity matrices may use before switching to blocked top-k")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes of the blocked similarity")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile .prof and folded stacks per stage into DIR")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help="exit with status 1 if a stage is this much slower than in the baseline")
+    args = parser.parse_args()
+
+    store = load_study_store()
+    results = {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'machine': f"{platform.machine()}, {os.cpu_count()} CPUs, Python {platform.python_version()}, NumPy {np.__version__}",
+        'embedding_dim': args.dim,
+        'sizes': {},
+    }
+    for n in args.sizes:
+        results['sizes'][str(n)] = benchmark_size(n, store, args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved the baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f), args.max_slowdown)
+
+    if regressions:
+        print(f"\n{len(regressions)} stages are more than {args.max_slowdown}x slower than the baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Parsed references are cached per .bib file and only recomputed when the file content changes
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".bibtex_cache")
+
+# Bump when the record format changes so stale caches are ignored
+CACHE_VERSION = 1
+
+# Below this number of files to parse, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 16
+
+_FIELD_PATTERN = re.compile(r"[,{]\s*([A-Za-z][\w-]*)\s*=\s*")
+
+
+def _read_braced_value(text: str, start: int):
+    # Read a value starting at text[start] that is either {balanced braces}, "quoted" or a bare word
+    if start >= len(text):
+        return "", start
+    if text[start] == "{":
+        depth = 0
+        for end in range(start, len(text)):
+            if text[end] == "{":
+                depth += 1
+            elif text[end] == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start + 1:end], end + 1
+        return text[start + 1:], len(text)
+    if text[start] == '"':
+        end = text.find('"', start + 1)
+        end = len(text) if end == -1 else end
+        return text[start + 1:end], end + 1
+    match = re.match(r"[^,}\s]*", text[start:])
+    return match.group(0), start + match.end()
+
+
+def parse_bibtex_fields(entry: str) -> dict:
+    """Return the lowercased field names and raw values of a single BibTeX entry."""
+    fields = {}
+    position = 0
+    while True:
+        match = _FIELD_PATTERN.search(entry, position)
+        if not match:
+            break
+        value, position = _read_braced_value(entry, match.end())
+        fields.setdefault(match.group(1).lower(), value)
+    return fields
+
+
+def normalize_title(title: str) -> str:
+    title = re.sub(r"[{}]", "", title.lower())
+    title = re.sub(r"[^\w\s]", "", title)
+    return " ".join(title.split())
+
+
+def author_last_names(authors: list) -> list:
+    return [a.split(',')[0].lower().strip() if ',' in a else a.split()[-1].lower().strip()
+            for a in authors if a.strip()]
+
+
+def normalize_reference(fields: dict) -> dict:
+    # Bring corpus entries and extracted references into the same comparable form
+    authors = [a.strip() for a in re.sub(r"\s+", " ", fields.get('author', '')).split(' and ') if a.strip()]
+    year_match = re.search(r"\d{4}", fields.get('year', ''))
+    return {
+        'authors': authors,
+        'author_last_names': author_last_names(authors),
+        'title': normalize_title(fields.get('title', '')),
+        'year': year_match.group(0) if year_match else '',
+        'journal': fields.get('journal', fields.get('booktitle', '')).lower(),
+        'doi': fields.get('doi', '').strip().lower(),
+    }
+
+
+def iter_bibtex_entries(lines):
+    """Yield the raw text of each entry in a single pass over an iterable of lines.
+
+    GROBID output is full of OCR noise, so an entry with unbalanced braces is closed as soon as
+    the next line starts with "@" instead of swallowing the rest of the file.
+    """
+    entry_lines = []
+    depth = 0
+    opened = False
+    for line in lines:
+        if line.startswith("@"):
+            if entry_lines:
+                yield "".join(entry_lines)
+            entry_lines = []
+            depth = 0
+            opened = False
+        elif not entry_lines:
+            # Text between entries (comments, blank lines) is ignored
+            continue
+
+        entry_lines.append(line)
+        depth += line.count("{") - line.count("}")
+        opened = opened or "{" in line
+        if opened and depth <= 0:
+            yield "".join(entry_lines)
+            entry_lines = []
+            depth = 0
+            opened = False
+
+    if entry_lines:
+        yield "".join(entry_lines)
+
+
+def iter_references(path: str):
+    """Yield one normalized reference record per entry of a .bib file."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for entry in iter_bibtex_entries(f):
+            yield normalize_reference(parse_bibtex_fields(entry))
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    # The directory hash keeps equally named files from different folders apart
+    directory_hash = hashlib.sha1(os.path.abspath(os.path.dirname(path)).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{directory_hash}.json")
+
+
+def _load_cached(path: str, cache_dir: str):
+    # Return the cached references if the file is unchanged, None otherwise
+    cache_path = _cache_path(path, cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != CACHE_VERSION:
+        return None
+
+    mtime = os.path.getmtime(path)
+    if cached.get("mtime") == mtime:
+        return cached["references"]
+
+    # A touched but unchanged file (e.g. after a fresh checkout) only costs a hash, not a parse
+    if cached.get("sha1") == _file_hash(path):
+        cached["mtime"] = mtime
+        _write_cache(path, cache_dir, cached)
+        return cached["references"]
+    return None
+
+
+def _write_cache(path: str, cache_dir: str, cached: dict):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = _cache_path(path, cache_dir) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cached, f)
+    os.replace(tmp_path, _cache_path(path, cache_dir))
+
+
+def _parse_file(path: str) -> dict:
+    # Runs in a worker process, returns the complete cache record
+    return {
+        "version": CACHE_VERSION,
+        "mtime": os.path.getmtime(path),
+        "sha1": _file_hash(path),
+        "references": list(iter_references(path)),
+    }
+
+
+def read_bibtex_files(paths, cache_dir=CACHE_DIR, max_workers=None) -> dict:
+    """Return {path: [references]} for all paths, parsing only files that changed since the last run."""
+    results = {}
+    to_parse = []
+    for path in paths:
+        cached = _load_cached(path, cache_dir) if cache_dir else None
+        if cached is None:
+            to_parse.append(path)
+        else:
+            results[path] = cached
+
+    if len(to_parse) >= PARALLEL_MIN_FILES and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = list(executor.map(_parse_file, to_parse, chunksize=8))
+    else:
+        parsed = [_parse_file(path) for path in to_parse]
+
+    for path, record in zip(to_parse, parsed):
+        if cache_dir:
+            _write_cache(path, cache_dir, record)
+        results[path] = record["references"]
+
+    return {path: results[path] for path in paths}
@@ -0,0 +1,266 @@
+import argparse
+import difflib
+import glob
+import os
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+from bibtex_reader import normalize_reference, parse_bibtex_fields, read_bibtex_files
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Scores at or above the first threshold are accepted directly, the ones between both need manual confirmation
+HIGH_CONFIDENCE_THRESHOLD = 0.7
+UNCERTAIN_THRESHOLD = 0.5
+
+# A title only becomes a candidate if it shares this fraction of character trigrams with the citation title
+MIN_TITLE_TRIGRAM_OVERLAP = 0.3
+
+# Trigrams that occur in more than this fraction of the corpus titles carry no signal ("ing", "the", ...)
+MAX_TRIGRAM_DOCUMENT_FREQUENCY = 0.2
+
+CONFIRMATION_COLUMNS = ['citing_id', 'citing_filename', 'cited_id', 'cited_filename', 'score', 'citation_title', 'citation_authors',
+                        'citation_year', 'confidence', 'matching_authors', 'title_similarity', 'year_match', 'confirmed']
+
+
+def title_trigrams(title: str) -> set:
+    padded = f" {title} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CorpusIndex:
+    """Lookup structures over the corpus so each reference is only scored against plausible candidates.
+
+    A reference is compared to the corpus papers with the same DOI, a similar title (shared character
+    trigrams) or a shared (author surname, year) block. Every pair that can reach the high-confidence
+    threshold falls into one of these, only weak uncertain matches (one shared surname, different year,
+    dissimilar title) are no longer proposed for manual confirmation.
+    """
+
+    def __init__(self, corpus_entries:dict):
+        self.entries = corpus_entries
+        self.doi_index = {}
+        self.trigram_index = defaultdict(set)
+        self.trigrams = {}
+        self.surname_year_index = defaultdict(set)
+        self.surname_index = defaultdict(set)
+
+        for paper_id, entry in corpus_entries.items():
+            if entry['doi']:
+                self.doi_index[entry['doi']] = paper_id
+            if entry['title']:
+                self.trigrams[paper_id] = title_trigrams(entry['title'])
+                for trigram in self.trigrams[paper_id]:
+                    self.trigram_index[trigram].add(paper_id)
+            for surname in entry['author_last_names']:
+                self.surname_index[surname].add(paper_id)
+                if entry['year']:
+                    self.surname_year_index[(surname, entry['year'])].add(paper_id)
+
+        # Drop trigrams that are too common to discriminate between titles
+        max_postings = max(1, int(MAX_TRIGRAM_DOCUMENT_FREQUENCY * len(self.trigrams)))
+        self.stop_trigrams = {t for t, postings in self.trigram_index.items() if len(postings) > max_postings}
+
+    def candidates(self, citation:dict) -> set:
+        candidates = set()
+
+        if citation['title']:
+            citation_trigrams = title_trigrams(citation['title'])
+            shared = defaultdict(int)
+            for trigram in citation_trigrams - self.stop_trigrams:
+                for paper_id in self.trigram_index.get(trigram, ()):
+                    shared[paper_id] += 1
+            for paper_id, count in shared.items():
+                if count >= MIN_TITLE_TRIGRAM_OVERLAP * min(len(citation_trigrams), len(self.trigrams[paper_id])):
+                    candidates.add(paper_id)
+
+        # Without a year (or without a title to fall back on) authors are the only usable block
+        for surname in citation['author_last_names']:
+            if citation['year'] and citation['title']:
+                candidates |= self.surname_year_index.get((surname, citation['year']), set())
+                # Corpus entries without a year can still match on authors and title
+                candidates |= {p for p in self.surname_index.get(surname, ()) if not self.entries[p]['year']}
+            else:
+                candidates |= self.surname_index.get(surname, set())
+
+        return candidates
+
+
+def score_candidate(citation:dict, paper:dict):
+    # Same weighting as the original notebook: authors (2 points), year (1 point), title (5 points)
+    score = 0
+    max_score = 0
+    match_details = {}
+
+    if citation['author_last_names'] and paper['author_last_names']:
+        max_score += 2
+        matching_authors = set(citation['author_last_names']) & set(paper['author_last_names'])
+        if matching_authors:
+            score += min(2, len(matching_authors))
+            match_details['matching_authors'] = sorted(matching_authors)
+
+    if citation['year'] and paper['year']:
+        max_score += 1
+        if citation['year'] == paper['year']:
+            score += 1
+            match_details['year_match'] = True
+
+    if citation['title'] and paper['title']:
+        max_score += 5
+        title_similarity = difflib.SequenceMatcher(None, citation['title'], paper['title']).ratio()
+        # Titles contained in each other count as a good match (subtitles, OCR truncation)
+        if len(citation['title']) > 10 and len(paper['title']) > 10:
+            if citation['title'] in paper['title'] or paper['title'] in citation['title']:
+                title_similarity = max(title_similarity, 0.8)
+        score += title_similarity * 5
+        match_details['title_similarity'] = title_similarity
+
+    # A matching year alone is no evidence, it would otherwise score 1.0 against every paper of that year
+    if 'title_similarity' not in match_details and 'matching_authors' not in match_details:
+        return 0, match_details
+
+    return score / max_score, match_details
+
+
+def match_citation_to_corpus(citation:dict, index:CorpusIndex, citing_paper_id, threshold=UNCERTAIN_THRESHOLD) -> list:
+    """Return the corpus matches for a citation sorted by score, best first."""
+    if citation['doi'] and citation['doi'] in index.doi_index:
+        paper_id = index.doi_index[citation['doi']]
+        if paper_id != citing_paper_id:
+            return [{'paper_id': paper_id, 'score': 1.0, 'details': {'match_type': 'doi'}}]
+
+    matches = []
+    for paper_id in index.candidates(citation):
+        # Skip self-citations
+        if paper_id == citing_paper_id:
+            continue
+        score, details = score_candidate(citation, index.entries[paper_id])
+        if score >= threshold:
+            matches.append({'paper_id': paper_id, 'score': score, 'details': details})
+
+    matches.sort(key=lambda m: (-m['score'], m['paper_id']))
+    return matches
+
+
+def load_corpus(mapping_path:str) -> dict:
+    df_id_bibtex = pd.read_excel(mapping_path)
+    corpus_entries = {}
+    for paper_id, bibtex_str in zip(df_id_bibtex['ID'], df_id_bibtex['Bibtex']):
+        if isinstance(bibtex_str, str) and bibtex_str:
+            corpus_entries[int(paper_id)] = normalize_reference(parse_bibtex_fields(bibtex_str))
+    return corpus_entries
+
+
+def load_extracted_references(citations_dir:str) -> dict:
+    # paper_<ID>_citations.bib -> {ID: [references]}, unchanged files come from the parse cache
+    paths = {}
+    for path in glob.glob(os.path.join(citations_dir, "paper_*_citations.bib")):
+        match = re.search(r"paper_(\d+)_citations\.bib$", path)
+        if match:
+            paths[int(match.group(1))] = path
+    parsed = read_bibtex_files(list(paths.values()))
+    return {paper_id: parsed[path] for paper_id, path in sorted(paths.items())}
+
+
+def build_citation_matrix(corpus_entries:dict, paper_references:dict, pdf_names:dict = None):
+    """Match all references and return the citation matrix plus the high-confidence and uncertain matches."""
+    pdf_names = pdf_names or {}
+    index = CorpusIndex(corpus_entries)
+    paper_ids = list(corpus_entries.keys())
+    citation_matrix = pd.DataFrame(0, index=paper_ids, columns=paper_ids)
+
+    high_confidence_matches = []
+    uncertain_matches = []
+    for citing_id, references in paper_references.items():
+        if citing_id not in corpus_entries:
+            continue
+        for ref in references:
+            matches = match_citation_to_corpus(ref, index, citing_id)
+            if not matches:
+                continue
+
+            best_match = matches[0]
+            details = best_match['details']
+            row = {
+                'citing_id': citing_id,
+                'citing_filename': pdf_names.get(citing_id, f"Unknown-{citing_id}"),
+                'cited_id': best_match['paper_id'],
+                'cited_filename': pdf_names.get(best_match['paper_id'], f"Unknown-{best_match['paper_id']}"),
+                'score': best_match['score'],
+                'citation_title': ref['title'],
+                'citation_authors': ', '.join(ref['authors']),
+                'citation_year': ref['year'],
+                'matching_authors': ', '.join(details.get('matching_authors', [])),
+                'title_similarity': details.get('title_similarity', 0),
+                'year_match': 'Yes' if details.get('year_match', False) else 'No',
+            }
+
+            if best_match['score'] >= HIGH_CONFIDENCE_THRESHOLD:
+                citation_matrix.loc[citing_id, best_match['paper_id']] = 1
+                high_confidence_matches.append({**row, 'confidence': 'high', 'confirmed': 'Yes'})
+            else:
+                uncertain_matches.append({**row, 'confidence': 'medium', 'confirmed': ''})
+
+    return citation_matrix, high_confidence_matches, uncertain_matches
+
+
+def export_confirmation_sheet(uncertain_matches:list, path:str):
+    # First row holds the instructions, import_citation_confirmations skips it again
+    instructions = {column: '' for column in CONFIRMATION_COLUMNS}
+    instructions.update({'citing_id': 'INSTRUCTIONS', 'citing_filename': 'Fill in the "confirmed" column with: Yes, No, or leave blank to skip'})
+    export_df = pd.DataFrame([instructions] + uncertain_matches, columns=CONFIRMATION_COLUMNS)
+    export_df.to_excel(path, index=False)
+
+
+def import_citation_confirmations(citation_matrix:pd.DataFrame, confirmation_path:str) -> pd.DataFrame:
+    """Apply the manually filled-in confirmation sheet to the citation matrix."""
+    confirmations = pd.read_excel(confirmation_path, header=0, skiprows=[1])
+    counts = {'yes': 0, 'no': 0, 'skipped': 0}
+    for citing_id, cited_id, confirmation in zip(confirmations['citing_id'], confirmations['cited_id'], confirmations['confirmed']):
+        confirmation = str(confirmation).strip().lower()
+        if confirmation in ('yes', 'no'):
+            citation_matrix.loc[int(citing_id), int(cited_id)] = 1 if confirmation == 'yes' else 0
+            counts[confirmation] += 1
+        else:
+            counts['skipped'] += 1
+    print(f"Confirmed: {counts['yes']}, rejected: {counts['no']}, skipped: {counts['skipped']}")
+    return citation_matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match GROBID-extracted references against the corpus and build the citation matrix.")
+    parser.add_argument("--citations-dir", default=os.path.join(BASE_DIR, "extracted_citations"))
+    parser.add_argument("--mapping", default=os.path.join(BASE_DIR, "interconnections_datasets/bibtex_mapping_of_ids.xlsx"))
+    parser.add_argument("--output-dir", default=os.path.join(BASE_DIR, "interconnections_datasets"))
+    parser.add_argument("--confirmation-sheet", default=os.path.join(BASE_DIR, "citation_confirmation.xlsx"))
+    parser.add_argument("--apply-confirmations", action="store_true",
+                        help="apply the filled-in confirmation sheet to citation_matrix_initial.csv and write citation_matrix.csv")
+    args = parser.parse_args()
+
+    initial_matrix_path = os.path.join(args.output_dir, "citation_matrix_initial.csv")
+
+    if args.apply_confirmations:
+        citation_matrix = pd.read_csv(initial_matrix_path, index_col=0)
+        citation_matrix.columns = citation_matrix.columns.astype(int)
+        citation_matrix = import_citation_confirmations(citation_matrix, args.confirmation_sheet)
+        citation_matrix.to_csv(os.path.join(args.output_dir, "citation_matrix.csv"))
+        return
+
+    corpus_entries = load_corpus(args.mapping)
+    paper_references = load_extracted_references(args.citations_dir)
+    print(f"Matching {sum(len(r) for r in paper_references.values())} references from {len(paper_references)} papers against {len(corpus_entries)} corpus entries")
+
+    citation_matrix, high_confidence_matches, uncertain_matches = build_citation_matrix(corpus_entries, paper_references)
+    citation_matrix.to_csv(initial_matrix_path)
+    print(f"{len(high_confidence_matches)} high-confidence citations saved to {initial_matrix_path}")
+
+    if uncertain_matches:
+        export_confirmation_sheet(uncertain_matches, args.confirmation_sheet)
+        print(f"{len(uncertain_matches)} uncertain matches exported to {args.confirmation_sheet}")
+        print("Fill in the 'confirmed' column, then rerun with --apply-confirmations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+BASE_DIR = os.path.dirname(__file__)
+
+CITATION_MATRIX_PATH = os.path.join(BASE_DIR, "interconnections_datasets/citation_matrix.csv")
+COAUTHOR_MATRIX_PATH = os.path.join(BASE_DIR, "interconnections_datasets/coauthor_matrix.csv")
+
+# Probability of following a citation instead of jumping to a random study
+PAGERANK_DAMPING = 0.85
+
+# PageRank stops once the ranks change by less than this in total (L1)
+PAGERANK_TOLERANCE = 1e-10
+PAGERANK_MAX_ITERATIONS = 200
+
+METRIC_COLUMNS = ['ID', 'Cites', 'Cited By', 'PageRank', 'Cites Transitively', 'Cited By Transitively',
+                  'Coauthor Links', 'Coauthor Component', 'Coauthor Component Size', 'Cites Later Studies',
+                  'Cited Studies', 'Citing Studies', 'Coauthor Studies']
+
+# Cells of a matrix CSV parsed at once, so a large matrix is never held as a dense frame
+READ_CHUNK_CELLS = 2_000_000
+
+# Columns holding comma-separated study IDs, empty if there are none
+ID_LIST_COLUMNS = ['Cites Later Studies', 'Cited Studies', 'Citing Studies', 'Coauthor Studies']
+
+
+def read_adjacency(path:str, ids:list = None) -> sparse.csr_matrix:
+    """Read a 0/1 matrix CSV (first column and header are study IDs) as sparse matrix, rows and columns in the order of ids."""
+    column_ids = pd.read_csv(path, index_col=0, nrows=0).columns.astype(int)
+    row_ids, rows, columns = [], [], []
+    chunk_rows = max(1, READ_CHUNK_CELLS // max(len(column_ids), 1))
+    with pd.read_csv(path, index_col=0, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            chunk_positions, chunk_columns = np.nonzero(chunk.to_numpy() != 0)
+            rows.append(chunk_positions + len(row_ids))
+            columns.append(chunk_columns)
+            row_ids.extend(chunk.index.astype(int))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+
+    if ids is None:
+        shape = (len(row_ids), len(column_ids))
+    else:
+        # Studies missing from the matrix have no links, links of studies not in ids are dropped
+        position = {study_id: i for i, study_id in enumerate(ids)}
+        rows = np.asarray([position.get(i, -1) for i in row_ids], dtype=np.int64)[rows]
+        columns = np.asarray([position.get(i, -1) for i in column_ids], dtype=np.int64)[columns]
+        known = (rows >= 0) & (columns >= 0)
+        rows, columns, shape = rows[known], columns[known], (len(ids), len(ids))
+    return sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=shape)
+
+
+def pagerank(adjacency:sparse.csr_matrix, damping:float = PAGERANK_DAMPING) -> np.ndarray:
+    """PageRank of a directed graph with an edge i -> j for adjacency[i, j] != 0, the ranks sum to 1."""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    # Row-stochastic transition matrix, transposed so one multiplication moves the rank along the edges
+    inverse_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    transition = (sparse.diags(inverse_degree) @ adjacency).T.tocsr()
+
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        # Studies citing nothing spread their rank evenly over all studies
+        new_ranks = damping * (transition @ ranks + ranks[dangling].sum() / n) + (1 - damping) / n
+        converged = np.abs(new_ranks - ranks).sum() < PAGERANK_TOLERANCE
+        ranks = new_ranks
+        if converged:
+            break
+    return ranks / ranks.sum()
+
+
+def reach_counts(adjacency:sparse.csr_matrix) -> np.ndarray:
+    """Number of other nodes reachable from every node along the directed edges.
+
+    Computed on the condensation of the graph: the nodes of a strongly connected component reach
+    each other and everything the components they point to reach. The reached nodes are kept as
+    bitsets per component and propagated once, successors first, in O(N + E) set unions instead of
+    a breadth-first search per node.
+    """
+    n_components, labels = csgraph.connected_components(adjacency, directed=True, connection='strong')
+    sources, targets = adjacency.nonzero()
+    between = labels[sources] != labels[targets]
+    dag = sparse.csr_matrix((np.ones(between.sum(), dtype=bool), (labels[sources[between]], labels[targets[between]])),
+                            shape=(n_components, n_components))
+    predecessors = dag.T.tocsr()
+
+    # Nodes are numbered by component in the bitsets, so every component is one run of bits
+    sizes = np.bincount(labels, minlength=n_components)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    # Kahn's algorithm on the reversed edges, every component comes after all components it points to
+    remaining = np.diff(dag.indptr)
+    order = np.flatnonzero(remaining == 0).tolist()
+    for component in order:
+        for predecessor in predecessors.indices[predecessors.indptr[component]:predecessors.indptr[component + 1]]:
+            remaining[predecessor] -= 1
+            if remaining[predecessor] == 0:
+                order.append(predecessor)
+
+    # A bitset is dropped once every component pointing to it has taken it over
+    unread = np.diff(predecessors.indptr)
+    reached = {}
+    component_counts = np.zeros(n_components, dtype=np.int64)
+    for component in order:
+        bits = ((1 << int(sizes[component])) - 1) << int(offsets[component])
+        for successor in dag.indices[dag.indptr[component]:dag.indptr[component + 1]]:
+            bits |= reached[successor]
+            unread[successor] -= 1
+            if unread[successor] == 0:
+                del reached[successor]
+        component_counts[component] = bits.bit_count()
+        if unread[component] > 0:
+            reached[component] = bits
+    # A node does not count itself
+    return component_counts[labels] - 1
+
+
+def component_labels(adjacency:sparse.csr_matrix, ids:np.ndarray) -> np.ndarray:
+    """Connected component of every node, identified by the smallest ID in it so labels stay stable as studies are added."""
+    _, labels = csgraph.connected_components(adjacency, directed=False)
+    smallest = np.full(labels.max() + 1 if len(labels) else 0, np.iinfo(np.int64).max)
+    np.minimum.at(smallest, labels, ids)
+    return smallest[labels]
+
+
+def compute_citation_metrics(citations:sparse.csr_matrix, coauthors:sparse.csr_matrix, ids:list, years:list) -> pd.DataFrame:
+    """Per-study metrics of the citation graph (citations[i, j] != 0 if study i cites study j) and the coauthor graph.
+
+    Cites Later Studies lists the studies a study cites although they were published in a later
+    year, which points to a wrong match in the citation matrix. Cited Studies, Citing Studies and
+    Coauthor Studies are the neighbour lists of every study, which the timeline draws its links from.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    years = np.asarray(years, dtype=np.float64)
+    citing, cited = citations.nonzero()
+    later = years[cited] > years[citing]
+    later_citations = {}
+    for citing_position, cited_position in zip(citing[later], cited[later]):
+        later_citations.setdefault(citing_position, []).append(str(ids[cited_position]))
+
+    transposed = citations.T.tocsr()
+
+    def neighbour_lists(adjacency):
+        adjacency = adjacency.tocsr()
+        adjacency.sort_indices()
+        return [", ".join(str(i) for i in ids[adjacency.indices[start:stop]]) for start, stop in zip(adjacency.indptr[:-1], adjacency.indptr[1:])]
+
+    components = component_labels(coauthors, ids)
+    _, component_positions, component_sizes = np.unique(components, return_inverse=True, return_counts=True)
+    return pd.DataFrame({
+        'ID': ids,
+        'Cites': np.diff(citations.indptr),
+        'Cited By': np.diff(transposed.indptr),
+        'PageRank': np.round(pagerank(citations), 8),
+        'Cites Transitively': reach_counts(citations),
+        'Cited By Transitively': reach_counts(transposed),
+        'Coauthor Links': np.diff(coauthors.indptr),
+        'Coauthor Component': components,
+        'Coauthor Component Size': component_sizes[component_positions],
+        'Cites Later Studies': [", ".join(later_citations.get(position, [])) for position in range(len(ids))],
+        'Cited Studies': neighbour_lists(citations),
+        'Citing Studies': neighbour_lists(transposed),
+        'Coauthor Studies': neighbour_lists(coauthors),
+    }, columns=METRIC_COLUMNS)
+
+
+def load_citation_metrics(data_path:str = os.path.join(BASE_DIR, "data.csv"), citation_path:str = CITATION_MATRIX_PATH,
+                          coauthor_path:str = COAUTHOR_MATRIX_PATH) -> pd.DataFrame:
+    studies = pd.read_csv(data_path, usecols=['ID', 'Year'])
+    ids = studies['ID'].astype(int).tolist()
+    years = pd.to_numeric(studies['Year'], errors='coerce').tolist()
+    return compute_citation_metrics(read_adjacency(citation_path, ids), read_adjacency(coauthor_path, ids), ids, years)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the citation metrics of the studies.")
+    parser.add_argument("--top", type=int, default=10, help="number of studies with the highest PageRank to show")
+    args = parser.parse_args()
+
+    metrics = load_citation_metrics()
+    print(metrics.sort_values(['PageRank', 'ID'], ascending=[False, True]).head(args.top).to_string(index=False))
+
+    later = metrics[metrics['Cites Later Studies'] != ""]
+    print(f"\n{len(later)} studies cite studies from a later year:")
+    for _, row in later.iterrows():
+        print(f"Paper {row['ID']} cites {row['Cites Later Studies']}")
+
+
+if __name__ == "__main__":
+    main()
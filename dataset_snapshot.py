@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+import time
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Seconds between two checks of the watched files, checking only compares their size and modification time
+RELOAD_INTERVAL = 5
+
+
+class Snapshot:
+    """Immutable set of derived data built from one version of the input files.
+
+    version is a hash of the contents of all watched files, so every worker process serving the same
+    files reports the same version (e.g. in ETags).
+    """
+
+    def __init__(self, version:str, values:dict):
+        self.version = version
+        self.values = values
+        self.built_at = time.time()
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+
+class SnapshotManager:
+    """Keeps the current snapshot and swaps in a new one when its input files change.
+
+    A background thread polls the watched files and, if any of them changed, calls build() off the
+    request path. build() returns the derived values as a dict and raises if the inputs are invalid,
+    in which case the previous snapshot stays in place. The swap is a single reference assignment:
+    requests take current() once and work with that snapshot only, so a request that started before
+    a swap finishes on the old version.
+    """
+
+    def __init__(self, build, paths:list, interval:float = RELOAD_INTERVAL):
+        self.build = build
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = None
+        self.last_error = None
+        self._seen_stats = None
+        self._lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher_pid = None
+
+    def _stats(self) -> tuple:
+        stats = []
+        for path in self.paths:
+            try:
+                stat = os.stat(os.path.join(BASE_DIR, path))
+                stats.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stats.append((path, None, None))
+        return tuple(stats)
+
+    def _version(self) -> str:
+        digest = hashlib.sha256()
+        for path in self.paths:
+            digest.update(path.encode("utf-8"))
+            full_path = os.path.join(BASE_DIR, path)
+            if not os.path.exists(full_path):
+                digest.update(b"missing")
+                continue
+            with open(full_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def reload(self) -> bool:
+        """Build a snapshot of the current files and swap it in, returns whether the version changed.
+
+        Raises if building fails, the previous snapshot is kept in that case.
+        """
+        with self._lock:
+            stats = self._stats()
+            version = self._version()
+            if self.snapshot is not None and self.snapshot.version == version:
+                # Touched but identical files
+                self._seen_stats = stats
+                return False
+            try:
+                snapshot = Snapshot(version, self.build())
+            except Exception as e:
+                self.last_error = str(e)
+                # Broken inputs are only retried once they change again
+                self._seen_stats = stats
+                raise
+            self.snapshot = snapshot
+            self.last_error = None
+            # Files replaced while building differ from these stats and trigger another reload
+            self._seen_stats = stats
+            return True
+
+    def check(self):
+        # Cheap enough to run every few seconds, the files are only read if their stats changed
+        if self._stats() == self._seen_stats:
+            return
+        try:
+            if self.reload():
+                print(f"Loaded dataset version {self.snapshot.version[:12]}")
+        except Exception as e:
+            print(f"Keeping dataset version {self.snapshot.version[:12] if self.snapshot else None}, reload failed: {e}")
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def current(self) -> Snapshot:
+        """Return the current snapshot (None if no valid one could be built yet)."""
+        # Threads do not survive a fork, so every worker process starts its own watcher
+        if self._watcher_pid != os.getpid():
+            with self._watcher_lock:
+                if self._watcher_pid != os.getpid():
+                    self._watcher_pid = os.getpid()
+                    threading.Thread(target=self._watch, name="dataset-watcher", daemon=True).start()
+        return self.snapshot
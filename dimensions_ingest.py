@@ -0,0 +1,281 @@
+import argparse
+import csv
+import os
+import re
+
+import pandas as pd
+
+from pipeline import write_csv_if_changed
+from study_schema import (find_header_row, multi_value_and_string_columns, numerical_columns_log_transformed,
+                          single_value_columns, single_value_columns_special_treatment, transform_value)
+
+BASE_DIR = os.path.dirname(__file__)
+
+DATA_PATH = 'data.csv'
+
+# Rows read at once, memory use depends on this and not on the size of the export
+CHUNK_SIZE = 5000
+
+# Only the first messages are kept, new category values are collected per column instead
+MAX_MESSAGES = 50
+
+# Export columns whose names differ from the data.csv column without its "<Panel>_PANEL_" prefix
+COLUMN_ALIASES = {
+    'ID': 'DB ID',
+    'Interaction_PANEL_Adaptation of the Interaction Detection Algorithm to User': 'Adaptation of the Interaction Detection Algorithm to the Individual User',
+    'Study_PANEL_Accuracy of Interactions Evaluations': 'Accuracy of Interactions Evaluation',
+    'Study_PANEL_Evaluation of Different Settings': 'Evaluations of Different Settings',
+}
+
+DOI_PATTERN = re.compile(r"10\.\d{4,9}/[^\s?#]+", re.IGNORECASE)
+
+
+def _simplify_column(name: str) -> str:
+    # "Hands- Free", "Hands-Free" and "Interaction_PANEL_Hands-Free" all become "handsfree"
+    return re.sub(r"[^a-z]", "", name.split("_PANEL_")[-1].lower())
+
+
+def map_columns(export_columns: list, schema_columns: list) -> dict:
+    """Return {data.csv column: export column}, raises if a data.csv column has no counterpart."""
+    by_simplified = {}
+    for column in export_columns:
+        # The export's own "ID" is a screening reference like "[33]", the database ID is "DB ID"
+        if column != 'ID':
+            by_simplified.setdefault(_simplify_column(column), column)
+
+    mapping = {}
+    for column in schema_columns:
+        export_column = COLUMN_ALIASES.get(column, by_simplified.get(_simplify_column(column)))
+        if export_column not in export_columns:
+            raise ValueError(f"Column '{column}' of data.csv has no counterpart in the export")
+        mapping[column] = export_column
+    return mapping
+
+
+def _clean(value: str) -> str:
+    return " ".join(str(value).split())
+
+
+def split_values(value: str) -> list:
+    return [_clean(v) for v in str(value).split(',') if _clean(v)]
+
+
+def build_vocabularies(data_df: pd.DataFrame) -> dict:
+    # Known spellings of every multi-value column, looked up case-insensitively ("LiDAR Sensor" -> "Lidar Sensor")
+    vocabularies = {}
+    for column in multi_value_and_string_columns:
+        vocabulary = {}
+        for value in data_df[column]:
+            if value != 'N/A':
+                for item in split_values(value):
+                    vocabulary.setdefault(item.lower(), item)
+        vocabularies[column] = vocabulary
+    return vocabularies
+
+
+def dedupe_key(row: dict) -> str:
+    doi = DOI_PATTERN.search(row.get('Study Link', ''))
+    if doi:
+        return "doi:" + doi.group(0).rstrip('.').lower()
+    title = re.sub(r"[^\w\s]", "", row.get('Title', '').lower())
+    title = " ".join(title.split())
+    return "title:" + title if title else ""
+
+
+class RowNormalizer:
+    """Brings export values into the data.csv spelling and reports values the database cannot use."""
+
+    def __init__(self, vocabularies: dict):
+        self.vocabularies = vocabularies
+
+    def multi_value(self, column: str, value: str):
+        # Returns (value, unknown items), known items take the spelling already used in data.csv
+        if value in ('', 'N/A'):
+            return 'N/A', []
+        vocabulary = self.vocabularies.get(column, {})
+        items = []
+        unknown = []
+        for item in split_values(value):
+            if item.lower() not in vocabulary:
+                unknown.append(item)
+            item = vocabulary.get(item.lower(), item)
+            if item not in items:
+                items.append(item)
+        return ", ".join(sorted(items, key=str.lower)), unknown
+
+    def normalize(self, row: dict):
+        """Return the normalized row, its problems (the row must not be ingested) and {column: new values}."""
+        normalized = {column: _clean(value) or 'N/A' for column, value in row.items()}
+        problems = []
+        new_values = {}
+
+        if not re.fullmatch(r"\d+", normalized['ID']):
+            problems.append(f"invalid ID '{normalized['ID']}'")
+        if not re.fullmatch(r"\d{4}", normalized['Year']):
+            problems.append(f"invalid Year '{normalized['Year']}'")
+        if normalized['Title'] == 'N/A':
+            problems.append("missing Title")
+
+        for column in single_value_columns:
+            value = normalized[column]
+            if value != 'N/A' and pd.isna(transform_value(value)):
+                problems.append(f"{column}: unrecognized value '{value}'")
+
+        for column in single_value_columns_special_treatment:
+            if normalized[column] not in ('Yes', 'Yes (Performance Loss)', 'No', 'N/A'):
+                problems.append(f"{column}: unrecognized value '{normalized[column]}'")
+
+        for column in numerical_columns_log_transformed:
+            value = normalized[column]
+            if value != 'N/A' and not re.fullmatch(r"\d+(\.\d+)?", value):
+                problems.append(f"{column}: not a number '{value}'")
+
+        for column in multi_value_and_string_columns:
+            normalized[column], unknown = self.multi_value(column, normalized[column])
+            # New keywords are expected, new categories elsewhere are worth a look but not an error
+            if unknown and column != 'Keywords':
+                new_values[column] = unknown
+
+        return normalized, problems, new_values
+
+
+def value_differs(column: str, existing: str, incoming: str) -> bool:
+    if column in multi_value_and_string_columns:
+        # Order and case of the items carry no meaning
+        return {v.lower() for v in split_values(existing)} != {v.lower() for v in split_values(incoming)}
+    return _clean(existing) != incoming
+
+
+def merge_changed_row(existing: dict, incoming: dict):
+    """Return the existing row with the changed values of incoming, or None if nothing changed.
+
+    Unchanged values keep their current spelling, so ingesting does not reorder curated lists.
+    """
+    changed = {column: value for column, value in incoming.items() if value_differs(column, existing[column], value)}
+    return {**existing, **changed} if changed else None
+
+
+def read_export(path: str, chunk_size: int = CHUNK_SIZE):
+    """Yield the export in DataFrame chunks of raw strings."""
+    return pd.read_csv(path, skiprows=find_header_row(path), dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def ingest_export(export_path: str, data_df: pd.DataFrame, chunk_size: int = CHUNK_SIZE) -> tuple:
+    """Stream the export and find the studies that are new or differ from data.csv.
+
+    Rows without a database ID are screening entries (duplicates, excluded studies) and are skipped.
+    Within the export the first row per ID and per DOI/title wins; a new ID whose DOI or title is
+    already in data.csv is reported as a duplicate instead of being added. Returns (changes, report)
+    where changes is a generator of ('new' | 'changed', row), the report is complete once it is exhausted.
+    """
+    schema_columns = list(data_df.columns)
+    existing = {row['ID']: row for row in data_df.to_dict(orient="records")}
+    existing_keys = {dedupe_key(row): row['ID'] for row in existing.values()}
+    existing_keys.pop("", None)
+    normalizer = RowNormalizer(build_vocabularies(data_df))
+    report = {'read': 0, 'screening': 0, 'duplicates': 0, 'invalid': 0, 'unchanged': 0, 'new': 0, 'changed': 0,
+              'messages': [], 'new_values': {}}
+
+    def message(text):
+        if len(report['messages']) < MAX_MESSAGES:
+            report['messages'].append(text)
+
+    def changes():
+        seen_ids = set()
+        seen_keys = set()
+        mapping = None
+        for chunk in read_export(export_path, chunk_size):
+            if mapping is None:
+                mapping = map_columns(list(chunk.columns), schema_columns)
+            chunk = pd.DataFrame({column: chunk[export_column] for column, export_column in mapping.items()})
+
+            for row in chunk.to_dict(orient="records"):
+                report['read'] += 1
+                if not re.fullmatch(r"\s*\d+\s*", row['ID']):
+                    report['screening'] += 1
+                    continue
+
+                row, problems, new_values = normalizer.normalize(row)
+                key = dedupe_key(row)
+                if row['ID'] in seen_ids or (key and key in seen_keys):
+                    report['duplicates'] += 1
+                    continue
+                seen_ids.add(row['ID'])
+                if key:
+                    seen_keys.add(key)
+
+                if row['ID'] not in existing and key in existing_keys:
+                    report['duplicates'] += 1
+                    message(f"ID {row['ID']}: duplicate of study {existing_keys[key]}")
+                    continue
+                if problems:
+                    report['invalid'] += 1
+                    message(f"ID {row['ID']}: " + "; ".join(problems))
+                    continue
+                for column, values in new_values.items():
+                    report['new_values'].setdefault(column, set()).update(values)
+
+                if row['ID'] not in existing:
+                    report['new'] += 1
+                    yield 'new', row
+                    continue
+                merged = merge_changed_row(existing[row['ID']], row)
+                if merged is None:
+                    report['unchanged'] += 1
+                else:
+                    report['changed'] += 1
+                    yield 'changed', merged
+
+    return changes(), report
+
+
+def apply_changes(data_df: pd.DataFrame, delta_df: pd.DataFrame) -> pd.DataFrame:
+    # Changed studies are updated in place, new ones are appended in ID order
+    data_df = data_df.set_index('ID', drop=False)
+    delta_df = delta_df.drop(columns=['Change']).set_index('ID', drop=False)
+    changed = delta_df.index.intersection(data_df.index)
+    data_df.loc[changed] = delta_df.loc[changed, data_df.columns]
+    new_rows = delta_df.drop(index=changed)[list(data_df.columns)]
+    new_rows = new_rows.iloc[new_rows['ID'].astype(int).argsort()]
+    return pd.concat([data_df, new_rows]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a Dimensions export into the data.csv schema, keeping only new or changed studies.")
+    parser.add_argument("export", help="exported CSV, e.g. Dimensions_250729.csv")
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "dimensions_delta.csv"),
+                        help="CSV with the new and changed studies in the data.csv schema plus a 'Change' column")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--apply", action="store_true", help="also merge the new and changed studies into data.csv")
+    args = parser.parse_args()
+
+    data_path = os.path.join(BASE_DIR, DATA_PATH)
+    data_df = pd.read_csv(data_path, dtype=str, keep_default_na=False)
+    changes, report = ingest_export(args.export, data_df, args.chunk_size)
+
+    # Written chunk by chunk, so the delta is never held in memory as a whole
+    columns = ['Change'] + list(data_df.columns)
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for change, row in changes:
+            writer.writerow({'Change': change, **row})
+
+    print(f"Read {report['read']} rows: {report['new']} new, {report['changed']} changed, {report['unchanged']} unchanged, "
+          f"{report['duplicates']} duplicates, {report['invalid']} invalid, {report['screening']} screening entries without ID")
+    for message in report['messages']:
+        print(f"  {message}")
+    if len(report['messages']) == MAX_MESSAGES:
+        print(f"  (only the first {MAX_MESSAGES} messages are shown)")
+    for column, values in report['new_values'].items():
+        print(f"  New values in {column}: {', '.join(sorted(values))}")
+    print(f"New and changed studies written to {args.output}")
+
+    if args.apply and report['new'] + report['changed'] > 0:
+        delta_df = pd.read_csv(args.output, dtype=str, keep_default_na=False)
+        write_csv_if_changed(apply_changes(data_df, delta_df), DATA_PATH, index=False)
+        print(f"Merged into {DATA_PATH}, run update_similarity_matrices_and_author_connections.py to refresh the derived datasets")
+
+
+if __name__ == "__main__":
+    main()
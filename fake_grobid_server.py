@@ -0,0 +1,99 @@
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Local stand-in for GROBID's /api/processReferences, so the ingestion stage can be tried without Docker.
+# Every line of the uploaded file of the form "REF: title | Surname, Forename; Surname, Forename | year | doi"
+# becomes one biblStruct in the response, everything else (e.g. real PDF bytes) is ignored.
+
+REF_PATTERN = re.compile(rb"^REF:(.*)$", re.MULTILINE)
+
+
+def _multipart_file(body: bytes, content_type: str) -> bytes:
+    # Return the content of the first file part of a multipart/form-data body
+    boundary = re.search(r"boundary=\"?([^\";]+)", content_type or "")
+    if not boundary:
+        return body
+    for part in body.split(b"--" + boundary.group(1).encode()):
+        header, _, content = part.partition(b"\r\n\r\n")
+        if b"filename=" in header:
+            return content.rstrip(b"\r\n")
+    return b""
+
+
+def references_to_tei(content: bytes) -> str:
+    structs = []
+    for i, match in enumerate(REF_PATTERN.finditer(content)):
+        parts = [p.strip() for p in match.group(1).decode("utf-8", errors="replace").split("|")]
+        title, authors, year, doi = (parts + [""] * 4)[:4]
+
+        authors_xml = ""
+        for author in filter(None, (a.strip() for a in authors.split(";"))):
+            surname, _, forename = (p.strip() for p in author.partition(","))
+            forename_xml = f"<forename type=\"first\">{escape(forename)}</forename>" if forename else ""
+            authors_xml += f"<author><persName>{forename_xml}<surname>{escape(surname)}</surname></persName></author>"
+
+        structs.append(
+            f"<biblStruct xml:id=\"b{i}\"><analytic><title level=\"a\" type=\"main\">{escape(title)}</title>{authors_xml}"
+            + (f"<idno type=\"DOI\">{escape(doi)}</idno>" if doi else "")
+            + "</analytic><monogr><imprint>"
+            + (f"<date type=\"published\" when=\"{escape(year)}\"/>" if year else "")
+            + "</imprint></monogr></biblStruct>"
+        )
+
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+            "<TEI xmlns=\"http://www.tei-c.org/ns/1.0\"><text><back><div><listBibl>"
+            + "".join(structs)
+            + "</listBibl></div></back></text></TEI>")
+
+
+class FakeGrobidHandler(BaseHTTPRequestHandler):
+    # Seconds to wait before answering, to make concurrency visible
+    delay = 0.0
+
+    def _send(self, status:int, body:str, content_type:str = "text/plain"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/api/isalive":
+            self._send(200, "true")
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        if self.path != "/api/processReferences":
+            self._send(404, "not found")
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        self._send(200, references_to_tei(_multipart_file(body, self.headers.get("Content-Type"))), "application/xml")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_grobid(port:int = 0, delay:float = 0.0):
+    """Start the fake server in a background thread, returns (server, base URL). Stop it with server.shutdown()."""
+    handler = type("Handler", (FakeGrobidHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake GROBID server that answers /api/processReferences.")
+    parser.add_argument("--port", type=int, default=8070)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    handler = type("Handler", (FakeGrobidHandler,), {"delay": args.delay})
+    print(f"Fake GROBID listening on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), handler).serve_forever()
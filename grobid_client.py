@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_DIR = os.path.dirname(__file__)
+
+GROBID_URL = "http://localhost:8070"
+OUTPUT_DIR = os.path.join(BASE_DIR, "extracted_citations")
+MANIFEST_NAME = "manifest.json"
+
+# GROBID answers 503 while all of its own workers are busy, these requests are retried with backoff
+MAX_RETRIES = 5
+RETRY_BACKOFF = 2.0
+
+TEI_NS = {"tei": "http://www.tei-c.org/ns/1.0"}
+XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+
+
+def pdf_hash(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _text(element) -> str:
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+
+def parse_tei_references(tei_xml: str) -> list:
+    """Convert the TEI returned by /api/processReferences into citation records with a BibTeX string."""
+    root = ET.fromstring(tei_xml)
+    references = []
+
+    for i, bibl in enumerate(root.iter(f"{{{TEI_NS['tei']}}}biblStruct")):
+        ref_id = bibl.get(XML_ID, f"ref_{i}")
+
+        authors = []
+        for person in bibl.findall(".//tei:author/tei:persName", TEI_NS):
+            surname = _text(person.find("tei:surname", TEI_NS))
+            forename = _text(person.find("tei:forename", TEI_NS))
+            if surname:
+                authors.append(f"{surname}, {forename}" if forename else surname)
+
+        title = _text(bibl.find(".//tei:title[@level='a']", TEI_NS))
+
+        year = ""
+        date = bibl.find(".//tei:date[@type='published']", TEI_NS)
+        if date is not None and date.get("when"):
+            year = date.get("when").split("-")[0]
+
+        journal = _text(bibl.find(".//tei:title[@level='j']", TEI_NS)) or _text(bibl.find(".//tei:title[@level='m']", TEI_NS))
+        volume = _text(bibl.find(".//tei:biblScope[@unit='volume']", TEI_NS))
+        issue = _text(bibl.find(".//tei:biblScope[@unit='issue']", TEI_NS))
+
+        pages = ""
+        page_scope = bibl.find(".//tei:biblScope[@unit='page']", TEI_NS)
+        if page_scope is not None and page_scope.get("from"):
+            pages = page_scope.get("from")
+            if page_scope.get("to"):
+                pages = f"{pages}--{page_scope.get('to')}"
+
+        doi = _text(bibl.find(".//tei:idno[@type='DOI']", TEI_NS))
+
+        # Same BibTeX layout as the files already in extracted_citations/
+        fields = [("author", " and ".join(authors)), ("title", title), ("journal", journal), ("year", year),
+                  ("volume", volume), ("number", issue), ("pages", pages), ("doi", doi)]
+        bibtex_str = f"@article{{grobid_{ref_id.replace('b', '')},\n"
+        bibtex_str += "".join(f"  {name} = {{{value}}},\n" for name, value in fields if value)
+        bibtex_str += "}"
+
+        references.append({'bibtex': bibtex_str, 'authors': authors, 'title': title, 'year': year, 'journal': journal, 'doi': doi})
+
+    return references
+
+
+class GrobidClient:
+    """Thin client around a GROBID server that reuses one pooled HTTP session for all requests."""
+
+    def __init__(self, url:str = GROBID_URL, max_workers:int = 4, timeout:int = 300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def is_alive(self) -> bool:
+        try:
+            return self.session.get(f"{self.url}/api/isalive", timeout=10).ok
+        except requests.RequestException:
+            return False
+
+    def process_references(self, pdf_path:str) -> list:
+        with open(pdf_path, "rb") as pdf_file:
+            pdf_content = pdf_file.read()
+
+        for attempt in range(MAX_RETRIES):
+            response = self.session.post(
+                f"{self.url}/api/processReferences",
+                files={"input": ("document.pdf", pdf_content, "application/pdf")},
+                timeout=self.timeout,
+            )
+            if response.status_code != 503:
+                break
+            time.sleep(RETRY_BACKOFF * (attempt + 1))
+
+        response.raise_for_status()
+        return parse_tei_references(response.text)
+
+
+def load_manifest(output_dir:str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"papers": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest:dict, output_dir:str):
+    # Written after every paper, so an interrupted run resumes where it stopped
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def citations_path(output_dir:str, paper_id) -> str:
+    return os.path.join(output_dir, f"paper_{paper_id}_citations.bib")
+
+
+def write_citations(references:list, path:str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for ref in references:
+            f.write(ref['bibtex'] + "\n\n")
+    os.replace(tmp_path, path)
+
+
+def extract_corpus(pdf_paths:dict, output_dir:str = OUTPUT_DIR, client:GrobidClient = None, max_workers:int = 4) -> dict:
+    """Extract the references of {paper ID: PDF path} into output_dir, skipping PDFs that were already processed.
+
+    A PDF counts as processed when the manifest holds the same content hash for the paper and its .bib
+    file exists. Identical PDFs filed under another ID, already processed or in the same batch, are only
+    sent to GROBID once. Returns the updated manifest.
+    """
+    client = client or GrobidClient(max_workers=max_workers)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    papers = manifest["papers"]
+
+    done_by_hash = {entry["sha256"]: paper_id for paper_id, entry in papers.items()
+                    if entry.get("status") == "done" and os.path.exists(citations_path(output_dir, paper_id))}
+
+    # Content hash -> [(paper ID, PDF path)], identical PDFs in this batch share one request
+    pending = {}
+    for paper_id, pdf_path in pdf_paths.items():
+        paper_id = str(paper_id)
+        content_hash = pdf_hash(pdf_path)
+        entry = papers.get(paper_id, {})
+        if entry.get("status") == "done" and entry.get("sha256") == content_hash and os.path.exists(citations_path(output_dir, paper_id)):
+            continue
+        if content_hash in done_by_hash:
+            shutil.copyfile(citations_path(output_dir, done_by_hash[content_hash]), citations_path(output_dir, paper_id))
+            papers[paper_id] = {**papers[done_by_hash[content_hash]], "pdf": os.path.basename(pdf_path)}
+            continue
+        pending.setdefault(content_hash, []).append((paper_id, pdf_path))
+
+    save_manifest(manifest, output_dir)
+    pending_count = sum(len(copies) for copies in pending.values())
+    print(f"{len(pdf_paths) - pending_count} of {len(pdf_paths)} PDFs already extracted, processing {pending_count} ({len(pending)} distinct)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(client.process_references, copies[0][1]): content_hash for content_hash, copies in pending.items()}
+        for future in as_completed(futures):
+            content_hash = futures[future]
+            try:
+                references, error = future.result(), None
+            except Exception as e:
+                references, error = None, e
+            for paper_id, pdf_path in pending[content_hash]:
+                entry = {"pdf": os.path.basename(pdf_path), "sha256": content_hash}
+                if error is not None:
+                    print(f"Error extracting references from paper {paper_id}: {error}")
+                    papers[paper_id] = {**entry, "status": "failed", "error": str(error)}
+                else:
+                    write_citations(references, citations_path(output_dir, paper_id))
+                    papers[paper_id] = {**entry, "status": "done", "references": len(references)}
+                    print(f"Found {len(references)} references in paper {paper_id}")
+            save_manifest(manifest, output_dir)
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract references from the corpus PDFs with GROBID into extracted_citations/.")
+    parser.add_argument("pdf_map", help="CSV file with the columns 'ID' and 'PDF' (file name relative to --pdf-dir)")
+    parser.add_argument("--pdf-dir", default=".")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--url", default=GROBID_URL)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent requests, should not exceed the GROBID server's concurrency")
+    parser.add_argument("--timeout", type=int, default=300)
+    args = parser.parse_args()
+
+    pdf_map_df = pd.read_csv(args.pdf_map)
+    pdf_paths = {int(paper_id): os.path.join(args.pdf_dir, pdf) for paper_id, pdf in zip(pdf_map_df["ID"], pdf_map_df["PDF"])}
+    missing = [path for path in pdf_paths.values() if not os.path.isfile(path)]
+    if missing:
+        print(f"{len(missing)} PDFs not found, e.g. {missing[0]}")
+        pdf_paths = {paper_id: path for paper_id, path in pdf_paths.items() if path not in missing}
+
+    client = GrobidClient(args.url, max_workers=args.workers, timeout=args.timeout)
+    if not client.is_alive():
+        raise SystemExit(f"GROBID server at {args.url} is not reachable")
+
+    manifest = extract_corpus(pdf_paths, args.output_dir, client, max_workers=args.workers)
+    failed = [paper_id for paper_id, entry in manifest["papers"].items() if entry.get("status") == "failed"]
+    if failed:
+        print(f"Failed papers (rerun to retry): {', '.join(sorted(failed, key=int))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from study_schema import find_header_row
+from study_store import MISSING, load_study_store, split_parenthetical
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Spreadsheet export with the venue of every study (and of the backward-chained papers), optional
+VENUES_PATH = os.path.join(BASE_DIR, "Dimensions_250729.csv")
+
+# Categories shown over the years, values with fewer papers are combined into "Other"
+TREND_COLUMNS = {'sensors': 'Sensing_PANEL_Sensors', 'locations': 'Location'}
+TREND_MIN_PAPERS = 5
+
+# Keywords and keyword words occurring less often are left out
+KEYWORD_MIN_COUNT = 2
+
+# Evaluations compared in the overlap analysis, a study is in a list if it answers "Yes" (with any details)
+EVALUATION_COLUMNS = {
+    'Elicitation': 'Study_PANEL_Elicitation Study',
+    'Usability': 'Study_PANEL_Usability Evaluations',
+    'Cognitive Ease': 'Study_PANEL_Cognitive Ease Evaluations',
+    'Discreetness': 'Study_PANEL_Discreetness of Interactions Evaluations',
+    'Social Acceptability': 'Study_PANEL_Social Acceptability of Interactions Evaluations',
+    'Accuracy': 'Study_PANEL_Accuracy of Interactions Evaluations',
+    'Alternative Validity': 'Study_PANEL_Alternative Interaction Validity Evaluations',
+}
+
+# Colors of the figures, the same palette as the charts of the app
+FIGURE_COLORS = ['#d1615d', '#5778a4', '#6a9f58', '#e49444', '#85b6b2', '#e7ca60', '#a87c9f', '#f1a2a9', '#967662', '#b8b0ac', '#cccccc']
+
+
+def incidence(store, column:str) -> tuple:
+    """Return the values of a categorical column (without parenthetical details and N/A) and a
+    boolean matrix with one row per study and one column per value."""
+    if column in store.single_columns:
+        studies = np.arange(len(store))
+        value_codes = store.codes[column]
+    else:
+        rows = store.long_column == store.multi_columns.index(column)
+        studies = store.long_study[rows]
+        value_codes = store.long_value[rows]
+
+    # "Yes (N=12)" and "Yes" are the same value, details are only kept apart in single-value categories
+    bases = [split_parenthetical(category)[0] for category in store.categories[column]]
+    values, base_codes = np.unique(np.asarray(bases, dtype=object), return_inverse=True)
+    matrix = np.zeros((len(store), len(values)), dtype=bool)
+    matrix[studies, base_codes[value_codes]] = True
+
+    keep = values != MISSING
+    return values[keep].tolist(), matrix[:, keep]
+
+
+def ranked_counts(values:list, counts:np.ndarray, min_count:int = 1) -> dict:
+    # Most frequent first, ties alphabetically
+    order = sorted(range(len(values)), key=lambda i: (-counts[i], values[i]))
+    return {values[i]: int(counts[i]) for i in order if counts[i] >= min_count}
+
+
+def year_trend(matrix:np.ndarray, values:list, year_matrix:np.ndarray, min_papers:int) -> dict:
+    """Papers per value and year, values with fewer than min_papers papers are combined into "Other"."""
+    counts = matrix.T.astype(np.int64) @ year_matrix
+    totals = matrix.sum(axis=0)
+    kept = [i for i in sorted(range(len(values)), key=lambda i: (-totals[i], values[i])) if totals[i] >= min_papers]
+    trend = {values[i]: counts[i].tolist() for i in kept}
+    other = np.setdiff1d(np.arange(len(values)), kept)
+    if len(other):
+        trend['Other'] = counts[other].sum(axis=0).tolist()
+    return trend
+
+
+def evaluation_overlaps(store) -> dict:
+    """Pairwise overlaps of the evaluation lists and how many studies are in how many lists."""
+    names = []
+    membership = []
+    for name, column in EVALUATION_COLUMNS.items():
+        if column not in store.columns:
+            continue
+        values, matrix = incidence(store, column)
+        names.append(name)
+        membership.append(matrix[:, values.index('Yes')] if 'Yes' in values else np.zeros(len(store), dtype=bool))
+    membership = np.column_stack(membership) if membership else np.zeros((len(store), 0), dtype=bool)
+
+    overlap = membership.T.astype(np.int64) @ membership
+    list_counts = membership.sum(axis=1)
+    return {
+        'lists': names,
+        'sizes': membership.sum(axis=0).tolist(),
+        'overlap_matrix': overlap.tolist(),
+        # Number of studies in exactly k lists
+        'studies_per_list_count': {int(k): int(n) for k, n in enumerate(np.bincount(list_counts, minlength=len(names) + 1)) if k > 0 and n > 0},
+        'studies_in_several_lists': {int(k): store.ids[list_counts == k].tolist() for k in np.unique(list_counts) if k > 1},
+    }
+
+
+def keyword_frequencies(store, min_count:int = KEYWORD_MIN_COUNT) -> dict:
+    keywords, matrix = incidence(store, 'Keywords')
+    keyword_counts = matrix.sum(axis=0)
+
+    # Every keyword is split into its words, a word counts once per occurrence of its keywords
+    words = sorted({word for keyword in keywords for word in keyword.split()})
+    word_positions = {word: i for i, word in enumerate(words)}
+    word_counts = np.zeros(len(words), dtype=np.int64)
+    for keyword, count in zip(keywords, keyword_counts):
+        for word in keyword.split():
+            word_counts[word_positions[word]] += count
+
+    with_keywords = matrix.any(axis=1)
+    return {
+        'unique_keywords': len(keywords),
+        'mean_keywords_per_study': float(matrix[with_keywords].sum() / with_keywords.sum()) if with_keywords.any() else 0.0,
+        'keywords': ranked_counts(keywords, keyword_counts, min_count),
+        'words': ranked_counts(words, word_counts, min_count),
+    }
+
+
+def venue_counts(path:str = VENUES_PATH) -> dict:
+    # The export starts with empty spreadsheet rows above its header
+    if not os.path.exists(path):
+        return {}
+    venues = pd.read_csv(path, skiprows=find_header_row(path), dtype=str, keep_default_na=False, usecols=['Venue'])['Venue']
+    venues = venues.str.strip()
+    counts = venues[venues != ""].value_counts()
+    return ranked_counts(counts.index.tolist(), counts.to_numpy())
+
+
+def compute_insights(store, venues_path:str = VENUES_PATH) -> dict:
+    """Aggregate statistics of the database, as JSON-serializable dict."""
+    years = store.numeric['Year']
+    known_years = ~np.isnan(years)
+    year_values = np.unique(years[known_years]).astype(int)
+    # One column per year from the first to the last study, so the series have no gaps
+    year_range = np.arange(year_values.min(), year_values.max() + 1) if len(year_values) else np.zeros(0, dtype=int)
+    year_matrix = np.zeros((len(store), len(year_range)), dtype=np.int64)
+    year_matrix[np.flatnonzero(known_years), years[known_years].astype(int) - (year_range[0] if len(year_range) else 0)] = 1
+
+    column_counts = {}
+    trends = {}
+    for column in store.single_columns + store.multi_columns:
+        values, matrix = incidence(store, column)
+        column_counts[column] = ranked_counts(values, matrix.sum(axis=0))
+        for name, trend_column in TREND_COLUMNS.items():
+            if column == trend_column:
+                trends[name] = year_trend(matrix, values, year_matrix, TREND_MIN_PAPERS)
+
+    return {
+        'version': store.source_sha256,
+        'studies': len(store),
+        'years': year_range.tolist(),
+        'papers_per_year': year_matrix.sum(axis=0).tolist(),
+        'trends': trends,
+        'column_counts': column_counts,
+        'keywords': keyword_frequencies(store) if 'Keywords' in store.multi_columns + store.single_columns else {},
+        'evaluation_overlaps': evaluation_overlaps(store),
+        'venues': venue_counts(venues_path),
+    }
+
+
+def render_figures(insights:dict, output_dir:str) -> list:
+    """Render the figures of insights_statistics.ipynb as PNG files, returns their paths. Needs matplotlib."""
+    # Only needed for the figures, the statistics themselves work without matplotlib
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+
+    def save(fig, name):
+        path = os.path.join(output_dir, f"{name}.png")
+        fig.tight_layout()
+        fig.savefig(path, dpi=200)
+        plt.close(fig)
+        paths.append(path)
+
+    # Papers per year, with the values of a category stacked per year
+    for name, trend in insights['trends'].items():
+        fig, ax = plt.subplots(figsize=(14, 7))
+        bottom = np.zeros(len(insights['years']))
+        for i, (value, counts) in enumerate(trend.items()):
+            ax.bar(insights['years'], counts, bottom=bottom, label=value, width=0.6, alpha=0.8,
+                   color=FIGURE_COLORS[-1] if value == 'Other' else FIGURE_COLORS[i % (len(FIGURE_COLORS) - 1)])
+            bottom += np.asarray(counts)
+        ax.plot(insights['years'], insights['papers_per_year'], color='black', linewidth=2, label='Papers per Year', zorder=10)
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Count')
+        ax.set_xticks(insights['years'])
+        ax.tick_params(axis='x', rotation=45)
+        ax.legend(loc='upper left')
+        save(fig, f"{name}_per_year")
+
+    # Most frequent keywords and keyword words
+    for name in ('keywords', 'words'):
+        frequencies = dict(list(insights['keywords'].get(name, {}).items())[:30])
+        if not frequencies:
+            continue
+        fig, ax = plt.subplots(figsize=(10, 9))
+        ax.barh(list(frequencies)[::-1], list(frequencies.values())[::-1], color=FIGURE_COLORS[0])
+        ax.set_xlabel('Studies')
+        save(fig, f"keyword_{name}")
+
+    # Pairwise overlaps of the evaluations
+    overlaps = insights['evaluation_overlaps']
+    if overlaps['lists']:
+        fig, ax = plt.subplots(figsize=(8, 7))
+        matrix = np.asarray(overlaps['overlap_matrix'])
+        image = ax.imshow(matrix, cmap='Reds')
+        ax.set_xticks(range(len(overlaps['lists'])), overlaps['lists'], rotation=45, ha='right')
+        ax.set_yticks(range(len(overlaps['lists'])), overlaps['lists'])
+        for (row, column), value in np.ndenumerate(matrix):
+            ax.text(column, row, str(value), ha='center', va='center', color='white' if value > matrix.max() / 2 else 'black')
+        fig.colorbar(image, ax=ax)
+        save(fig, "evaluation_overlaps")
+
+    if insights['venues']:
+        venues = dict(list(insights['venues'].items())[:15])
+        fig, ax = plt.subplots(figsize=(12, 7))
+        # Venue names are long, the bracketed abbreviation is enough where there is one
+        abbreviations = [re.search(r"\(([^)]*)\)\s*(/.*)?$", venue) for venue in venues]
+        labels = [match.group(1) if match else venue[:40] for match, venue in zip(abbreviations, venues)]
+        ax.barh(labels[::-1], list(venues.values())[::-1], color=FIGURE_COLORS[1])
+        ax.set_xlabel('Papers')
+        save(fig, "venues")
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the statistics of the database and optionally render their figures.")
+    parser.add_argument("--output", help="write the statistics as JSON to this file instead of printing a summary")
+    parser.add_argument("--figures", metavar="DIR", help="also render the figures as PNG files into this directory (needs matplotlib)")
+    args = parser.parse_args()
+
+    insights = compute_insights(load_study_store())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(insights, f, indent=2, ensure_ascii=False)
+    else:
+        peak = int(np.argmax(insights['papers_per_year']))
+        print(f"{insights['studies']} studies from {insights['years'][0]} to {insights['years'][-1]}, "
+              f"peak year {insights['years'][peak]} with {insights['papers_per_year'][peak]} papers")
+        for name, trend in insights['trends'].items():
+            print(f"{name.capitalize()} with at least {TREND_MIN_PAPERS} papers: {', '.join(v for v in trend if v != 'Other')}")
+        keywords = insights['keywords']
+        print(f"{keywords['unique_keywords']} unique keywords, {keywords['mean_keywords_per_study']:.2f} per study")
+        for count, studies in insights['evaluation_overlaps']['studies_per_list_count'].items():
+            print(f"{studies} studies appear in exactly {count} evaluation lists")
+        print(f"{len(insights['venues'])} venues, most frequent: {next(iter(insights['venues']), 'none')}")
+
+    if args.figures:
+        for path in render_figures(insights, args.figures):
+            print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads computing expensive responses at the same time, the request threads wait for them without holding the GIL
+DEFAULT_WORKERS = 2
+
+# Distinct computations that may be queued or running, further ones are rejected instead of piling up
+DEFAULT_MAX_PENDING = 16
+
+# Seconds a request waits for its computation before giving up (the computation still finishes)
+DEFAULT_TIMEOUT = 30
+
+
+class PoolBusy(Exception):
+    """Raised when a computation cannot be queued because the pool is full, or does not finish in time."""
+
+
+class OffloadPool:
+    """Bounded thread pool for the expensive parts of requests (rendering pages, blending matrices, serializing).
+
+    run(key, compute) returns compute() computed on one of max_workers threads. Requests with the same
+    key while it is queued or running share that computation instead of starting their own, so a burst
+    of identical requests costs one computation. Since at most max_workers requests compute at a time,
+    the other request threads stay free to answer cheap routes quickly. A thread pool fits here
+    because the inputs live in the snapshot of this process and the numpy parts release the GIL.
+
+    With max_workers=0, compute() is called directly in the request thread, as without the pool.
+    """
+
+    def __init__(self, max_workers:int = DEFAULT_WORKERS, max_pending:int = DEFAULT_MAX_PENDING, timeout:float = DEFAULT_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.computed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="offload") if max_workers > 0 else None
+
+    def run(self, key, compute):
+        """Return compute(), shared with concurrent calls of the same key.
+
+        Raises PoolBusy if the pool is full or the result takes longer than timeout. Exceptions of
+        compute() are raised in every request sharing it.
+        """
+        if self._executor is None:
+            self.computed += 1
+            return compute()
+
+        submitted = False
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusy(f"{len(self._pending)} computations are already pending")
+            else:
+                self.computed += 1
+                future = self._executor.submit(compute)
+                self._pending[key] = future
+                submitted = True
+        if submitted:
+            # Later requests start a new computation, e.g. after the result dropped out of a cache. Registered
+            # outside the lock since the callback runs right away if the computation is already done
+            future.add_done_callback(lambda _: self._forget(key, future))
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise PoolBusy(f"no result within {self.timeout} s") from None
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"workers": self.max_workers, "pending": pending, "computed": self.computed,
+                "coalesced": self.coalesced, "rejected": self.rejected}
@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import io
+import json
+import os
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Fingerprints of the last successful build of each stage, committed together with the artifacts
+MANIFEST_PATH = os.path.join(BASE_DIR, "pipeline_manifest.json")
+
+# Modules below this directory are code of the stages, changing them rebuilds the stages that reach them
+CODE_DIR = BASE_DIR
+
+# Module-level values of these types that a stage function reads (column lists, paths, ...) are part of its code
+CONSTANT_TYPES = (str, int, float, bool, list, tuple, dict, type(None))
+
+
+class Stage:
+    """A pipeline step with declared inputs and outputs.
+
+    inputs maps a path (relative to the repository) to a list of CSV columns that the stage reads,
+    or None if the whole file matters. Only the declared columns are fingerprinted, so e.g. editing
+    an abstract does not rebuild the database similarity.
+    """
+
+    def __init__(self, name:str, func, inputs:dict, outputs:list, depends_on:list = None, description:str = ""):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.depends_on = depends_on if depends_on is not None else []
+        self.description = description
+
+
+def _path(relative_path:str) -> str:
+    return os.path.join(BASE_DIR, relative_path)
+
+
+def file_fingerprint(relative_path:str, columns:list = None) -> str:
+    path = _path(relative_path)
+    if not os.path.exists(path):
+        return "missing"
+    if columns is None:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    # Hash only the columns the stage reads, independent of their order in the file
+    df = pd.read_csv(path, usecols=lambda c: c in columns)
+    return hashlib.sha256(df[sorted(df.columns)].to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def _repository_module(obj):
+    # Module of the repository that defines obj, None for the standard library and installed packages
+    module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+    path = getattr(module, "__file__", None)
+    if not path or "site-packages" in path:
+        return None
+    return module if os.path.abspath(path).startswith(os.path.abspath(CODE_DIR) + os.sep) else None
+
+
+def _module_name(module) -> str:
+    # Name of a repository module independent of how it was loaded, the update script runs as __main__
+    return os.path.splitext(os.path.relpath(module.__file__, CODE_DIR))[0].replace(os.sep, ".")
+
+
+def _referenced_names(code) -> set:
+    # Global names used by a code object, including its lambdas, comprehensions and nested functions
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def code_sources(func) -> dict:
+    """Return the source of func and of all repository code it reaches, keyed by a readable name.
+
+    Functions and classes of func's own module are followed one by one, together with the values of
+    the module-level constants they read, so editing one stage of a module does not rebuild the
+    others. Other repository modules that are reached count as a whole, including the repository
+    modules they import in turn.
+    """
+    home = inspect.getmodule(func)
+    home_name = _module_name(home)
+    sources = {}
+
+    def add_module(module):
+        if module is home or _module_name(module) in sources:
+            return
+        sources[_module_name(module)] = inspect.getsource(module)
+        for value in vars(module).values():
+            dependency = _repository_module(value)
+            if dependency is not None:
+                add_module(dependency)
+
+    def add_object(obj):
+        key = f"{home_name}:{obj.__qualname__}"
+        if key in sources:
+            return
+        sources[key] = inspect.getsource(obj)
+        code_objects = [obj.__code__] if inspect.isfunction(obj) else [
+            member.__code__ for member in vars(obj).values() if inspect.isfunction(member)]
+        for code in code_objects:
+            for name in sorted(_referenced_names(code)):
+                # __file__ and the like depend on where the repository is checked out
+                if name not in home.__dict__ or name.startswith("__"):
+                    continue
+                value = home.__dict__[name]
+                module = _repository_module(value) if (inspect.isfunction(value) or inspect.isclass(value) or inspect.ismodule(value)) else None
+                if module is home:
+                    add_object(value)
+                elif module is not None:
+                    add_module(module)
+                elif isinstance(value, CONSTANT_TYPES):
+                    sources[f"{home_name}:{name}"] = repr(value)
+
+    add_object(func)
+    return sources
+
+
+def code_fingerprint(func) -> str:
+    sources = code_sources(func)
+    return hashlib.sha256(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def stage_fingerprint(stage:Stage) -> dict:
+    return {
+        "code": code_fingerprint(stage.func),
+        "inputs": {path: file_fingerprint(path, columns) for path, columns in sorted(stage.inputs.items())},
+    }
+
+
+def load_manifest(path:str = MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_if_changed(relative_path:str, content:bytes) -> bool:
+    """Write content unless the file already holds exactly these bytes, returns whether it was written."""
+    path = _path(relative_path)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == content:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_csv_if_changed(df:pd.DataFrame, relative_path:str, **to_csv_kwargs) -> bool:
+    buffer = io.StringIO()
+    df.to_csv(buffer, **to_csv_kwargs)
+    return write_if_changed(relative_path, buffer.getvalue().encode("utf-8"))
+
+
+def _with_dependencies(stages:dict, names:list) -> list:
+    # Selected stages plus everything they depend on, in declaration order
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(stages[name].depends_on)
+    return [name for name in stages if name in selected]
+
+
+def run_pipeline(stage_list:list, selected:list = None, force:bool = False, manifest_path:str = MANIFEST_PATH) -> list:
+    """Run stale stages in order and return (name, status, seconds) rows.
+
+    A stage is stale when it is forced, one of its outputs is missing, or the fingerprint of its code
+    or inputs differs from the manifest. Upstream outputs are inputs of downstream stages, so a stage
+    that rewrites nothing leaves its dependents up to date.
+    """
+    stages = {stage.name: stage for stage in stage_list}
+    unknown = [name for name in (selected or []) if name not in stages]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(stages)}")
+
+    names = _with_dependencies(stages, selected) if selected else list(stages)
+    manifest = load_manifest(manifest_path)
+    summary = []
+
+    for name in names:
+        stage = stages[name]
+        start = time.perf_counter()
+        fingerprint = stage_fingerprint(stage)
+        outputs_exist = all(os.path.exists(_path(output)) for output in stage.outputs)
+
+        # Dependencies are only forced if they were explicitly selected
+        forced = force and (not selected or name in selected)
+        if not forced and outputs_exist and manifest.get(name) == fingerprint:
+            summary.append((name, "up to date", time.perf_counter() - start))
+            continue
+
+        print(f"Running stage '{name}'...")
+        written = stage.func()
+        manifest[name] = stage_fingerprint(stage)
+        status = "rebuilt" if written else "rebuilt, outputs unchanged"
+        summary.append((name, status, time.perf_counter() - start))
+
+        # Persist after every stage so a failing later stage does not discard earlier work
+        write_if_changed(os.path.relpath(manifest_path, BASE_DIR), (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+
+    return summary
+
+
+def print_summary(summary:list):
+    width = max([len(name) for name, _, _ in summary] + [5])
+    print(f"\n{'Stage'.ljust(width)}  {'Status'.ljust(26)}  Time")
+    for name, status, seconds in summary:
+        print(f"{name.ljust(width)}  {status.ljust(26)}  {seconds:7.2f} s")
+    print(f"{'Total'.ljust(width)}  {''.ljust(26)}  {sum(s for _, _, s in summary):7.2f} s")
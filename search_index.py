@@ -0,0 +1,147 @@
+import argparse
+import bisect
+import re
+import time
+import unicodedata
+
+import numpy as np
+
+from study_store import MISSING
+
+# Weight of a term occurrence per field, a match in the title counts more than one in the abstract
+FIELD_WEIGHTS = {'Title': 3.0, 'Keywords': 2.0, 'Authors': 2.0, 'Abstract': 1.0}
+
+# BM25 parameters: term frequency saturation and document length normalization
+K1 = 1.2
+B = 0.75
+
+# A prefix term like "gest*" is expanded to at most this many vocabulary terms (the most frequent ones)
+MAX_PREFIX_TERMS = 100
+
+
+def tokenize(text: str) -> list:
+    # Lowercase words without accents, so "Röddiger" is also found by "roddiger"
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+
+def parse_query(query: str) -> list:
+    """Return the (term, is_prefix) clauses of a query, a word ending in "*" is a prefix ("earph*")."""
+    clauses = []
+    for word in query.split():
+        terms = tokenize(word)
+        for i, term in enumerate(terms):
+            clauses.append((term, word.endswith('*') and i == len(terms) - 1))
+    return clauses
+
+
+class SearchIndex:
+    """BM25 inverted index over the text fields of the studies.
+
+    Every term maps to a posting list of (study position, weighted term frequency), where an
+    occurrence counts with the weight of its field (FIELD_WEIGHTS). A study matches a query if it
+    contains every query term (or, for a prefix term, any vocabulary term starting with it), and
+    matches are ranked by the sum of their BM25 scores per query term.
+    """
+
+    def __init__(self, ids: list, documents: dict, version: str = ""):
+        self.ids = [int(i) for i in ids]
+        self.version = version
+
+        term_frequencies = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float64)
+        for field, texts in documents.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for position, text in enumerate(texts):
+                if text == MISSING:
+                    continue
+                for term in tokenize(text):
+                    frequencies = term_frequencies.setdefault(term, {})
+                    frequencies[position] = frequencies.get(position, 0.0) + weight
+                    lengths[position] += weight
+
+        # Sorted, so the terms with a given prefix are one contiguous range
+        self.terms = sorted(term_frequencies)
+        self.postings = {}
+        average_length = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+        for term in self.terms:
+            positions = np.fromiter(term_frequencies[term].keys(), dtype=np.int64)
+            frequencies = np.fromiter(term_frequencies[term].values(), dtype=np.float64)
+            idf = np.log(1 + (len(self.ids) - len(positions) + 0.5) / (len(positions) + 0.5))
+            # Scores are precomputed per posting, a query only sums them up
+            scores = idf * frequencies * (K1 + 1) / (frequencies + K1 * (1 - B + B * lengths[positions] / average_length))
+            self.postings[term] = (positions, scores)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_store(cls, store):
+        documents = {field: store.cell(field) for field in FIELD_WEIGHTS if field in store.columns}
+        return cls(store.ids, documents, store.source_sha256)
+
+    def expand(self, term: str, is_prefix: bool) -> list:
+        if not is_prefix:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.terms, term)
+        stop = start
+        while stop < len(self.terms) and self.terms[stop].startswith(term):
+            stop += 1
+        expanded = self.terms[start:stop]
+        if len(expanded) > MAX_PREFIX_TERMS:
+            expanded = sorted(expanded, key=lambda t: -len(self.postings[t][0]))[:MAX_PREFIX_TERMS]
+        return expanded
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Return the (id, score) pairs of the studies matching every query term, best first."""
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+
+        total = np.zeros(len(self.ids))
+        matched_all = np.ones(len(self.ids), dtype=bool)
+        for term, is_prefix in clauses:
+            # A study matching several expansions of a prefix counts with its best one
+            clause_scores = np.zeros(len(self.ids))
+            matched = np.zeros(len(self.ids), dtype=bool)
+            for expanded_term in self.expand(term, is_prefix):
+                positions, scores = self.postings[expanded_term]
+                np.maximum.at(clause_scores, positions, scores)
+                matched[positions] = True
+            total += clause_scores
+            matched_all &= matched
+
+        positions = np.flatnonzero(matched_all)
+        order = np.lexsort((np.asarray(self.ids)[positions], -total[positions]))
+        if limit is not None:
+            order = order[:limit]
+        return [(self.ids[positions[i]], float(total[positions[i]])) for i in order]
+
+
+def main():
+    from study_store import load_study_store
+
+    parser = argparse.ArgumentParser(description="Search the studies by title, abstract, keywords and authors.")
+    parser.add_argument("query", help='search terms, all of them have to match; end a term with "*" for a prefix search')
+    parser.add_argument("-k", type=int, default=10, help="number of results to show")
+    args = parser.parse_args()
+
+    store = load_study_store()
+    start = time.perf_counter()
+    index = SearchIndex.from_store(store)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = index.search(args.query)
+    query_seconds = time.perf_counter() - start
+
+    titles = dict(zip(store.ids.tolist(), store.text['Title']))
+    print(f"{len(results)} of {len(index)} studies match (index built in {build_seconds * 1000:.1f} ms, "
+          f"query took {query_seconds * 1000:.2f} ms)")
+    for study_id, score in results[:args.k]:
+        print(f"{score:7.2f}  {study_id:4d}  {titles[study_id]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Results kept per snapshot, an entry holds the edges of one (weights, subset, threshold) combination
+EDGE_CACHE_SIZE = 256
+
+# Blended matrices kept per snapshot, each one is a full n x n float matrix
+MATRIX_CACHE_SIZE = 4
+
+# Binary matrix encoding: magic, format version, bytes per value, n, scale (little-endian), followed by
+# n uint32 study IDs and the n * (n - 1) / 2 quantized values of the upper triangle, row by row
+MATRIX_MAGIC = b"SIMQ"
+MATRIX_FORMAT_VERSION = 1
+MATRIX_HEADER = struct.Struct("<4sBBxxIf")
+
+# Quantized value that stands for a missing similarity, the smallest value of the integer type
+QUANTIZED_DTYPES = {8: np.dtype("<i1"), 16: np.dtype("<i2")}
+
+# Weights are rounded to this many decimals, so slider positions that differ by rounding noise share a cache entry
+WEIGHT_DECIMALS = 3
+
+
+class LRUCache:
+    """Thread-safe mapping that keeps at most maxsize entries and evicts the least recently used one."""
+
+    def __init__(self, maxsize:int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # Computed outside the lock, two concurrent misses of the same key only cost the work twice
+        value = compute()
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+
+def subset_key(ids) -> str:
+    # Order-independent hash of a set of study IDs, None stands for all studies
+    if ids is None:
+        return "all"
+    return hashlib.sha1(",".join(str(i) for i in sorted(set(ids))).encode("utf-8")).hexdigest()
+
+
+def standardize(matrix:np.ndarray) -> np.ndarray:
+    # z-scores over all values that are not NaN (the diagonal is NaN)
+    mean = np.nanmean(matrix)
+    std = np.nanstd(matrix)
+    return (matrix - mean) / std if std > 0 else matrix - mean
+
+
+def encode_upper_triangle(matrix:np.ndarray, ids:list, bits:int = 16) -> bytes:
+    """Encode the upper triangle of a symmetric similarity matrix as quantized integers (see MATRIX_HEADER).
+
+    A value v is stored as round(v / scale), with scale chosen so the largest absolute value maps to
+    the largest integer; missing values are stored as the smallest integer. For z-scores within
+    [-6, 6], 16 bits keep an error below 0.0001 and 8 bits below 0.025.
+    """
+    if bits not in QUANTIZED_DTYPES:
+        raise ValueError(f"bits must be one of {', '.join(str(b) for b in QUANTIZED_DTYPES)}")
+    dtype = QUANTIZED_DTYPES[bits]
+    info = np.iinfo(dtype)
+    values = matrix[np.triu_indices(len(ids), k=1)]
+    missing = np.isnan(values)
+    largest = np.abs(values[~missing]).max() if (~missing).any() else 0.0
+    scale = float(largest / info.max) if largest > 0 else 1.0
+    quantized = np.full(len(values), info.min, dtype=dtype)
+    quantized[~missing] = np.clip(np.rint(values[~missing] / np.float32(scale)), -info.max, info.max)
+    header = MATRIX_HEADER.pack(MATRIX_MAGIC, MATRIX_FORMAT_VERSION, dtype.itemsize, len(ids), scale)
+    return header + np.asarray(ids, dtype="<u4").tobytes() + quantized.tobytes()
+
+
+def decode_upper_triangle(payload:bytes) -> tuple:
+    """Return the study IDs and the symmetric float matrix (NaN for missing values) of an encoded matrix."""
+    magic, version, itemsize, n, scale = MATRIX_HEADER.unpack_from(payload)
+    if magic != MATRIX_MAGIC or version != MATRIX_FORMAT_VERSION:
+        raise ValueError("Not an encoded similarity matrix")
+    dtype = QUANTIZED_DTYPES[itemsize * 8]
+    ids = np.frombuffer(payload, dtype="<u4", count=n, offset=MATRIX_HEADER.size)
+    quantized = np.frombuffer(payload, dtype=dtype, offset=MATRIX_HEADER.size + 4 * n)
+    values = np.where(quantized == np.iinfo(dtype).min, np.nan, quantized * np.float64(np.float32(scale)))
+    matrix = np.full((n, n), np.nan)
+    rows, columns = np.triu_indices(n, k=1)
+    matrix[rows, columns] = values
+    matrix[columns, rows] = values
+    return ids.astype(int).tolist(), matrix
+
+
+class BlendedSimilarity:
+    """Weighted combination of the z-standardized similarity matrices of the studies.
+
+    matrices maps a name ('abstract', 'database') to a square DataFrame indexed by study ID, as in the
+    normalized similarity CSVs. All matrices are aligned to the union of their study IDs, pairs
+    missing from a matrix with a non-zero weight have no similarity. A blend of several matrices is
+    z-standardized again, so thresholds keep their meaning of standard deviations above the mean.
+    """
+
+    def __init__(self, matrices:dict):
+        self.ids = sorted(set().union(*(set(int(i) for i in df.index) for df in matrices.values())))
+        self.position = {study_id: i for i, study_id in enumerate(self.ids)}
+        self.matrices = {}
+        for name, df in matrices.items():
+            df = df.copy()
+            df.index = df.index.astype(int)
+            df.columns = df.columns.astype(int)
+            self.matrices[name] = df.reindex(index=self.ids, columns=self.ids).to_numpy(dtype=np.float64)
+        self.matrix_cache = LRUCache(MATRIX_CACHE_SIZE)
+        self.edge_cache = LRUCache(EDGE_CACHE_SIZE)
+
+    def normalize_weights(self, weights:dict) -> tuple:
+        """Return the weights as a sorted tuple of (name, weight) summing to 1, raises ValueError for invalid weights."""
+        unknown = [name for name in weights if name not in self.matrices]
+        if unknown:
+            raise ValueError(f"Unknown similarity {', '.join(unknown)}, available: {', '.join(self.matrices)}")
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Weights must not be negative")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("At least one weight must be positive")
+        return tuple(sorted((name, round(weight / total, WEIGHT_DECIMALS)) for name, weight in weights.items() if weight > 0))
+
+    def blended_matrix(self, weights:tuple) -> np.ndarray:
+        def compute():
+            if len(weights) == 1:
+                # A single matrix is already standardized and is returned unchanged
+                return self.matrices[weights[0][0]]
+            return standardize(sum(weight * self.matrices[name] for name, weight in weights))
+        return self.matrix_cache.get_or_compute(weights, compute)
+
+    def encoded_matrix(self, weights:dict, bits:int = 16) -> bytes:
+        """Return the blended matrix of all studies in the binary encoding of encode_upper_triangle."""
+        weights = self.normalize_weights(weights)
+        return self.edge_cache.get_or_compute(("encoded", weights, bits), lambda: encode_upper_triangle(self.blended_matrix(weights), self.ids, bits))
+
+    def edges(self, weights:dict, ids:list = None, threshold:float = 1.0) -> dict:
+        """Return the study IDs and the [source, target, similarity] edges with a similarity of at least threshold.
+
+        ids restricts the result to these studies (e.g. the ones left by the active filters), IDs
+        without any similarity are dropped. Every pair appears once, with the smaller position first.
+        """
+        weights = self.normalize_weights(weights)
+        threshold = round(float(threshold), 4)
+
+        def compute():
+            if ids is None:
+                positions = np.arange(len(self.ids))
+            else:
+                positions = np.asarray(sorted({self.position[int(i)] for i in ids if int(i) in self.position}), dtype=np.int64)
+            submatrix = self.blended_matrix(weights)[np.ix_(positions, positions)]
+            # NaN compares as False, so missing pairs and the diagonal never become edges
+            with np.errstate(invalid="ignore"):
+                sources, targets = np.nonzero(np.triu(submatrix >= threshold, k=1))
+            study_ids = np.asarray(self.ids, dtype=np.int64)[positions]
+            return {
+                'ids': study_ids.tolist(),
+                'edges': [[int(study_ids[s]), int(study_ids[t]), float(submatrix[s, t])] for s, t in zip(sources, targets)],
+            }
+
+        return self.edge_cache.get_or_compute((weights, subset_key(ids), threshold), compute)
+
+
+def load_blended_similarity(paths:dict) -> BlendedSimilarity:
+    return BlendedSimilarity({name: pd.read_csv(path, index_col=0) for name, path in paths.items()})
@@ -0,0 +1,272 @@
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from scipy import sparse
+
+# Memory per worker in MB that the row blocks are sized for, unless a block size is given
+DEFAULT_MEMORY_BUDGET = 256
+
+# Bytes per cell of a block while it is computed and stored: the float64 similarities, one float64
+# buffer for the numeric columns (reused for the intersections, see INTERSECTION_BYTES_PER_CELL),
+# their NaN mask and the copies that top-k selection makes
+BYTES_PER_CELL = 32
+
+# Bytes per pair of studies sharing a value while its intersection is added: the int32 sparse product
+# and its COO copy, the int64 set sizes of both studies and the float64 denominator and quotient
+INTERSECTION_BYTES_PER_CELL = 40
+
+MODES = ("full", "upper", "topk")
+
+
+## FEATURE ENCODING
+
+def encode_database_features(numeric, value_sets:list) -> dict:
+    """Encode the studies for database_similarity_block.
+
+    numeric is an (n, columns) float matrix with NaN for missing values. value_sets holds one list per
+    string/multi-value column with the set of values of every study (empty if missing), e.g. from
+    similarity_value_sets of the update script. Every such column becomes a sparse binary indicator matrix over its values,
+    so the shared values of two studies are a single sparse product.
+    """
+    numeric = np.asarray(numeric, dtype=np.float64)
+
+    indicators = []
+    set_sizes = []
+    for sets in value_sets:
+        vocabulary = {}
+        rows, cols = [], []
+        for i, values in enumerate(sets):
+            for value in values:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(value, len(vocabulary)))
+        indicators.append(sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                            shape=(len(sets), max(1, len(vocabulary)))))
+        set_sizes.append(np.asarray([len(values) for values in sets], dtype=np.int64))
+
+    return {
+        'numeric': numeric,
+        'indicators': indicators,
+        'set_sizes': set_sizes,
+        'n_features': numeric.shape[1] + len(value_sets),
+    }
+
+
+def encode_embeddings(embeddings) -> dict:
+    # Normalized once, so every block is a plain matrix product
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return {'unit': embeddings / norms}
+
+
+## BLOCK KERNELS
+
+def database_similarity_block(features:dict, start:int, stop:int) -> np.ndarray:
+    """Similarities of studies start..stop-1 to all studies, as calculate_similarity computes them.
+
+    Features are accumulated in the same order as calculate_similarity, so for the same value sets
+    the results match it bit for bit: 1 - |a - b| per numeric column (0 if either is missing) and
+    the adjusted Jaccard |A & B| / sqrt(|A| * |B|) per string column.
+    """
+    numeric = features['numeric']
+    n = numeric.shape[0]
+    similarity = np.zeros((stop - start, n))
+
+    # One buffer for all numeric columns instead of a new block-sized array per operation
+    difference = np.empty_like(similarity)
+    for col in range(numeric.shape[1]):
+        np.subtract(numeric[start:stop, col][:, None], numeric[None, :, col], out=difference)
+        np.abs(difference, out=difference)
+        np.subtract(1, difference, out=difference)
+        difference[np.isnan(difference)] = 0.0
+        similarity += difference
+    del difference
+
+    # Only studies sharing a value contribute, so the intersections are usually sparse. A value shared by
+    # most studies (e.g. "Yes") makes them dense, so they are added in row chunks that need at most the
+    # 8 bytes per cell of the buffer freed above
+    chunk_rows = max(1, (stop - start) * 8 // INTERSECTION_BYTES_PER_CELL)
+    for indicator, sizes in zip(features['indicators'], features['set_sizes']):
+        for chunk_start in range(start, stop, chunk_rows):
+            intersection = (indicator[chunk_start:min(chunk_start + chunk_rows, stop)] @ indicator.T).tocoo()
+            denominator = np.sqrt(sizes[chunk_start + intersection.row] * sizes[intersection.col])
+            similarity[chunk_start - start + intersection.row, intersection.col] += intersection.data / denominator
+
+    if features['n_features'] > 0:
+        similarity /= features['n_features']
+    return similarity
+
+
+def cosine_similarity_block(features:dict, start:int, stop:int) -> np.ndarray:
+    return features['unit'][start:stop] @ features['unit'].T
+
+
+KERNELS = {
+    'database': database_similarity_block,
+    'cosine': cosine_similarity_block,
+}
+
+
+## ENGINE
+
+def topk_indices_path(output_path:str) -> str:
+    return output_path[:-len(".npy")] + "_indices.npy" if output_path.endswith(".npy") else output_path + "_indices.npy"
+
+
+def block_rows(n:int, memory_budget:float = DEFAULT_MEMORY_BUDGET) -> int:
+    # Rows per block so that one block of n columns stays within memory_budget MB
+    return max(1, int(memory_budget * 2**20 // (max(n, 1) * BYTES_PER_CELL)))
+
+
+def upper_offset(i:int, n:int) -> int:
+    # Start of row i in the condensed upper triangle (same layout as scipy.spatial.distance.squareform)
+    return i * n - i * (i + 1) // 2
+
+
+def _store_block(block:np.ndarray, start:int, stop:int, outputs:tuple, mode:str, top_k:int, diagonal):
+    n = block.shape[1]
+    rows = np.arange(start, stop)
+
+    if mode == "full":
+        if diagonal is not None:
+            block[rows - start, rows] = diagonal
+        outputs[0][start:stop] = block
+    elif mode == "upper":
+        for i in rows:
+            offset = upper_offset(i, n)
+            outputs[0][offset:offset + n - i - 1] = block[i - start, i + 1:]
+    else:
+        # Self-similarity is never a neighbour
+        block[rows - start, rows] = -np.inf
+        indices = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+        values = np.take_along_axis(block, indices, axis=1)
+        order = np.argsort(-values, axis=1, kind="stable")
+        outputs[0][start:stop] = np.take_along_axis(values, order, axis=1)
+        outputs[1][start:stop] = np.take_along_axis(indices, order, axis=1)
+
+
+# Set in every worker process by _init_worker, so features are shipped once per worker instead of once per block
+_worker_state = {}
+
+
+def _init_worker(kernel_name:str, features:dict, output_paths:tuple, mode:str, top_k:int, diagonal):
+    _worker_state.update(kernel=KERNELS[kernel_name], features=features, output_paths=output_paths,
+                         mode=mode, top_k=top_k, diagonal=diagonal)
+
+
+def _compute_block(bounds:tuple):
+    # Runs in a worker process and writes its rows straight into the memory-mapped output files
+    start, stop = bounds
+    state = _worker_state
+    block = state['kernel'](state['features'], start, stop)
+    outputs = tuple(open_memmap(path, mode="r+") for path in state['output_paths'])
+    _store_block(block, start, stop, outputs, state['mode'], state['top_k'], state['diagonal'])
+    for output in outputs:
+        output.flush()
+
+
+def pairwise_similarity(kernel_name:str, features:dict, n:int, output_path:str = None, mode:str = "full", top_k:int = 10,
+                        block_size:int = None, max_workers:int = None, diagonal:float = None, dtype=np.float32,
+                        memory_budget:float = DEFAULT_MEMORY_BUDGET):
+    """Compute all pairwise similarities of n items in row blocks.
+
+    mode "full" returns the n x n matrix, "upper" the condensed upper triangle without the diagonal
+    (n * (n - 1) / 2 values) and "topk" a (values, indices) pair with the top_k most similar other
+    items per row, best first. diagonal overrides the self-similarity in "full" mode.
+
+    With output_path the results are written into .npy files that are memory-mapped (top-k indices
+    go next to it, see topk_indices_path) and the blocks are spread over a process pool, so memory
+    stays bounded by block_size * n per worker. Without output_path everything is computed in this
+    process and returned as regular arrays, which is what the small checked-in corpus needs.
+    Without block_size, the blocks are sized to need at most memory_budget MB each.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+    top_k = max(1, min(top_k, n - 1))
+
+    if mode == "full":
+        shapes = [((n, n), dtype)]
+    elif mode == "upper":
+        shapes = [((n * (n - 1) // 2,), dtype)]
+    else:
+        shapes = [((n, top_k), dtype), ((n, top_k), np.int32)]
+
+    block_size = block_size or block_rows(n, memory_budget)
+    blocks = [(start, min(start + block_size, n)) for start in range(0, n, block_size)]
+
+    if output_path is None:
+        outputs = tuple(np.zeros(shape, dtype=output_dtype) for shape, output_dtype in shapes)
+        for start, stop in blocks:
+            _store_block(KERNELS[kernel_name](features, start, stop), start, stop, outputs, mode, top_k, diagonal)
+        return outputs if mode == "topk" else outputs[0]
+
+    output_paths = (output_path, topk_indices_path(output_path))[:len(shapes)]
+    for path, (shape, output_dtype) in zip(output_paths, shapes):
+        # Allocates the files up front, workers only ever open them in r+ mode
+        open_memmap(path, mode="w+", dtype=output_dtype, shape=shape).flush()
+
+    initargs = (kernel_name, features, output_paths, mode, top_k, diagonal)
+    if len(blocks) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=initargs) as executor:
+            list(executor.map(_compute_block, blocks))
+    else:
+        _init_worker(*initargs)
+        for bounds in blocks:
+            _compute_block(bounds)
+
+    outputs = tuple(np.load(path, mmap_mode="r") for path in output_paths)
+    return outputs if mode == "topk" else outputs[0]
+
+
+def save_similarity_ids(output_path:str, ids:list, mode:str, top_k:int = None):
+    # The .npy files only hold positions, this sidecar maps them back to study IDs
+    with open(output_path + ".json", "w", encoding="utf-8") as f:
+        json.dump({"ids": [int(i) for i in ids], "mode": mode, "top_k": top_k}, f)
+
+
+def load_similarity(output_path:str):
+    """Open a similarity written by pairwise_similarity read-only, returns (ids, meta, arrays)."""
+    with open(output_path + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = np.load(output_path, mmap_mode="r")
+    if meta["mode"] == "topk":
+        arrays = (arrays, np.load(topk_indices_path(output_path), mmap_mode="r"))
+    return meta["ids"], meta, arrays
+
+
+def main():
+    # Imported here since the update script itself imports this module
+    from update_similarity_matrices_and_author_connections import database_similarity_features, read_embeddings, read_store
+
+    parser = argparse.ArgumentParser(description="Compute a pairwise similarity of the studies into memory-mapped .npy files.")
+    parser.add_argument("kind", choices=["database", "abstract"])
+    parser.add_argument("output", help="output .npy file, a .json file with the study IDs is written next to it")
+    parser.add_argument("--mode", choices=MODES, default="upper")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--block-size", type=int, default=None, help="rows per block, by default sized from --memory-budget")
+    parser.add_argument("--memory-budget", type=float, default=DEFAULT_MEMORY_BUDGET, help="MB per worker process")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.kind == "database":
+        store = read_store()
+        ids = store.ids.tolist()
+        features = database_similarity_features(store)
+        kernel_name, diagonal = 'database', 1.0
+    else:
+        abstract_embeddings_df = read_embeddings()
+        ids = abstract_embeddings_df['ID'].tolist()
+        features = encode_embeddings(abstract_embeddings_df['Gemini-Embedding'].tolist())
+        kernel_name, diagonal = 'cosine', None
+
+    pairwise_similarity(kernel_name, features, len(ids), args.output, mode=args.mode, top_k=args.top_k,
+                        block_size=args.block_size, max_workers=args.workers, diagonal=diagonal, memory_budget=args.memory_budget)
+    save_similarity_ids(args.output, ids, args.mode, args.top_k if args.mode == "topk" else None)
+    print(f"Wrote {args.mode} similarity of {len(ids)} studies to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
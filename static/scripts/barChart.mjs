@@ -1,4 +1,4 @@
-import { filterData, cleanDataString, specialOrders, showStudyModal, defaultColors } from "./dataUtility.mjs";
+import { filterData, getDataValues, specialOrders, showStudyModal, defaultColors } from "./dataUtility.mjs";
 
 // The available categories passed by the server for the bar charts
 const categories = $("body").data("filter-categories");
@@ -93,7 +93,7 @@ function createBarCharts() {
   // Create a bar chart for each active category
   for (const category of activeCategories) {
     // Only provide the data needed for the current category
-    const barData = activeData.map(entry => entry[category]);
+    const barData = activeData.map(entry => getDataValues(entry["ID"], category));
 
     // Create the bar chart for the current category
     createBarChart(barData, category);
@@ -155,8 +155,7 @@ function createBarChart(barData, category) {
 function createBarChartData(barData, category) {
   // Count the occurrences of each value in the data entries
   const occurrences = {};
-  for (const entry of barData) {
-    const values = cleanDataString(category, entry.toString());
+  for (const values of barData) {
     for (const value of values) {
       occurrences[value] = (occurrences[value] || 0) + 1;
     }
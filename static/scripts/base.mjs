@@ -1,4 +1,4 @@
-import { convertToID, updateFilters } from "./dataUtility.mjs";
+import { apiURL, convertToID, updateFilters } from "./dataUtility.mjs";
 
 // Highlight the current view in the navbar
 const selectedView = $("nav").data("current-view");
@@ -110,6 +110,12 @@ if (!exclusiveFilters) {
   });
 };
 
+// Restore the full-text search of this session, its results are applied in filterData
+if (filters.search) {
+  $("#search-input").val(filters.search.query);
+  $("#search-status").text(`${filters.search.ids.length} matching studies`);
+}
+
 function getSliderConfig(startValues, min, max) {
   return {
     start: startValues,
@@ -212,7 +218,51 @@ function deselectAll(checkboxSelection) {
   checkboxSelection.find(".value-filter").first().trigger("change");
 }
 
+/**
+ * Runs a full-text search in the backend and stores the ranked IDs of the matching studies with the filters,
+ * so every view combines them with the other filters (see filterData). An empty query removes the search.
+ *
+ * @param {string} query - The search terms, words ending with "*" are prefixes.
+ */
+function runSearch(query) {
+  const applySearch = (search, status) => {
+    const filters = JSON.parse(window.sessionStorage.getItem("filters"));
+    filters.search = search;
+    updateFilters(filters);
+    $("#search-status").text(status);
+
+    // Trigger the change event only once so the current view is redrawn
+    $(".value-filter").first().trigger("change");
+  };
+
+  if (!query) {
+    applySearch(null, "");
+    return;
+  }
+
+  $.getJSON(`${apiURL}/search`, {q: query})
+    .done(response => {
+      // Ignore answers to queries that have been typed over in the meantime
+      if ($("#search-input").val().trim() !== query) {
+        return;
+      }
+      const ids = response.results.map(result => result.id);
+      applySearch({query: query, ids: ids}, `${ids.length} matching studies`);
+    })
+    .fail(() => {
+      $("#search-status").text("Search is currently unavailable");
+    });
+}
+
 $(document).ready(function() {
+  // Search while typing, but only once the user paused for a moment
+  let searchTimeout = null;
+  $("#search-input").on("input", function() {
+    clearTimeout(searchTimeout);
+    const query = $(this).val().trim();
+    searchTimeout = setTimeout(() => runSearch(query), 250);
+  });
+
   // Add event listener to each value filter to update the session storage
   $(".value-filter").on("change", function() {
     // Get the ID of the checkbox and convert it to a format suitable for storage
@@ -1,4 +1,4 @@
-import { getDataEntry, cleanDataString, defaultColor } from './dataUtility.mjs';
+import { getDataValues, defaultColor } from './dataUtility.mjs';
 
 const evenPie = d3.pie()
   .value(d => 1)
@@ -10,7 +10,7 @@ function getColors(node, colorCategory, colorScale) {
     return [defaultColor];
   }
 
-  const values = cleanDataString(colorCategory, getDataEntry(node, colorCategory).toString());
+  const values = getDataValues(node, colorCategory);
   const colors = values.map(value => colorScale(value)).filter(Boolean);
 
   return colors;
@@ -129,7 +129,7 @@ function createLegend(nodes, colorScale, category, legendContainer) {
 
   const uniqueValues = new Set();
   for (const node of nodes) {
-    const values = cleanDataString(category, getDataEntry(node, category).toString());
+    const values = getDataValues(node, category);
     values.forEach(value => uniqueValues.add(value));
   }
 
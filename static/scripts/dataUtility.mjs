@@ -8,30 +8,40 @@
 const data = parseData($("body").data("data"));
 
 /**
- * The categories for which parenthises should be removed when filtering.
- * 
+ * The values of every study per category, already split and cleaned by the backend's study store.
+ * Each category holds its distinct values once and, per study, the indices of its values.
+ *
  * @constant
- * @type {Array}
+ * @type {{ids: number[], columns: Object.<string, {values: string[], codes: number[][]}>}}
+ * @see getDataValues
  */
-const parenthicalCategories = $("body").data("parenthical-categories");
+const studyValues = $("body").data("data-values");
 
-const filterCategories = $("body").data("filter-categories");
+/**
+ * Position of every study ID in {@link studyValues}.
+ *
+ * @constant
+ * @type {Map<string, number>}
+ */
+const studyValuePositions = new Map(studyValues.ids.map((id, position) => [id.toString(), position]));
 
 /**
- * The abstracts for the studies passed from the backend.
+ * The categories for which parenthises should be removed when filtering.
  * 
  * @constant
  * @type {Array}
  */
-const abstracts = $("body").data("abstracts");
+const parenthicalCategories = $("body").data("parenthical-categories");
+
+const filterCategories = $("body").data("filter-categories");
 
 /**
- * The titles for the studies passed from the backend.
+ * The base URL of the backend's JSON API, e.g. for searching studies and loading their abstracts.
  *
  * @constant
- * @type {Array}
+ * @type {string}
  */
-const titles = $("body").data("titles");
+const apiURL = $("body").data("api-url");
 
 
 /**
@@ -160,10 +170,30 @@ function cleanDataString(category, dataString) {
   return dataValues;
 }
 
+/**
+ * Returns the cleaned values of a study for a category, as {@link cleanDataString} would produce them
+ * from the data string, but looked up from {@link studyValues} instead of parsing the string again.
+ *
+ * @param {string|number} id - The ID of the study.
+ * @param {string} category - The category to retrieve the values for.
+ * @returns {string[]} An array of cleaned data values.
+ */
+function getDataValues(id, category) {
+  const column = studyValues.columns[category];
+  const position = studyValuePositions.get(id.toString());
+
+  // Categories without precomputed values (e.g. free text) are cleaned on the fly
+  if (column === undefined || position === undefined) {
+    return cleanDataString(category, getDataEntry(id, category).toString());
+  }
+  return column.codes[position].map(code => column.values[code]);
+}
+
 /**
  * Filters the global {@link data} array based on the provided categories and filter criteria.
  * Each data entry must match at least one value for each category to be included in the result.
  * For range filters, the data value must fall within the specified range.
+ * If a full-text search is active ({@link filters.search}), only its results are kept, ordered by their rank.
  *
  * Uses {@link getActiveFilters} to retrieve active filters for each category.
  *
@@ -184,7 +214,7 @@ function filterData(filters) {
       }
 
       // Every other category is a value filter
-      const dataValues = cleanDataString(category, dataItem[category].toString());
+      const dataValues = getDataValues(dataItem["ID"], category);
 
       // If there are no active filters for the category, we can skip the check
       if (filterValues.length === 0) {
@@ -200,6 +230,15 @@ function filterData(filters) {
       return dataValues.some(dataValue => filterValues.includes(dataValue));
     });
   });
+
+  // An active full-text search narrows the studies down further and orders them by relevance
+  const searchIDs = filters.search ? filters.search.ids : null;
+  if (searchIDs) {
+    const ranks = new Map(searchIDs.map((id, rank) => [id.toString(), rank]));
+    return activeData
+      .filter(dataItem => ranks.has(dataItem["ID"].toString()))
+      .sort((a, b) => ranks.get(a["ID"].toString()) - ranks.get(b["ID"].toString()));
+  }
   return activeData;
 }
 
@@ -240,7 +279,7 @@ function getActiveFilters(category, filters) {
 /**
  * Sorts an array of nodes based on a specified category, returning the sorted nodes and a color scale function.
  * 
- * This function uses {@link getDataEntry} to extract category values for each node and {@link createColorScale} to generate a color scale for the unique values.
+ * This function uses {@link getDataValues} to extract category values for each node and {@link createColorScale} to generate a color scale for the unique values.
  * Nodes are sorted by the number of category values, then by the order of their values in the color scale, and finally by their IDs.
  * 
  * @param {Array<string>} nodes - The array of node IDs to sort.
@@ -257,7 +296,7 @@ function sortNodesByCategory(nodes, category) {
   const valueMap = {};
   nodes.forEach(node => {
     // Get the values for the selected category from the data matching the node ID, category is defined at this point
-    const values = cleanDataString(category, getDataEntry(node, category).toString());
+    const values = getDataValues(node, category);
     valueMap[node] = [];
 
     // Add each value to the value map and the unique values set
@@ -393,13 +432,28 @@ function showStudyModal(studyID) {
   // Add Study Summary to the infoHTML
   infoHTML.push(`
     <h5 class="study-info-panel-header">Study Summary</h5>
-    <strong>Title</strong>: ${titles.find(elem => elem["ID"] === entry["ID"])["Title"] || "N/A"}<br />
+    <strong>Title</strong>: <span id="study-info-title">Loading...</span><br />
     <strong>Keywords</strong>: ${entry["Keywords"] || "N/A"}<br />
-    <strong>Abstract</strong>: ${abstracts.find(elem => elem["ID"] === entry["ID"])["Abstract"] || "N/A"}<br />
+    <strong>Abstract</strong>: <span id="study-info-abstract">Loading...</span><br />
   `)
 
   $(`#study-info-modal-body`).html(infoHTML.join("<br />"));
 
+  // Title and abstract are only loaded from the backend when a study is opened
+  $(`#study-info-modal`).data("study-id", studyID.toString());
+  $.getJSON(`${apiURL}/study/${studyID}`)
+    .done(summary => {
+      // Ignore the answer if another study has been opened in the meantime
+      if ($(`#study-info-modal`).data("study-id") !== studyID.toString()) {
+        return;
+      }
+      $("#study-info-title").text(summary["Title"] || "N/A");
+      $("#study-info-abstract").text(summary["Abstract"] || "N/A");
+    })
+    .fail(() => {
+      $("#study-info-title, #study-info-abstract").text("N/A");
+    });
+
   // Add link to the study in the modal body
   $("#study-link").attr("href", entry["Study Link"]);
 
@@ -407,4 +461,58 @@ function showStudyModal(studyID) {
   $(`#study-info-modal`).modal("show");
 }
 
-export  {data, colorPalette, defaultColor, updateFilters, convertToID, getCategory, getValue, filterData, getActiveFilters, parseData, getDataEntry, showStudyModal, createColorScale, sortNodesByCategory, cleanDataString, specialOrders, defaultColors};
\ No newline at end of file
+/**
+ * Decodes a similarity matrix in the binary encoding of /api/similarity/matrix: a 16 byte header
+ * (magic "SIMQ", format version, bytes per value, number of studies n, scale as float32, little-endian),
+ * n uint32 study IDs and the quantized upper triangle row by row, with the smallest integer for missing values.
+ *
+ * @param {ArrayBuffer} buffer - The response body.
+ * @returns {{ids: string[], similarity: function(string|number, string|number): (number|null)}} The study IDs and
+ * a lookup of the similarity between two studies (null if missing or for the same study).
+ */
+function decodeSimilarityMatrix(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "SIMQ" || view.getUint8(4) !== 1) {
+    throw new Error("Not an encoded similarity matrix");
+  }
+  const bytesPerValue = view.getUint8(5);
+  const n = view.getUint32(8, true);
+  const scale = view.getFloat32(12, true);
+
+  const ids = Array.from(new Uint32Array(buffer.slice(16, 16 + 4 * n)), id => id.toString());
+  // Typed arrays use the platform byte order, which is little-endian in all browsers in use
+  const valueBuffer = buffer.slice(16 + 4 * n);
+  const values = bytesPerValue === 1 ? new Int8Array(valueBuffer) : new Int16Array(valueBuffer);
+  const missing = bytesPerValue === 1 ? -128 : -32768;
+  const positions = new Map(ids.map((id, position) => [id, position]));
+
+  function similarity(idA, idB) {
+    let i = positions.get(idA.toString());
+    let j = positions.get(idB.toString());
+    if (i === undefined || j === undefined || i === j) return null;
+    if (i > j) [i, j] = [j, i];
+    // Row i of the upper triangle starts after the n - 1 + n - 2 + ... + n - i values of the rows before
+    const value = values[i * n - (i * (i + 1)) / 2 + (j - i - 1)];
+    return value === missing ? null : value * scale;
+  }
+
+  return { ids, similarity };
+}
+
+/**
+ * Loads the (blended) similarity matrix of all studies in the compact binary encoding, see {@link decodeSimilarityMatrix}.
+ *
+ * @param {Object} weights - The weights of the similarities, e.g. {abstract: 0.5, database: 0.5}.
+ * @param {number} bits - 8 or 16 bits per value.
+ * @returns {Promise<Object>} The decoded matrix.
+ */
+async function fetchSimilarityMatrix(weights, bits = 16) {
+  const response = await fetch(`${apiURL}/similarity/matrix?${new URLSearchParams({ ...weights, bits })}`);
+  if (!response.ok) {
+    throw new Error(`Loading the similarity matrix failed with status ${response.status}`);
+  }
+  return decodeSimilarityMatrix(await response.arrayBuffer());
+}
+
+export  {data, apiURL, colorPalette, defaultColor, updateFilters, convertToID, getCategory, getValue, filterData, getActiveFilters, parseData, getDataEntry, showStudyModal, createColorScale, sortNodesByCategory, cleanDataString, getDataValues, decodeSimilarityMatrix, fetchSimilarityMatrix, specialOrders, defaultColors};
\ No newline at end of file
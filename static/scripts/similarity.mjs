@@ -1,8 +1,6 @@
-import { filterData, getDataEntry, showStudyModal, sortNodesByCategory } from "./dataUtility.mjs";
+import { apiURL, data, fetchSimilarityMatrix, filterData, getDataEntry, showStudyModal, sortNodesByCategory } from "./dataUtility.mjs";
 import { createLegend, highlightNode, removeHighlighting, drawNode } from "./d3DrawingUtility.mjs";
 
-// Load the similarity data from the HTML element
-const similarityData = $("#graphContainer").data("similarity");
 // Load the categories of the dropdown menu
 const filterCategories = $("body").data("filter-categories");
 const excluded_categories = $("#categoryDropdownContainer").data("excluded-categories");
@@ -11,18 +9,22 @@ const infoCirclePath = $("#graphContainer").data("info-circle-path");
 // Define some texts for the tooltips
 const abstractTooltip = "This visualization shows semantic similarity between paper abstracts. Similarities were calculated using Google Gemini embeddings (gemini-embedding-exp-03-07) with cosine similarity and then z-standardized. Values above 0 indicate above-average similarity (0=mean, 1=one standard deviation above mean). Higher thresholds show only the most similar papers.";
 const databaseTooltip = "This visualization shows similarity between studies based on features extracted from the database. Features were normalized and similarity was calculated based on their values.";
-
-const abstractStudyIDs = similarityData["abstract_study_ids"];
-const abstractMatrix = similarityData["abstract_matrix"];
-const databaseStudyIDs = similarityData["database_study_ids"];
-const databaseMatrix = similarityData["database_matrix"];
+const blendedTooltip = "This visualization combines the abstract and the database similarity, weighted by the slider below. The weighted sum is z-standardized again, so the threshold keeps its meaning of standard deviations above the mean.";
+const similarityTooltips = { abstract: abstractTooltip, database: databaseTooltip, blended: blendedTooltip };
+const similarityLabels = { abstract: "Abstract", database: "Database", blended: "Blended" };
 
 // Set the default similarity type from session storage or fallback to "database"
 let similarityType = window.sessionStorage.getItem("similarityType") || "database";
 $(`input[value='${similarityType}']`).prop("checked", true);
 
 // Add tooltip text based on the selected similarity type
-$("#thresholdInfoIcon").attr("title", similarityType === "abstract" ? abstractTooltip : databaseTooltip);
+$("#thresholdInfoIcon").attr("title", similarityTooltips[similarityType]);
+
+// Weight of the abstract similarity in the blended similarity, the database similarity gets the rest
+let abstractWeight = parseFloat(window.sessionStorage.getItem("abstractWeight"));
+if (isNaN(abstractWeight)) abstractWeight = 0.5;
+$("#abstractWeightValue").text(abstractWeight.toFixed(2));
+$("#weightContainer").toggle(similarityType === "blended");
 
 // Populate the color nodes dropdown menu
 filterCategories.forEach(category => {
@@ -69,6 +71,32 @@ noUiSlider.create(slider, {
   window.sessionStorage.setItem("similarityThreshold", similarityThreshold);
 });
 
+// Create the slider for the weight of the blended similarity
+noUiSlider.create(document.getElementById("weightSlider"), {
+  start: [abstractWeight],
+  connect: [true, false],
+  range: {
+    'min': 0,
+    'max': 1
+  },
+  step: 0.05,
+  tooltips: [true],
+  format: {
+    to: function (value) {
+        return value.toFixed(2);
+    },
+    from: function (value) {
+        return parseFloat(value);
+    }
+  },
+})
+.on("change", function(values, handle) {
+  abstractWeight = parseFloat(values[handle]);
+  $("#abstractWeightValue").text(abstractWeight.toFixed(2));
+  drawGraph(similarityThreshold);
+  window.sessionStorage.setItem("abstractWeight", abstractWeight);
+});
+
 /*
   Section for showing the modal
   - The modal is prepared with the information about the selected study
@@ -190,52 +218,81 @@ function openNetworkDetails(nodeID, links) {
   - The nodes have to be sorted by the selected category and how many values they have in that category
   - For each value there needs to be a color assigned
 */
-// Generate graph data from the similarity matrix, create links based on the threshold, and return sorted nodes, links and the color scale
-function generateGraphData(threshold) {
-  const { studyIDs, similarityMatrix } = getCurrentSimilarityData();
-  const links = [];
-  
-  // Sort the nodes by category if a category is selected
-  const {sortedNodes, colorScale} = sortNodesByCategory(studyIDs, $("#similarityColorCategory").val());
-  
-  // Only check each pair once (i < j)
-  for (let i = 0; i < sortedNodes.length; i++) {
-    for (let j = i + 1; j < sortedNodes.length; j++) {
-      const nodeA = sortedNodes[i];
-      const nodeB = sortedNodes[j];
-      
-      const similarity = similarityMatrix[parseInt(nodeA) - 1][parseInt(nodeB) - 1];
-      if (similarity && similarity >= threshold) {
-        links.push({
-          sourceID: nodeA,
-          targetID: nodeB,
-          value: similarity
-        });
-      }
-    }
+// Counts the requests for graph data, so the answer to an outdated request is not drawn over a newer one
+let graphDataRequest = 0;
+
+// Weights of the abstract and database similarity for the selected similarity type
+function getSimilarityWeights() {
+  if (similarityType === "abstract") return { abstract: 1, database: 0 };
+  if (similarityType === "database") return { abstract: 0, database: 1 };
+  return { abstract: abstractWeight, database: 1 - abstractWeight };
+}
+
+// Up to this many studies the whole (blended) matrix is loaded once per weights and thresholded in the browser,
+// so moving the threshold slider needs no request. Larger databases only receive the links that are drawn
+const MAX_MATRIX_STUDIES = 2000;
+
+// Decoded similarity matrices by their weights
+const similarityMatrices = new Map();
+
+// Links of the loaded matrix between the given studies with a similarity of at least threshold, in the format of /api/similarity
+async function thresholdMatrix(weights, threshold, activeDataIDs) {
+  const key = JSON.stringify(weights);
+  if (!similarityMatrices.has(key)) {
+    similarityMatrices.set(key, fetchSimilarityMatrix(weights));
   }
-  
-  return { sortedNodes, links, colorScale };
-};
+  let matrix;
+  try {
+    matrix = await similarityMatrices.get(key);
+  } catch (error) {
+    // Try again at the next redraw
+    similarityMatrices.delete(key);
+    throw error;
+  }
+  const active = new Set(activeDataIDs.map(id => id.toString()));
+  const ids = matrix.ids.filter(id => active.has(id));
+  const edges = [];
+  ids.forEach((source, i) => {
+    ids.slice(i + 1).forEach(target => {
+      const similarity = matrix.similarity(source, target);
+      if (similarity !== null && similarity >= threshold) edges.push([source, target, similarity]);
+    });
+  });
+  return { ids, edges };
+}
 
-// Gets the current similarity data based on the selected type and the selected filters so only active studies are included, returns an object with the study IDs and the similarity matrix like this: {studyIDs: [...], similarityMatrix: [[...]]}
-function getCurrentSimilarityData() {
+// Fetch the links above the threshold between the currently active studies, resolves to sorted nodes, links and the color scale (or null if a newer request was made in the meantime)
+async function generateGraphData(threshold) {
+  const request = ++graphDataRequest;
   const filters = JSON.parse(window.sessionStorage.getItem("filters"));
   // Get the IDs of all data studies that are currently active based on the selected filters
-  const activeDataIDs = filterData(filters).map(item => item["ID"].toString());
-  
-  if (similarityType === "abstract") {
-    return {
-      studyIDs: abstractStudyIDs.filter(id => activeDataIDs.includes(id)),
-      similarityMatrix: abstractMatrix
-    };
-  } else if (similarityType === "database") {
-    return {
-      studyIDs: databaseStudyIDs.filter(id => activeDataIDs.includes(id)),
-      similarityMatrix: databaseMatrix
-    };
-  };
-}
+  const activeDataIDs = filterData(filters).map(item => parseInt(item["ID"]));
+
+  // Otherwise only the links that are drawn are transferred, the server blends and thresholds the similarity matrices
+  const response = data.length <= MAX_MATRIX_STUDIES ?
+    await thresholdMatrix(getSimilarityWeights(), threshold, activeDataIDs) :
+    await $.ajax({
+      url: `${apiURL}/similarity`,
+      method: "POST",
+      contentType: "application/json",
+      data: JSON.stringify({ ...getSimilarityWeights(), threshold: threshold, ids: activeDataIDs }),
+    });
+  if (request !== graphDataRequest) return null;
+
+  // Sort the nodes by category if a category is selected
+  const studyIDs = response.ids.map(id => id.toString());
+  const {sortedNodes, colorScale} = sortNodesByCategory(studyIDs, $("#similarityColorCategory").val());
+
+  // Each link goes from the node that comes first in the sorted order to the later one
+  const nodeOrder = new Map(sortedNodes.map((id, index) => [id, index]));
+  const links = response.edges.map(([source, target, similarity]) => {
+    let [sourceID, targetID] = [source.toString(), target.toString()];
+    if (nodeOrder.get(sourceID) > nodeOrder.get(targetID)) [sourceID, targetID] = [targetID, sourceID];
+    return { sourceID, targetID, value: similarity };
+  });
+
+  return { sortedNodes, links, colorScale };
+};
 
 /*
   Section for drawing the similarity graph
@@ -248,14 +305,26 @@ function formatTickLabel(d) {
   return `${author} [${d}]`;
 }
 
-function drawGraph(threshold) {
+async function drawGraph(threshold) {
+  let graphData;
+  try {
+    graphData = await generateGraphData(threshold);
+  } catch (error) {
+    $("#graphContainer").empty();
+    $("#graphContainer").height("auto");
+    $("#legend").empty();
+    $("#graphContainer").append("<p class='text-center m-2 p-0'>The similarity data could not be loaded. Please try again later.</p>");
+    return;
+  }
+  // A newer call is drawing the graph
+  if (graphData === null) return;
+
   // Clear graph and legend container
   $("#graphContainer").empty();
   $("#graphContainer").height("auto");
   $("#legend").empty();
 
-  // TODO: change to slider value
-  const { sortedNodes, links, colorScale } = generateGraphData(threshold);
+  const { sortedNodes, links, colorScale } = graphData;
   const nodes = [...sortedNodes];
 
   // If there are no nodes, do not draw the graph
@@ -452,7 +521,7 @@ function drawULayout(container, graphData, colorScale) {
   // Add tooltips to the links
   linkGroup.selectAll(".link")
     .append("title")
-    .text(d => `${similarityType === "database" ? "Database" : "Abstract"} Similarity: ${d.value.toFixed(2)} between [${d.sourceID}] and [${d.targetID}]`);
+    .text(d => `${similarityLabels[similarityType]} Similarity: ${d.value.toFixed(2)} between [${d.sourceID}] and [${d.targetID}]`);
 }
 
 // Draws the standard layout for the similarity graph
@@ -551,7 +620,7 @@ function drawStandardLayout(container, graphData, colorScale) {
   // Add tooltips to the links
   linkGroup.selectAll(".link")
     .append("title")
-    .text(d => `${similarityType === "database" ? "Database" : "Abstract"} Similarity: ${d.value.toFixed(2)} between [${d.sourceID}] and [${d.targetID}]`);
+    .text(d => `${similarityLabels[similarityType]} Similarity: ${d.value.toFixed(2)} between [${d.sourceID}] and [${d.targetID}]`);
 }
 
 /*
@@ -567,7 +636,8 @@ $(document).ready(function() {
     window.sessionStorage.setItem("similarityType", similarityType);
 
     // Update the tooltip text based on the selected similarity type
-    $("#thresholdInfoIcon").attr("title", similarityType === "abstract" ? abstractTooltip : databaseTooltip);
+    $("#thresholdInfoIcon").attr("title", similarityTooltips[similarityType]);
+    $("#weightContainer").toggle(similarityType === "blended");
     drawGraph(similarityThreshold); // Redraw the graph with the new similarity type
   });
 
@@ -2,14 +2,29 @@ import { filterData, sortNodesByCategory, getDataEntry, showStudyModal } from ".
 import { createLegend, drawNode, highlightNode, removeHighlighting } from "./d3DrawingUtility.mjs";
 
 // Load data from the backend
-const coauthorMatrix = $("#timeline-graph-container").data("coauthor");
-const citationMatrix = $("#timeline-graph-container").data("citation");
+// Precomputed per-study metrics of the whole citation and coauthor graph, independent of the current filters
+const citationMetrics = $("#timeline-graph-container").data("metrics");
 const filterCategories = $("body").data("filter-categories");
 const excludedCategories = $(".category-dropdown-container").data("excluded-categories");
 const infoCirclePath = $("#timelineConnectionsModal").data("info-circle-path");
 // Citing order
 const citingOrder = {"Cites": 0, "Cited By": 1, "Coauthor": 2};
 
+/**
+ * Reads a neighbour list column of the citation metrics.
+ *
+ * @param {string} column - "Cited Studies", "Citing Studies" or "Coauthor Studies".
+ * @returns {Object} The IDs of the linked studies of every study, keyed by study ID.
+ */
+function neighbourLists(column) {
+  return Object.fromEntries(Object.entries(citationMetrics).map(([id, metrics]) => [id, metrics[column] ? metrics[column].split(", ") : []]));
+}
+
+// Only the links of each study instead of the dense citation and coauthor matrices
+const citedStudies = neighbourLists("Cited Studies");
+const citingStudies = neighbourLists("Citing Studies");
+const coauthorStudies = neighbourLists("Coauthor Studies");
+
 // Populate the timeline dropdown menu
 filterCategories.forEach(category => {
   if (excludedCategories.includes(category)) return;
@@ -105,6 +120,36 @@ function showNetworkModal(id) {
     </div>
   `;
 
+  const metrics = citationMetrics[id];
+  const metricsHTML = metrics === undefined ? "" : `
+    <h5 class="mb-3 text-start">Citation Metrics</h5>
+    <div class="table-responsive">
+      <table class="table table-striped">
+        <thead>
+          <tr>
+            <th class="centered-cell" title="Studies of the database this study cites">Cites</th>
+            <th class="centered-cell" title="Studies of the database citing this study">Cited By</th>
+            <th class="centered-cell" title="Studies reachable by following citations from this study">Cites (Transitively)</th>
+            <th class="centered-cell" title="Studies from which this study is reachable by following citations">Cited By (Transitively)</th>
+            <th class="centered-cell" title="PageRank of the study in the citation graph, in percent">PageRank</th>
+            <th class="centered-cell" title="Studies connected to this study by chains of shared authors">Coauthor Group</th>
+          </tr>
+        </thead>
+        <tbody>
+          <tr>
+            <td class="centered-cell">${metrics["Cites"]}</td>
+            <td class="centered-cell">${metrics["Cited By"]}</td>
+            <td class="centered-cell">${metrics["Cites Transitively"]}</td>
+            <td class="centered-cell">${metrics["Cited By Transitively"]}</td>
+            <td class="centered-cell">${(metrics["PageRank"] * 100).toFixed(2)}%</td>
+            <td class="centered-cell">${metrics["Coauthor Component Size"]} ${metrics["Coauthor Component Size"] === 1 ? "study" : "studies"}</td>
+          </tr>
+        </tbody>
+      </table>
+    </div>
+    ${metrics["Cites Later Studies"] ? `<p class="text-start text-danger">This study cites studies published after it (${metrics["Cites Later Studies"]}), these citations are probably wrong.</p>` : ""}
+  `;
+
   let connectionsHTML;
   if (citingLinks.length === 0 && citedByLinks.length === 0 && coauthorLinks.length === 0) {
     connectionsHTML = "<h5 class='text-start'>Study Network</h5><p>No connections found with the current filter settings.</p>";
@@ -150,6 +195,7 @@ function showNetworkModal(id) {
 
   // Append the generated HTML to the modal and show it
   $("#timelineConnectionsContainer").html(headerHTML);
+  $("#timelineConnectionsContainer").append(metricsHTML);
   $("#timelineConnectionsContainer").append(connectionsHTML);
   $("#timelineConnectionsModal").modal("show");
 }
@@ -167,7 +213,7 @@ function formatConnectionType(value) {
 
 /*
  * Preparing the data for the timeline graph.
- * The graph will be rendered using the coauthor and citation matrices.
+ * The graph will be rendered using the neighbour lists of the citation metrics.
  */
 function generateTimelineData() {
   // Get the currently active nodes based on the selected category and filters
@@ -194,34 +240,16 @@ function generateTimelineData() {
   });
   const maxYears = Math.max(...Object.keys(years).map(year => years[year].length));
   
-  // Create links for co-authors and citations
+  // Create links for co-authors and citations between the active studies
+  const active = new Set(sortedNodes);
+  const linksTo = (neighbours, node) => (neighbours[node] || [])
+    .filter(other => active.has(other))
+    .map(other => ({ sourceID: node, targetID: other }));
   const links = {coauthorLinks: [], citingLinks: [], citedByLinks: []};
   for (const node of sortedNodes) {
-    for (const other of sortedNodes) {
-
-      // Populate the links for co-authors
-      if (coauthorMatrix[node][other]) {
-        links.coauthorLinks.push({
-          sourceID: node,
-          targetID: other,
-        });
-      };
-
-      // Populate the links for citations
-      if (citationMatrix[node][other]) {
-        links.citingLinks.push({
-          sourceID: node,
-          targetID: other,
-        });
-      };
-
-      if (citationMatrix[other][node]) {
-        links.citedByLinks.push({
-          sourceID: node,
-          targetID: other,
-        });
-      }
-    }
+    links.coauthorLinks.push(...linksTo(coauthorStudies, node));
+    links.citingLinks.push(...linksTo(citedStudies, node));
+    links.citedByLinks.push(...linksTo(citingStudies, node));
   }
 
   return {
@@ -0,0 +1,83 @@
+import csv
+import re
+
+import numpy as np
+import pandas as pd
+
+# Column types of data.csv, shared by the update script and the Dimensions ingest
+single_value_columns = [
+    'Sensing_PANEL_No Additional Sensing', 'Interaction_PANEL_Hands-Free', 'Interaction_PANEL_Eyes-Free', 
+    'Interaction_PANEL_Adaptation of the Interaction Detection Algorithm to User',
+    'Interaction_PANEL_Discreetness of Interaction Techniques', 
+    'Interaction_PANEL_Social Acceptability of Interaction Techniques',
+    'Interaction_PANEL_Accuracy of Interaction Recognition',
+    'Interaction_PANEL_Robustness of Interaction Detection',
+    'Study_PANEL_Elicitation Study',
+    'Study_PANEL_Usability Evaluations',
+    'Study_PANEL_Cognitive Ease Evaluations',
+    'Study_PANEL_Discreetness of Interactions Evaluations',
+    'Study_PANEL_Social Acceptability of Interactions Evaluations',
+    'Study_PANEL_Accuracy of Interactions Evaluations',
+    'Study_PANEL_Alternative Interaction Validity Evaluations',
+    'Device_PANEL_Real-Time Processing', 'Device_PANEL_On-Device Processing'
+]
+
+multi_value_and_string_columns = [
+    'Location', 'Input Body Part', 'Gesture', 'Sensing_PANEL_Sensors', 'Interaction_PANEL_Resolution', 
+    'Study_PANEL_Evaluation of Different Conditions (User-Related)',
+    'Study_PANEL_Evaluation of Different Conditions (Environment-Related)',
+    'Study_PANEL_Evaluation of Different Settings',
+    'Device_PANEL_Earphone Type', 'Device_PANEL_Development Stage',
+    'Motivations_PANEL_Motivations',
+    'Applications_PANEL_Intended Applications', 'Keywords'
+]
+
+numerical_columns_log_transformed = [
+    'Interaction_PANEL_Number of Selected Gestures'
+]
+
+single_value_columns_special_treatment = ['Interaction_PANEL_Possible on One Ear']
+
+# Get all numeric columns (excluding those in multi_value_and_string_columns)
+# numeric_cols = ['Year', 'Interaction_PANEL_Number of Selected Gestures']
+numeric_cols = ['Interaction_PANEL_Number of Selected Gestures']
+
+
+# Function to transform values based on partial matches
+def transform_value(value):
+    if pd.isna(value):
+        return np.nan
+    
+    # Convert to string to ensure we can perform string operations
+    value_str = str(value).lower()
+    
+    # Check for patterns
+    if re.search(r'\byes\b', value_str):
+        return 1.0
+    elif re.search(r'\bno\b', value_str):
+        return 0.0
+    elif re.search(r'\blow\b', value_str):
+        return 0.0
+    elif re.search(r'\bmedium\b', value_str):
+        return 0.5
+    elif re.search(r'\bhigh\b', value_str):
+        return 1.0
+    elif re.search(r'\bvisual attention\b', value_str):
+        return 0.5
+    elif re.search(r'\bpartly\b', value_str):
+        return 0.5
+    elif re.search(r'\bn\/a\b', value_str) or value_str == 'n/a':
+        return np.nan
+    else:
+        return np.nan
+
+
+def find_header_row(path: str, max_rows: int = 20) -> int:
+    """Return the number of rows above the header, the exports start with empty spreadsheet rows."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i >= max_rows:
+                break
+            if 'Title' in row and 'Main Author' in row:
+                return i
+    raise ValueError(f"No header row with 'Title' and 'Main Author' found in the first {max_rows} rows of {path}")
@@ -0,0 +1,337 @@
+import hashlib
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+
+DATA_PATH = os.path.join(BASE_DIR, "data.csv")
+STORE_PATH = os.path.join(BASE_DIR, "study_store.npz")
+
+# Bump when the layout of the .npz changes so older stores are rebuilt
+STORE_VERSION = 2
+
+# Free text, kept as plain strings
+TEXT_COLUMNS = ['Abstract', 'Title', 'Authors', 'Study Link']
+
+# Numerical columns (the sliders in the sidebar), missing values become NaN
+NUMERIC_COLUMNS = ['Year', 'Interaction_PANEL_Number of Selected Gestures']
+
+MISSING = 'N/A'
+
+
+def split_parenthetical(value: str):
+    """Split "High (N=12)" into ("High", "N=12"), values without parentheses have no detail (None)."""
+    if '(' not in value or not value.endswith(')'):
+        return value, None
+    base, _, detail = value[:-1].partition('(')
+    return base.strip(), detail
+
+
+def join_parenthetical(base: str, detail) -> str:
+    return base if detail is None else f"{base} ({detail})"
+
+
+def _pack_strings(strings: list) -> tuple:
+    # Many strings as one UTF-8 byte array plus offsets, loads without pickling
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list:
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class StudyStore:
+    """Typed columnar view of data.csv.
+
+    - single-value columns: one categorical code per study into categories[column]
+    - multi-value columns: a long table with one row per (study, column, value), where the value is
+      split into its base (coded into categories[column]) and an optional parenthetical detail
+      (coded into details), e.g. "Hold (Mid-Air)" -> ("Hold", "Mid-Air")
+    - numeric columns: float arrays with NaN for missing values
+    - text columns: plain strings
+    - raw: the cells of the single- and multi-value columns exactly as written in data.csv
+
+    A column counts as multi-valued if any of its cells holds a comma-separated list, the same rule
+    the app has always applied when splitting cells for the filters.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.single_columns = []
+        self.multi_columns = []
+        self.categories = {}
+        self.codes = {}
+        self.details = []
+        self.long_study = np.zeros(0, dtype=np.int32)
+        self.long_column = np.zeros(0, dtype=np.int16)
+        self.long_value = np.zeros(0, dtype=np.int32)
+        self.long_detail = np.zeros(0, dtype=np.int32)
+        self.numeric = {}
+        self.text = {}
+        self.raw = {}
+        self.source_sha256 = ""
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, source_sha256: str = ""):
+        """Build the store from data.csv read with dtype=str and keep_default_na=False."""
+        store = cls()
+        store.columns = list(df.columns)
+        store.ids = df['ID'].astype(np.int64).to_numpy()
+        store.source_sha256 = source_sha256
+
+        categorical = [c for c in df.columns if c != 'ID' and c not in TEXT_COLUMNS and c not in NUMERIC_COLUMNS]
+        store.multi_columns = [c for c in categorical if df[c].str.contains(',', regex=False).any()]
+        store.single_columns = [c for c in categorical if c not in store.multi_columns]
+
+        for column in NUMERIC_COLUMNS:
+            if column in df.columns:
+                store.numeric[column] = pd.to_numeric(df[column].str.strip(), errors='coerce').to_numpy(dtype=np.float64)
+
+        for column in TEXT_COLUMNS:
+            if column in df.columns:
+                store.text[column] = [value.strip() or MISSING for value in df[column]]
+
+        for column in categorical:
+            store.raw[column] = df[column].tolist()
+
+        for column in store.single_columns:
+            codes, categories = pd.factorize(df[column].str.strip().replace('', MISSING), sort=True)
+            store.codes[column] = codes.astype(np.int32)
+            store.categories[column] = list(categories)
+
+        detail_codes = {}
+        long_rows = []
+        for column_code, column in enumerate(store.multi_columns):
+            value_codes = {}
+            for study_index, cell in enumerate(df[column]):
+                values = [v.strip() for v in cell.split(',') if v.strip()] or [MISSING]
+                for value in values:
+                    base, detail = split_parenthetical(value)
+                    value_code = value_codes.setdefault(base, len(value_codes))
+                    detail_code = -1 if detail is None else detail_codes.setdefault(detail, len(detail_codes))
+                    long_rows.append((study_index, column_code, value_code, detail_code))
+            store.categories[column] = list(value_codes)
+        store.details = list(detail_codes)
+
+        long_table = np.asarray(long_rows, dtype=np.int64).reshape(-1, 4)
+        store.long_study = long_table[:, 0].astype(np.int32)
+        store.long_column = long_table[:, 1].astype(np.int16)
+        store.long_value = long_table[:, 2].astype(np.int32)
+        store.long_detail = long_table[:, 3].astype(np.int32)
+        return store
+
+    ## Access
+
+    def values(self, column: str, strip_parenthetical: bool = False) -> list:
+        """Return the list of values of every study, in study order."""
+        if column in self.single_columns:
+            categories = self.categories[column]
+            if strip_parenthetical:
+                categories = [split_parenthetical(c)[0] for c in categories]
+            return [[categories[code]] for code in self.codes[column]]
+
+        if column in self.multi_columns:
+            categories = self.categories[column]
+            rows = self.long_column == self.multi_columns.index(column)
+            result = [[] for _ in range(len(self))]
+            for study_index, value_code, detail_code in zip(self.long_study[rows], self.long_value[rows], self.long_detail[rows]):
+                detail = None if strip_parenthetical or detail_code < 0 else self.details[detail_code]
+                result[study_index].append(join_parenthetical(categories[value_code], detail))
+            return result
+
+        if column in self.numeric:
+            return [[format_number(v)] for v in self.numeric[column]]
+        if column in self.text:
+            return [[v] for v in self.text[column]]
+        if column == 'ID':
+            return [[str(i)] for i in self.ids]
+        raise KeyError(column)
+
+    def cell(self, column: str) -> list:
+        """Return the values of every study joined into one string again, as they appear in data.csv."""
+        return [", ".join(values) for values in self.values(column)]
+
+    def raw_cells(self, column: str) -> list:
+        """Return the cells of a single- or multi-value column unchanged, including their whitespace."""
+        return self.raw[column]
+
+    def value_sets(self, column: str, lowercase: bool = False) -> list:
+        """Return the set of values per study, missing values (N/A) give an empty set."""
+        sets = []
+        for values in self.values(column):
+            values = {v.lower() if lowercase else v for v in values if v != MISSING}
+            sets.append(values)
+        return sets
+
+    def unique_values(self, column: str, strip_parenthetical: bool = False, include_missing: bool = True) -> set:
+        unique = {value for values in self.values(column, strip_parenthetical) for value in values}
+        if not include_missing:
+            unique.discard(MISSING)
+        return unique
+
+    def records(self, exclude: list = None) -> list:
+        """Return one dict per study, with the same values as reading data.csv with pandas and replacing NaN with 'N/A'."""
+        exclude = exclude or []
+        columns = [c for c in self.columns if c not in exclude]
+        cells = {}
+        for column in columns:
+            if column == 'ID':
+                cells[column] = [int(i) for i in self.ids]
+            elif column in self.numeric:
+                cells[column] = [record_number(v) for v in self.numeric[column]]
+            else:
+                cells[column] = self.cell(column)
+        return [{column: cells[column][i] for column in columns} for i in range(len(self))]
+
+    def frame(self, columns: list) -> pd.DataFrame:
+        """Return the given columns as a DataFrame of strings (numbers keep their numeric type)."""
+        return pd.DataFrame({column: self.numeric[column] if column in self.numeric else
+                             (self.ids if column == 'ID' else self.cell(column)) for column in columns})
+
+    def client_payload(self, parenthical_columns: list) -> dict:
+        """Values per study and column for the browser, already split and cleaned for filtering.
+
+        Each column holds its distinct values once plus, per study, the indices of its values.
+        """
+        payload = {'ids': [int(i) for i in self.ids], 'columns': {}}
+        for column in self.columns:
+            if column == 'ID' or column in self.text:
+                continue
+            vocabulary = {}
+            codes = [[vocabulary.setdefault(value, len(vocabulary)) for value in values]
+                     for values in self.values(column, strip_parenthetical=column in parenthical_columns)]
+            payload['columns'][column] = {'values': list(vocabulary), 'codes': codes}
+        return payload
+
+    ## Persistence
+
+    def to_bytes(self) -> bytes:
+        arrays = {
+            'version': np.asarray([STORE_VERSION]),
+            'ids': self.ids,
+            'long_study': self.long_study,
+            'long_column': self.long_column,
+            'long_value': self.long_value,
+            'long_detail': self.long_detail,
+        }
+        strings = {
+            'columns': self.columns,
+            'single_columns': self.single_columns,
+            'multi_columns': self.multi_columns,
+            'numeric_columns': list(self.numeric),
+            'text_columns': list(self.text),
+            'details': self.details,
+            'source_sha256': [self.source_sha256],
+        }
+        for i, column in enumerate(self.single_columns):
+            arrays[f'codes_{i}'] = self.codes[column]
+        for i, column in enumerate(self.single_columns + self.multi_columns):
+            strings[f'categories_{i}'] = self.categories[column]
+            strings[f'raw_{i}'] = self.raw[column]
+        for i, column in enumerate(self.numeric):
+            arrays[f'numeric_{i}'] = self.numeric[column]
+        for i, column in enumerate(self.text):
+            strings[f'text_{i}'] = self.text[column]
+        for name, values in strings.items():
+            arrays[f'{name}_blob'], arrays[f'{name}_offsets'] = _pack_strings(values)
+
+        # Written by hand instead of np.savez so the same data always gives the same bytes
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in sorted(arrays):
+                array_buffer = io.BytesIO()
+                np.lib.format.write_array(array_buffer, np.ascontiguousarray(arrays[name]), allow_pickle=False)
+                archive.writestr(zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0)), array_buffer.getvalue(),
+                                 compress_type=zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
+
+    @classmethod
+    def load(cls, path: str = STORE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version'][0]) != STORE_VERSION:
+                raise ValueError(f"{path} has store version {int(data['version'][0])}, expected {STORE_VERSION}")
+
+            def strings(name):
+                return _unpack_strings(data[f'{name}_blob'], data[f'{name}_offsets'])
+
+            store = cls()
+            store.columns = strings('columns')
+            store.single_columns = strings('single_columns')
+            store.multi_columns = strings('multi_columns')
+            store.details = strings('details')
+            store.source_sha256 = strings('source_sha256')[0]
+            store.ids = data['ids']
+            store.long_study = data['long_study']
+            store.long_column = data['long_column']
+            store.long_value = data['long_value']
+            store.long_detail = data['long_detail']
+            for i, column in enumerate(store.single_columns):
+                store.codes[column] = data[f'codes_{i}']
+            for i, column in enumerate(store.single_columns + store.multi_columns):
+                store.categories[column] = strings(f'categories_{i}')
+                store.raw[column] = strings(f'raw_{i}')
+            for i, column in enumerate(strings('numeric_columns')):
+                store.numeric[column] = data[f'numeric_{i}']
+            for i, column in enumerate(strings('text_columns')):
+                store.text[column] = strings(f'text_{i}')
+        return store
+
+
+def format_number(value: float) -> str:
+    if np.isnan(value):
+        return MISSING
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def record_number(value: float):
+    # Same types pandas gives for the column: ints stay ints, missing values become 'N/A'
+    if np.isnan(value):
+        return MISSING
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def build_study_store(data_path: str = DATA_PATH) -> StudyStore:
+    df = pd.read_csv(data_path, dtype=str, keep_default_na=False)
+    return StudyStore.from_dataframe(df, file_sha256(data_path))
+
+
+def load_study_store(data_path: str = DATA_PATH, store_path: str = STORE_PATH) -> StudyStore:
+    """Load the persisted store, or build it in memory if data.csv changed since it was written.
+
+    The file is committed with the other derived datasets and only written by the study_store stage
+    of the update script, so readers like the app never modify it.
+    """
+    source_sha256 = file_sha256(data_path)
+    if os.path.exists(store_path):
+        try:
+            store = StudyStore.load(store_path)
+            if store.source_sha256 == source_sha256:
+                return store
+        except (OSError, ValueError, KeyError):
+            pass
+
+    print(f"{os.path.basename(store_path)} is out of date, parsing {os.path.basename(data_path)} instead")
+    return build_study_store(data_path)
+
+
+if __name__ == "__main__":
+    store = load_study_store()
+    print(f"{len(store)} studies, {len(store.single_columns)} single-value, {len(store.multi_columns)} multi-value, "
+          f"{len(store.numeric)} numeric and {len(store.text)} text columns, {len(store.long_study)} multi-value rows")
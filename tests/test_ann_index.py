@@ -0,0 +1,50 @@
+import numpy as np
+
+from ann_index import IVFIndex, MIN_TRAINING_SIZE, clustered_vectors, update_index
+
+
+def exact_neighbours(vectors, query, k):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = unit @ unit[query]
+    similarity[query] = -np.inf
+    return np.argsort(-similarity, kind="stable")[:k].tolist()
+
+
+def test_small_index_is_exact():
+    vectors = clustered_vectors(200, 16, n_clusters=5)
+    index = IVFIndex(16)
+    index.add(list(range(200)), vectors)
+    assert len(index.centroids) == 1
+    for query in (0, 57, 199):
+        assert [item_id for item_id, _ in index.query_id(query, k=5)] == exact_neighbours(vectors, query, 5)
+
+
+def test_trained_index_finds_most_exact_neighbours():
+    n = 2 * MIN_TRAINING_SIZE
+    vectors = clustered_vectors(n, 32)
+    index = IVFIndex(32)
+    index.add(list(range(n)), vectors)
+    assert len(index.centroids) > 1
+
+    queries = range(0, n, 40)
+    hits = sum(len({item_id for item_id, _ in index.query_id(q, k=10)} & set(exact_neighbours(vectors, q, 10))) for q in queries)
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_update_index_only_touches_changed_items(tmp_path):
+    vectors = clustered_vectors(50, 8, n_clusters=3)
+    index = IVFIndex(8)
+    assert update_index(index, list(range(50)), vectors) == (50, 0)
+    assert update_index(index, list(range(50)), vectors) == (0, 0)
+
+    # Item 3 changed, item 49 was deleted
+    vectors[3] = -vectors[3]
+    assert update_index(index, list(range(49)), vectors[:49]) == (1, 1)
+    assert 49 not in index and len(index) == 49
+    assert all(item_id != 49 for item_id, _ in index.query(vectors[48], k=49))
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert len(loaded) == 49
+    assert loaded.query_id(3, k=5) == index.query_id(3, k=5)
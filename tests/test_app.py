@@ -0,0 +1,19 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize("path", ["/", "/bar-chart", "/similarity", "/timeline"])
+def test_cached_pages_follow_the_script_root(path):
+    client = app.app.test_client()
+    pages = {}
+    # The second request of a root is answered from the page cache
+    for script_name in ["", "/earxplore", "", "/earxplore"]:
+        response = client.get(path, environ_overrides={"SCRIPT_NAME": script_name})
+        assert response.status_code == 200
+        pages.setdefault(script_name, response.get_data(as_text=True))
+        assert response.get_data(as_text=True) == pages[script_name]
+
+    assert 'data-api-url="/api"' in pages[""]
+    assert 'data-api-url="/earxplore/api"' in pages["/earxplore"]
+    assert 'href="/earxplore/bar-chart"' in pages["/earxplore"] and "/earxplore" not in pages[""]
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from author_resolution import load_author_overrides, resolve_authors, resolve_paper_authors
+
+
+def test_spelling_variants_share_an_id():
+    name_to_id, id_to_name = resolve_authors(["Jonas Hummel", "J. Hummel", "Jonas Hummel", "Tobias Röddiger", "Tobias Roeddiger"], overrides=[])
+    assert name_to_id["j hummel"] == name_to_id["jonas hummel"]
+    assert name_to_id["tobias roddiger"] == name_to_id["tobias roeddiger"]
+    assert name_to_id["jonas hummel"] != name_to_id["tobias roddiger"]
+    # The most frequent spelling names the cluster
+    assert id_to_name[name_to_id["j hummel"]] == "jonas hummel"
+
+
+def test_ambiguous_initial_is_not_merged():
+    name_to_id, _ = resolve_authors(["Yuntao Wang", "Yong Wang", "Y. Wang"], overrides=[])
+    assert name_to_id["yuntao wang"] != name_to_id["yong wang"]
+    assert name_to_id["y wang"] not in (name_to_id["yuntao wang"], name_to_id["yong wang"])
+
+
+def test_overrides_merge_names(tmp_path):
+    path = tmp_path / "author_overrides.csv"
+    pd.DataFrame({"Alias": ["Bob Smith"], "Canonical": ["Robert Smith"]}).to_csv(path, index=False)
+    name_to_id, _ = resolve_authors(["Bob Smith", "Robert Smith"], overrides=load_author_overrides(path))
+    assert name_to_id["bob smith"] == name_to_id["robert smith"]
+
+
+def test_blank_override_cells_are_ignored(tmp_path):
+    path = tmp_path / "author_overrides.csv"
+    pd.DataFrame({"Alias": [" ", "J. Hummel", "."], "Canonical": ["Jonas Hummel", " ", "Tobias Röddiger"]}).to_csv(path, index=False)
+    name_to_id, _ = resolve_authors(["Jonas Hummel", "J. Hummel"], overrides=load_author_overrides(path))
+    assert "" not in name_to_id
+    assert name_to_id["j hummel"] == name_to_id["jonas hummel"]
+
+
+def test_resolve_paper_authors():
+    df = pd.DataFrame({"ID": [1, 2, 3], "Authors": ["Jonas Hummel, Tobias Röddiger", "J. Hummel", "Anna Smith"]})
+    id_to_authors, _ = resolve_paper_authors(df, overrides=[])
+    assert set(id_to_authors[1]) & set(id_to_authors[2])
+    assert not set(id_to_authors[3]) & set(id_to_authors[1])
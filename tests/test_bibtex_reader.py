@@ -0,0 +1,55 @@
+import os
+
+import bibtex_reader
+from bibtex_reader import iter_bibtex_entries, read_bibtex_files
+
+BIB = """% extracted by GROBID
+@article{a,
+  title={First {Nested} Title},
+  author={Doe, Jane},
+  year={2020}
+}
+
+@article{b,
+  title={Broken {entry,
+  year={2021}
+@article{c,
+  title={Third Title},
+  year={2022}
+}
+"""
+
+
+def test_unbalanced_entry_is_closed_at_the_next_entry():
+    entries = list(iter_bibtex_entries(BIB.splitlines(keepends=True)))
+    assert len(entries) == 3
+    assert entries[1].startswith("@article{b") and "@article{c" not in entries[1]
+
+
+def test_read_bibtex_files_uses_the_cache(tmp_path, monkeypatch):
+    path = tmp_path / "paper_1_citations.bib"
+    path.write_text(BIB, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    references = read_bibtex_files([str(path)], cache_dir=str(cache_dir))[str(path)]
+    # The broken title runs to the end of its entry, but not into the next one
+    assert [r['title'] for r in references] == ["first nested title", "broken entry year2021", "third title"]
+    assert references[0]['author_last_names'] == ["doe"]
+
+    # Unchanged files come from the cache, also after only their mtime changed
+    def fail(path):
+        raise AssertionError(f"{path} was parsed again")
+    monkeypatch.setattr(bibtex_reader, "_parse_file", fail)
+    os.utime(path, (1, 1))
+    assert read_bibtex_files([str(path)], cache_dir=str(cache_dir))[str(path)] == references
+
+
+def test_changed_files_are_parsed_again(tmp_path):
+    path = tmp_path / "paper_1_citations.bib"
+    path.write_text(BIB, encoding="utf-8")
+    cache_dir = str(tmp_path / "cache")
+    read_bibtex_files([str(path)], cache_dir=cache_dir)
+
+    path.write_text("@article{d, title={Only Entry}}\n", encoding="utf-8")
+    os.utime(path, (2, 2))
+    assert [r['title'] for r in read_bibtex_files([str(path)], cache_dir=cache_dir)[str(path)]] == ["only entry"]
@@ -0,0 +1,60 @@
+from bibtex_reader import normalize_reference, parse_bibtex_fields
+from citation_matcher import CorpusIndex, build_citation_matrix, match_citation_to_corpus, score_candidate
+
+
+def reference(bibtex:str) -> dict:
+    return normalize_reference(parse_bibtex_fields(bibtex))
+
+
+CORPUS = {
+    1: reference("@inproceedings{a, title={{FreeDigiter}: A Contact-free Device for Gesture Control}, "
+                 "author={Metzger, Christian and Anderson, Matt and Starner, Thad}, booktitle={ISWC}, year={2004}, doi={10.1109/ISWC.2004.23}}"),
+    2: reference("@article{b, title={EarBuddy: Enabling On-Face Interaction via Wireless Earbuds}, "
+                 "author={Xu, Xuhai and Shi, Haitian and Yi, Xin}, journal={CHI}, year={2020}}"),
+    3: reference("@article{c, title={Interaction with Earables using Head Gestures}, author={Hummel, Jonas and Roeddiger, Tobias}, year={2023}}"),
+}
+
+
+def test_parse_nested_braces_and_booktitle():
+    entry = CORPUS[1]
+    assert entry['title'] == "freedigiter a contactfree device for gesture control"
+    assert entry['author_last_names'] == ["metzger", "anderson", "starner"]
+    assert entry['journal'] == "iswc"
+    assert entry['year'] == "2004"
+    assert entry['doi'] == "10.1109/iswc.2004.23"
+
+
+def test_doi_match_wins():
+    citation = reference("@misc{x, title={Something else entirely}, doi={10.1109/ISWC.2004.23}}")
+    assert match_citation_to_corpus(citation, CorpusIndex(CORPUS), citing_paper_id=2) == [
+        {'paper_id': 1, 'score': 1.0, 'details': {'match_type': 'doi'}}]
+
+
+def test_title_and_author_match():
+    citation = reference("@inproceedings{x, title={EarBuddy: enabling on-face interaction via wireless earbuds}, author={Xu, X. and Yi, X.}, year={2020}}")
+    matches = match_citation_to_corpus(citation, CorpusIndex(CORPUS), citing_paper_id=1)
+    assert matches[0]['paper_id'] == 2
+    assert matches[0]['score'] > 0.9
+
+
+def test_self_citations_are_skipped():
+    citation = reference("@article{x, title={EarBuddy: Enabling On-Face Interaction via Wireless Earbuds}, author={Xu, Xuhai}, year={2020}}")
+    assert match_citation_to_corpus(citation, CorpusIndex(CORPUS), citing_paper_id=2) == []
+
+
+def test_matching_year_alone_is_no_evidence():
+    citation = reference("@article{x, title={}, author={}, year={2020}}")
+    assert score_candidate(citation, CORPUS[2])[0] == 0
+    assert match_citation_to_corpus(citation, CorpusIndex(CORPUS), citing_paper_id=1) == []
+
+
+def test_build_citation_matrix():
+    references = {
+        1: [reference("@article{x, title={Interaction with Earables using Head Gestures}, author={Hummel, Jonas}, year={2023}}")],
+        2: [reference("@article{y, title={A completely unrelated paper about databases}, author={Codd, Edgar}, year={1970}}")],
+    }
+    matrix, high, uncertain = build_citation_matrix(CORPUS, references)
+    assert matrix.loc[1, 3] == 1
+    assert matrix.values.sum() == 1
+    assert [(m['citing_id'], m['cited_id']) for m in high] == [(1, 3)]
+    assert uncertain == []
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+import citation_metrics
+
+from citation_metrics import compute_citation_metrics, pagerank, reach_counts, read_adjacency
+
+
+def adjacency(n, edges):
+    rows, columns = zip(*edges) if edges else ((), ())
+    return sparse.csr_matrix((np.ones(len(edges)), (rows, columns)), shape=(n, n))
+
+
+def test_pagerank_sums_to_one_and_favours_cited_studies():
+    # 0 -> 2, 1 -> 2, 2 -> 3, 3 cites nothing
+    ranks = pagerank(adjacency(4, [(0, 2), (1, 2), (2, 3)]))
+    assert np.isclose(ranks.sum(), 1)
+    assert ranks[3] > ranks[2] > ranks[0] == ranks[1]
+    assert pagerank(adjacency(0, [])).size == 0
+
+
+def test_reach_counts_follow_chains():
+    citations = adjacency(4, [(0, 1), (1, 2), (2, 1)])
+    assert reach_counts(citations).tolist() == [2, 1, 1, 0]
+    assert reach_counts(citations.T.tocsr()).tolist() == [0, 2, 2, 0]
+    assert reach_counts(adjacency(0, [])).size == 0
+
+
+def test_reach_counts_match_a_search_from_every_node():
+    rng = np.random.default_rng(0)
+    sources, targets = rng.integers(0, 200, 600), rng.integers(0, 200, 600)
+    # Mostly citations of earlier studies, plus a few cycles and self-citations
+    keep = (targets < sources) | (rng.random(600) < 0.05)
+    citations = adjacency(200, list(zip(sources[keep], targets[keep])))
+    expected = [len(csgraph.breadth_first_order(citations, node, directed=True, return_predecessors=False)) - 1 for node in range(200)]
+    assert reach_counts(citations).tolist() == expected
+
+
+def test_metrics_and_neighbour_lists():
+    ids = [10, 20, 30, 40]
+    years = [2020, 2019, 2021, np.nan]
+    # 10 cites 20 and the later 30, 30 cites 20; 10 and 40 share an author
+    citations = adjacency(4, [(0, 1), (0, 2), (2, 1)])
+    coauthors = adjacency(4, [(0, 3), (3, 0)])
+    metrics = compute_citation_metrics(citations, coauthors, ids, years).set_index('ID')
+
+    assert metrics['Cites'].tolist() == [2, 0, 1, 0]
+    assert metrics['Cited By'].tolist() == [0, 2, 1, 0]
+    assert metrics.loc[10, 'Cites Later Studies'] == "30"
+    assert metrics.loc[10, 'Cited Studies'] == "20, 30"
+    assert metrics.loc[20, 'Citing Studies'] == "10, 30"
+    assert metrics.loc[40, 'Coauthor Studies'] == "10"
+    assert metrics.loc[20, 'Cited Studies'] == ""
+    # Components are named after their smallest ID
+    assert metrics['Coauthor Component'].tolist() == [10, 20, 30, 10]
+    assert metrics['Coauthor Component Size'].tolist() == [2, 1, 1, 2]
+
+
+def test_read_adjacency_aligns_to_ids(tmp_path):
+    path = tmp_path / "citation_matrix.csv"
+    path.write_text(",1,2\n1,0,1\n2,0,0\n")
+    # Study 3 is missing from the matrix and has no links, the order follows ids
+    matrix = read_adjacency(str(path), [2, 1, 3])
+    assert matrix.toarray().tolist() == [[0, 0, 0], [1, 0, 0], [0, 0, 0]]
+
+
+def test_read_adjacency_in_chunks(tmp_path, monkeypatch):
+    dense = (np.random.default_rng(0).random((7, 7)) < 0.3).astype(int)
+    path = tmp_path / "coauthor_matrix.csv"
+    pd.DataFrame(dense, index=range(1, 8), columns=range(1, 8)).to_csv(path)
+    # Two rows per chunk
+    monkeypatch.setattr(citation_metrics, "READ_CHUNK_CELLS", 14)
+    assert np.array_equal(read_adjacency(str(path)).toarray(), dense)
+    # Study 9 is not in the matrix, studies 1 and 2 are not asked for
+    ids = [7, 5, 9, 3]
+    expected = np.zeros((4, 4))
+    for i, a in enumerate(ids):
+        for j, b in enumerate(ids):
+            if a <= 7 and b <= 7:
+                expected[i, j] = dense[a - 1, b - 1]
+    assert np.array_equal(read_adjacency(str(path), ids).toarray(), expected)
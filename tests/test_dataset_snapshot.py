@@ -0,0 +1,104 @@
+import os
+import threading
+
+import pytest
+
+import dataset_snapshot
+from dataset_snapshot import SnapshotManager
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_snapshot, "BASE_DIR", str(tmp_path))
+    (tmp_path / "data.csv").write_text("ID\n1\n")
+    (tmp_path / "matrix.csv").write_text("1,0\n")
+    return tmp_path
+
+
+def read_data(files):
+    def build():
+        content = (files / "data.csv").read_text()
+        if "broken" in content:
+            raise ValueError("data.csv is broken")
+        return {'data': content}
+    return build
+
+
+def change(path, content):
+    # One second later, so the stats differ even on file systems with coarse modification times
+    path.write_text(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_changed_file_bumps_the_version(files):
+    builds = []
+    manager = SnapshotManager(lambda: builds.append(1) or {}, ["data.csv", "matrix.csv"])
+    assert manager.reload()
+    first = manager.snapshot
+
+    # Touched but identical files keep the snapshot without building
+    os.utime(files / "matrix.csv", ns=(0, 1))
+    manager.check()
+    assert manager.snapshot is first and len(builds) == 1
+
+    change(files / "matrix.csv", "1,0.5\n")
+    manager.check()
+    assert manager.snapshot.version != first.version and len(builds) == 2
+    # Nothing changed since the last check
+    manager.check()
+    assert len(builds) == 2
+
+    # A removed file is a new version as well
+    os.remove(files / "matrix.csv")
+    manager.check()
+    assert len(builds) == 3
+
+
+def test_failing_build_keeps_the_previous_snapshot(files):
+    manager = SnapshotManager(read_data(files), ["data.csv"])
+    manager.reload()
+    previous = manager.snapshot
+
+    change(files / "data.csv", "ID\nbroken\n")
+    with pytest.raises(ValueError):
+        manager.reload()
+    assert manager.snapshot is previous and manager.last_error == "data.csv is broken"
+    # The watcher only reports the failure and does not retry the same files
+    change(files / "data.csv", "ID\nbroken again\n")
+    manager.check()
+    assert manager.snapshot is previous
+
+    change(files / "data.csv", "ID\n2\n")
+    manager.check()
+    assert manager.snapshot['data'] == "ID\n2\n" and manager.last_error is None
+
+
+def test_readers_never_see_a_partly_built_snapshot(files):
+    started = threading.Event()
+    release = threading.Event()
+    builds = iter([None, release])
+
+    def build():
+        gate = next(builds)
+        if gate is not None:
+            started.set()
+            gate.wait(10)
+        return {'data': (files / "data.csv").read_text()}
+
+    manager = SnapshotManager(build, ["data.csv"])
+    manager.reload()
+    old = manager.snapshot
+
+    change(files / "data.csv", "ID\n2\n")
+    reloader = threading.Thread(target=manager.check)
+    reloader.start()
+    assert started.wait(10)
+    # While the new version is being built, readers keep getting the old one
+    assert manager.snapshot is old and old['data'] == "ID\n1\n"
+    release.set()
+    reloader.join()
+
+    assert manager.snapshot['data'] == "ID\n2\n"
+    # A reader holding the old snapshot still sees its values
+    assert old['data'] == "ID\n1\n" and old.version != manager.snapshot.version
@@ -0,0 +1,121 @@
+import csv
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from dimensions_ingest import (BASE_DIR, COLUMN_ALIASES, DATA_PATH, RowNormalizer, apply_changes, build_vocabularies,
+                               dedupe_key, ingest_export, map_columns)
+
+SCHEMA = list(pd.read_csv(os.path.join(BASE_DIR, DATA_PATH), nrows=0).columns)
+
+
+def letters(name):
+    return re.sub(r"[^a-z]", "", name.split("_PANEL_")[-1].lower())
+
+
+def study(study_id, title, **values):
+    """Row of data.csv with N/A for every value that is not given, keyword arguments name the column without its panel."""
+    row = {column: 'N/A' for column in SCHEMA}
+    row.update({'ID': str(study_id), 'Main Author': "Doe", 'Year': "2021", 'Title': title, 'Study Link': "N/A"})
+    for column, value in values.items():
+        row[next(c for c in SCHEMA if letters(c) == letters(column))] = value
+    return row
+
+
+def data_frame(*rows):
+    return pd.DataFrame(list(rows), columns=SCHEMA)
+
+
+def export_column(column):
+    return COLUMN_ALIASES.get(column, column.split("_PANEL_")[-1])
+
+
+def write_export(path, rows):
+    """Write rows of data.csv in the layout of the Dimensions export, with blank lines above the header."""
+    columns = ['ID'] + [export_column(column) for column in SCHEMA]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("," * (len(columns) - 1) + "\n\n")
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i, row in enumerate(rows):
+            writer.writerow([f"[{i + 1}]"] + [row[column] for column in SCHEMA])
+    return str(path)
+
+
+def ingest(path, data_df):
+    changes, report = ingest_export(path, data_df, chunk_size=2)
+    return list(changes), report
+
+
+def test_map_columns_follows_aliases_and_spelling_variants():
+    mapping = map_columns(['ID', 'DB ID', 'Hands- Free', 'Accuracy of Interactions Evaluation', 'Sensors'],
+                          ['ID', 'Interaction_PANEL_Hands-Free', 'Study_PANEL_Accuracy of Interactions Evaluations', 'Sensing_PANEL_Sensors'])
+    assert mapping == {'ID': 'DB ID', 'Interaction_PANEL_Hands-Free': 'Hands- Free',
+                       'Study_PANEL_Accuracy of Interactions Evaluations': 'Accuracy of Interactions Evaluation',
+                       'Sensing_PANEL_Sensors': 'Sensors'}
+    with pytest.raises(ValueError):
+        map_columns(['DB ID', 'Sensors'], ['ID', 'Sensing_PANEL_Sensors', 'Keywords'])
+
+
+def test_invalid_values_are_rejected_and_spellings_coerced():
+    normalizer = RowNormalizer(build_vocabularies(data_frame(study(1, "Known", Sensors="IMU, LiDAR Sensor"))))
+    row, problems, new_values = normalizer.normalize(study(2, "  A   new\nstudy ", Sensors="lidar sensor,imu, PPG ,IMU",
+                                                           Hands_Free="Yes (N=12)", Keywords="earables"))
+    assert problems == []
+    assert row['Title'] == "A new study"
+    # Known values take the spelling of data.csv, duplicates are dropped and the list is sorted
+    assert row['Sensing_PANEL_Sensors'] == "IMU, LiDAR Sensor, PPG"
+    # New keywords are expected and not reported
+    assert new_values == {'Sensing_PANEL_Sensors': ["PPG"]}
+
+    _, problems, _ = normalizer.normalize(study("x", "N/A", Year="soon", Hands_Free="Maybe", Possible_on_One_Ear="Sometimes",
+                                                Number_of_Selected_Gestures="many"))
+    assert problems == ["invalid ID 'x'", "invalid Year 'soon'", "missing Title",
+                        "Interaction_PANEL_Hands-Free: unrecognized value 'Maybe'",
+                        "Interaction_PANEL_Possible on One Ear: unrecognized value 'Sometimes'",
+                        "Interaction_PANEL_Number of Selected Gestures: not a number 'many'"]
+
+
+def test_duplicates_by_doi_and_title(tmp_path):
+    existing = study(1, "Head Gestures on Earables", Study_Link="https://doi.org/10.1145/3491102.3501.")
+    assert dedupe_key(existing) == "doi:10.1145/3491102.3501"
+    assert dedupe_key(study(2, "Head gestures: on earables!")) == "title:head gestures on earables"
+
+    path = write_export(tmp_path / "export.csv", [
+        # Same DOI as the study in data.csv under another ID and title
+        study(2, "Another title", Study_Link="http://dx.doi.org/10.1145/3491102.3501"),
+        study(3, "Ear tapping"),
+        # Same title as the study before up to case, punctuation and whitespace
+        study(4, " EAR:  tapping!"),
+        # A screening entry without database ID
+        study("", "Excluded study"),
+    ])
+    changes, report = ingest(path, data_frame(existing))
+    assert [(change, row['ID']) for change, row in changes] == [('new', "3")]
+    assert (report['read'], report['duplicates'], report['screening']) == (4, 2, 1)
+    assert report['messages'] == ["ID 2: duplicate of study 1"]
+
+
+def test_applied_export_gives_an_empty_delta(tmp_path):
+    data_df = data_frame(study(1, "First", Sensors="IMU", Keywords="earables"), study(5, "Fifth"))
+    path = write_export(tmp_path / "export.csv", [
+        study(1, "First", Sensors="imu, Microphone", Keywords="earables"),
+        study(3, "Third", Sensors="PPG", Hands_Free="Yes"),
+        study(2, "Second"),
+        study(4, "Invalid", Year="20"),
+    ])
+    changes, report = ingest(path, data_df)
+    assert [(change, row['ID']) for change, row in changes] == [('changed', "1"), ('new', "3"), ('new', "2")]
+    assert report['invalid'] == 1
+
+    delta_df = pd.DataFrame([{'Change': change, **row} for change, row in changes])
+    merged = apply_changes(data_df, delta_df)
+    # Changed studies stay in place, new ones are appended in ID order
+    assert merged['ID'].tolist() == ["1", "5", "2", "3"]
+    assert merged.loc[0, 'Sensing_PANEL_Sensors'] == "IMU, Microphone"
+
+    changes, report = ingest(path, merged)
+    assert changes == []
+    assert (report['new'], report['changed'], report['unchanged'], report['invalid']) == (0, 0, 3, 1)
@@ -0,0 +1,84 @@
+import pytest
+
+from bibtex_reader import iter_references
+from fake_grobid_server import start_fake_grobid
+from grobid_client import GrobidClient, citations_path, extract_corpus, load_manifest
+
+
+class CountingClient(GrobidClient):
+    """Client that records which PDFs were sent to the server."""
+
+    def __init__(self, url):
+        super().__init__(url, max_workers=2, timeout=10)
+        self.sent = []
+
+    def process_references(self, pdf_path):
+        self.sent.append(pdf_path)
+        return super().process_references(pdf_path)
+
+
+@pytest.fixture
+def grobid_url():
+    server, url = start_fake_grobid()
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def write_pdf(path, references):
+    # The fake server turns every "REF: title | authors | year | doi" line into one reference
+    path.write_bytes(b"%PDF-1.4\n" + "".join(f"REF: {r}\n" for r in references).encode("utf-8"))
+    return str(path)
+
+
+def test_extract_corpus_skips_processed_pdfs(tmp_path, grobid_url):
+    output_dir = str(tmp_path / "citations")
+    pdfs = {
+        1: write_pdf(tmp_path / "a.pdf", ["EarBuddy: On-Face Interaction | Xu, Xuhai; Yi, Xin | 2020 | 10.1145/3313831.3376836"]),
+        2: write_pdf(tmp_path / "b.pdf", ["FreeDigiter | Metzger, Christian | 2004 |", "Head Gestures | Hummel, Jonas | 2023 |"]),
+    }
+
+    client = CountingClient(grobid_url)
+    assert client.is_alive()
+    manifest = extract_corpus(pdfs, output_dir, client)
+    assert sorted(client.sent) == sorted(pdfs.values())
+    assert {paper_id: entry["status"] for paper_id, entry in manifest["papers"].items()} == {"1": "done", "2": "done"}
+    references = list(iter_references(citations_path(output_dir, 1)))
+    assert references[0]['title'] == "earbuddy onface interaction"
+    assert references[0]['author_last_names'] == ["xu", "yi"]
+    assert references[0]['doi'] == "10.1145/3313831.3376836"
+    assert len(list(iter_references(citations_path(output_dir, 2)))) == 2
+
+    # Second run: nothing changed, nothing is sent
+    client = CountingClient(grobid_url)
+    extract_corpus(pdfs, output_dir, client)
+    assert client.sent == []
+
+    # A changed PDF is processed again, the other one still is not
+    write_pdf(tmp_path / "b.pdf", ["Only One Reference | Doe, Jane | 2021 |"])
+    client = CountingClient(grobid_url)
+    manifest = extract_corpus(pdfs, output_dir, client)
+    assert client.sent == [pdfs[2]]
+    assert manifest["papers"]["2"]["references"] == 1
+    assert load_manifest(output_dir) == manifest
+
+
+def test_identical_pdfs_are_sent_once(tmp_path, grobid_url):
+    output_dir = str(tmp_path / "citations")
+    same = ["Shared Reference | Doe, Jane | 2021 |"]
+    pdfs = {1: write_pdf(tmp_path / "a.pdf", same), 2: write_pdf(tmp_path / "copy_of_a.pdf", same),
+            3: write_pdf(tmp_path / "c.pdf", ["Other | Roe, Richard | 2019 |"])}
+
+    client = CountingClient(grobid_url)
+    manifest = extract_corpus(pdfs, output_dir, client)
+    assert len(client.sent) == 2
+    assert all(manifest["papers"][str(paper_id)]["status"] == "done" for paper_id in pdfs)
+    with open(citations_path(output_dir, 1)) as a, open(citations_path(output_dir, 2)) as b:
+        assert a.read() == b.read()
+
+    # A PDF identical to an already processed one is copied, not sent
+    pdfs[4] = write_pdf(tmp_path / "another_copy.pdf", same)
+    client = CountingClient(grobid_url)
+    extract_corpus(pdfs, output_dir, client)
+    assert client.sent == []
+    assert manifest["papers"]["1"]["sha256"] == load_manifest(output_dir)["papers"]["4"]["sha256"]
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+from insights import compute_insights, venue_counts
+from study_store import build_study_store
+
+CSV = """ID,Title,Year,Sensing_PANEL_Sensors,Keywords,Study_PANEL_Usability Evaluations,Study_PANEL_Elicitation Study
+1,A,2020,"IMU, Microphone","earables, head gestures",Yes (N=12),Yes
+2,B,2022,IMU (6-axis),earables,No,Yes
+3,C,2022,,N/A,Yes,No
+"""
+
+EXPORT = """,,,
+,,,
+ID,Title,Main Author,Venue
+[1],A,Doe,CHI
+[2],B,Roe, CHI
+[3],C,Poe,
+[4],D,Moe,UIST
+"""
+
+
+def test_insights_of_a_small_store(tmp_path):
+    data_path = tmp_path / "data.csv"
+    data_path.write_text(CSV, encoding="utf-8")
+    export_path = tmp_path / "export.csv"
+    export_path.write_text(EXPORT, encoding="utf-8")
+
+    insights = compute_insights(build_study_store(str(data_path)), str(export_path))
+    assert insights['years'] == [2020, 2021, 2022]
+    assert insights['papers_per_year'] == [1, 0, 2]
+    # Parenthetical details do not make a value of their own
+    assert insights['column_counts']['Sensing_PANEL_Sensors'] == {'IMU': 2, 'Microphone': 1}
+    overlaps = insights['evaluation_overlaps']
+    assert overlaps['lists'] == ['Elicitation', 'Usability']
+    assert overlaps['overlap_matrix'] == [[2, 1], [1, 2]]
+    assert insights['venues'] == {'CHI': 2, 'UIST': 1}
+
+
+def test_missing_venue_export():
+    assert venue_counts("does_not_exist.csv") == {}
+
+
+def test_app_snapshot_loads_without_the_pipeline_dependencies():
+    # The app's requirements do not include scipy or scikit-learn, which only the update pipeline needs
+    script = "import sys\nsys.modules['scipy'] = sys.modules['sklearn'] = None\nimport app\nassert app.snapshots.snapshot is not None, app.snapshots.last_error"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from offload import OffloadPool, PoolBusy
+
+
+def blocked_computation(result, calls):
+    """Return a computation that waits for the returned event, counting its calls."""
+    release = threading.Event()
+
+    def compute():
+        calls.append(result)
+        release.wait(10)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return compute, release
+
+
+def run_in_threads(pool, key, compute, n):
+    results = [None] * n
+
+    def request(i):
+        try:
+            results[i] = pool.run(key, compute)
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_identical_keys_compute_once():
+    pool = OffloadPool(max_workers=2)
+    calls = []
+    compute, release = blocked_computation("page", calls)
+    threads, results = run_in_threads(pool, "key", compute, 5)
+    wait_for(lambda: pool.coalesced == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["page"] * 5
+    assert calls == ["page"]
+    assert pool.stats() == {"workers": 2, "pending": 0, "computed": 1, "coalesced": 4, "rejected": 0}
+
+    # Once finished, the same key computes again
+    assert pool.run("key", lambda: "again") == "again"
+
+
+def test_full_pool_rejects_new_keys():
+    pool = OffloadPool(max_workers=1, max_pending=2)
+    calls = []
+    computations = [blocked_computation(i, calls) for i in range(2)]
+    threads = [run_in_threads(pool, i, compute, 1)[0][0] for i, (compute, _) in enumerate(computations)]
+    wait_for(lambda: pool.stats()["pending"] == 2)
+    with pytest.raises(PoolBusy):
+        pool.run("third", lambda: 3)
+    # Pending keys are still shared while the pool is full
+    shared = run_in_threads(pool, 0, lambda: None, 1)
+    wait_for(lambda: pool.coalesced == 1)
+    for _, release in computations:
+        release.set()
+    for thread in threads + shared[0]:
+        thread.join()
+    assert shared[1] == [0]
+    assert pool.rejected == 1
+    assert pool.run("third", lambda: 3) == 3
+
+
+def test_exception_reaches_every_waiter():
+    pool = OffloadPool(max_workers=1)
+    calls = []
+    compute, release = blocked_computation(ValueError("broken"), calls)
+    threads, results = run_in_threads(pool, "key", compute, 3)
+    wait_for(lambda: pool.coalesced == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) and str(result) == "broken" for result in results)
+
+
+def test_timeout_and_direct_mode():
+    pool = OffloadPool(max_workers=1, timeout=0.05)
+    compute, release = blocked_computation("slow", [])
+    with pytest.raises(PoolBusy):
+        pool.run("key", compute)
+    release.set()
+
+    # Without workers the computation runs in the calling thread
+    direct = OffloadPool(max_workers=0)
+    assert direct.run("key", threading.current_thread) is threading.current_thread()
@@ -0,0 +1,78 @@
+import importlib
+import sys
+
+import pipeline
+from pipeline import Stage, code_sources, run_pipeline
+
+HELPER = '''def scale(value):
+    return value * {factor}
+'''
+
+STAGES = '''import os
+
+import helper
+
+SUFFIX = "{suffix}"
+
+
+def build():
+    directory = os.path.dirname(__file__)
+    with open(os.path.join(directory, "in.txt")) as f, open(os.path.join(directory, "out.txt"), "w") as out:
+        out.write(str(helper.scale(int(f.read()))) + SUFFIX)
+    return True
+
+
+def unrelated():
+    return False
+'''
+
+
+def write_modules(directory, factor=2, suffix=""):
+    (directory / "helper.py").write_text(HELPER.format(factor=factor))
+    (directory / "stages.py").write_text(STAGES.format(suffix=suffix))
+    for name in ("helper", "stages"):
+        sys.modules.pop(name, None)
+    importlib.invalidate_caches()
+    return importlib.import_module("stages")
+
+
+def run(directory, module):
+    stage = Stage("build", module.build, inputs={str(directory / "in.txt"): None}, outputs=[str(directory / "out.txt")])
+    return [name for name, status, seconds in run_pipeline([stage], manifest_path=str(directory / "manifest.json")) if status != "up to date"]
+
+
+def test_stage_rebuilds_after_a_helper_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CODE_DIR", str(tmp_path))
+    # Modules are rewritten within the same second and size, a cached .pyc would hide the change
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "in.txt").write_text("21")
+
+    assert run(tmp_path, write_modules(tmp_path)) == ["build"]
+    assert run(tmp_path, write_modules(tmp_path)) == []
+
+    # Only the helper module the stage calls changed
+    assert run(tmp_path, write_modules(tmp_path, factor=3)) == ["build"]
+    assert (tmp_path / "out.txt").read_text() == "63"
+
+    # A module-level constant the stage reads changed
+    assert run(tmp_path, write_modules(tmp_path, factor=3, suffix="!")) == ["build"]
+    assert (tmp_path / "out.txt").read_text() == "63!"
+
+
+def test_other_functions_of_the_stage_module_are_not_code_of_the_stage(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CODE_DIR", str(tmp_path))
+    # Modules are rewritten within the same second and size, a cached .pyc would hide the change
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    sources = code_sources(write_modules(tmp_path).build)
+    # Neither the other function nor the checkout location (__file__) are part of it
+    assert sorted(sources) == ["helper", "stages:SUFFIX", "stages:build"]
+
+
+def test_repository_stages_reach_their_helper_modules():
+    import update_similarity_matrices_and_author_connections as update
+    stages = {stage.name: stage for stage in update.STAGES}
+    assert "similarity_engine" in code_sources(stages["database_similarity"].func)
+    assert "author_resolution" in code_sources(stages["coauthor_graph"].func)
+    assert "citation_metrics" in code_sources(stages["citation_metrics"].func)
@@ -0,0 +1,58 @@
+import search_index
+from search_index import SearchIndex, parse_query, tokenize
+
+DOCUMENTS = {
+    'Title': ["Head gestures on earables", "Gesture recognition with earphones", "Brain signals in the ear", "Eye tracking"],
+    'Abstract': ["We detect head gestures with an IMU.", "Gestures are recognized from audio. Gestures, gestures, gestures.",
+                 "EEG measured in the ear canal.", "N/A"],
+    'Keywords': ["head gestures, imu", "gesture recognition, microphone", "eeg", "N/A"],
+    'Authors': ["Tobias Röddiger", "Jane Doe", "Jane Doe, Tobias Röddiger", "Richard Roe"],
+}
+
+
+def index():
+    return SearchIndex([10, 20, 30, 40], DOCUMENTS)
+
+
+def test_tokenize_and_parse_query():
+    assert tokenize("Röddiger's EEG-Study") == ["roddiger", "s", "eeg", "study"]
+    assert parse_query("head gest*") == [("head", False), ("gest", True)]
+    assert parse_query("in-ear*") == [("in", False), ("ear", True)]
+
+
+def test_bm25_weighs_fields_and_term_rarity():
+    # One match each in title, abstract and keywords beats four matches in the abstract
+    results = index().search("gestures")
+    assert [study_id for study_id, _ in results] == [10, 20]
+    assert results[0][1] > results[1][1] > 0
+
+    # A term of every study weighs less than a term of one study
+    rare = SearchIndex([1, 2, 3], {'Title': ["alpha beta", "alpha gamma", "alpha delta"]})
+    assert rare.search("beta")[0][1] > rare.search("alpha")[0][1]
+    # Ties are ordered by ID
+    assert [study_id for study_id, _ in rare.search("alpha")] == [1, 2, 3]
+
+
+def test_all_terms_have_to_match():
+    assert [study_id for study_id, _ in index().search("jane ear")] == [30]
+    assert index().search("jane eye") == []
+    assert index().search("unknownword gestures") == []
+
+
+def test_prefix_terms_match_every_completion():
+    assert {study_id for study_id, _ in index().search("gest*")} == {10, 20}
+    assert {study_id for study_id, _ in index().search("ear*")} == {10, 20, 30}
+    # Without the star only the exact word matches
+    assert {study_id for study_id, _ in index().search("ear")} == {30}
+
+
+def test_prefix_expansion_is_capped(monkeypatch):
+    monkeypatch.setattr(search_index, "MAX_PREFIX_TERMS", 1)
+    assert index().expand("ges", True) == ["gestures"]
+
+
+def test_empty_and_star_queries_match_nothing():
+    assert index().search("") == []
+    assert index().search("   ") == []
+    assert index().search("*") == []
+    assert index().search("gestures", limit=1) == [index().search("gestures")[0]]
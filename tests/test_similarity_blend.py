@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from similarity_blend import (MATRIX_HEADER, MATRIX_MAGIC, BlendedSimilarity, LRUCache, decode_upper_triangle,
+                              encode_upper_triangle, standardize, subset_key)
+
+
+def similarity_frame(ids, values):
+    matrix = np.array(values, dtype=float)
+    np.fill_diagonal(matrix, np.nan)
+    return pd.DataFrame(matrix, index=ids, columns=[str(i) for i in ids])
+
+
+@pytest.fixture
+def blend():
+    abstract = similarity_frame([1, 2, 3], [[0, 2.0, -1.0], [2.0, 0, 0.5], [-1.0, 0.5, 0]])
+    # Study 4 has no abstract
+    database = similarity_frame([1, 2, 3, 4], [[0, -0.5, 0.2, 1.5], [-0.5, 0, -1.2, 1.0], [0.2, -1.2, 0, 0.3], [1.5, 1.0, 0.3, 0]])
+    return BlendedSimilarity({'abstract': abstract, 'database': database})
+
+
+def test_normalize_weights(blend):
+    assert blend.normalize_weights({'abstract': 2, 'database': 0}) == (('abstract', 1.0),)
+    assert blend.normalize_weights({'database': 1, 'abstract': 3}) == (('abstract', 0.75), ('database', 0.25))
+    for weights in ({'abstract': -1}, {'abstract': 0}, {'titles': 1}):
+        with pytest.raises(ValueError):
+            blend.normalize_weights(weights)
+
+
+def test_edges_of_a_single_matrix(blend):
+    result = blend.edges({'abstract': 1}, threshold=0.5)
+    assert result['ids'] == [1, 2, 3, 4]
+    assert result['edges'] == [[1, 2, 2.0], [2, 3, 0.5]]
+
+    # Restricted to the filtered studies, unknown IDs are ignored
+    assert blend.edges({'abstract': 1}, ids=[3, 2, 99], threshold=0.5) == {'ids': [2, 3], 'edges': [[2, 3, 0.5]]}
+
+
+def test_blend_is_standardized_again(blend):
+    weights = blend.normalize_weights({'abstract': 1, 'database': 1})
+    blended = blend.blended_matrix(weights)
+    expected = standardize(0.5 * blend.matrices['abstract'] + 0.5 * blend.matrices['database'])
+    assert np.allclose(blended, expected, equal_nan=True)
+    assert np.isclose(np.nanmean(blended), 0) and np.isclose(np.nanstd(blended), 1)
+
+    # Only pairs present in both matrices have a blended similarity
+    assert np.isnan(blended[blend.position[1], blend.position[4]])
+    pairs = {(s, t) for s, t, _ in blend.edges({'abstract': 1, 'database': 1}, threshold=-10)['edges']}
+    assert pairs == {(1, 2), (1, 3), (2, 3)}
+
+
+def test_edges_are_cached_per_weights_subset_and_threshold(blend):
+    first = blend.edges({'abstract': 1}, ids=[1, 2, 3])
+    assert blend.edges({'abstract': 2}, ids=[3, 2, 1]) is first
+    assert blend.edges({'abstract': 1}, ids=[1, 2, 3], threshold=1.00001) is first
+    assert blend.edges({'abstract': 1}, ids=[1, 2]) is not first
+    assert subset_key([3, 1, 1]) == subset_key([1, 3]) and subset_key(None) == "all"
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    calls = []
+
+    def compute(value):
+        return lambda: calls.append(value) or value
+
+    cache.get_or_compute('a', compute(1))
+    cache.get_or_compute('b', compute(2))
+    cache.get_or_compute('a', compute(1))
+    cache.get_or_compute('c', compute(3))
+    assert list(cache.entries) == ['a', 'c']
+    assert calls == [1, 2, 3] and (cache.hits, cache.misses) == (1, 3)
+
+
+def z_score_matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n, n))
+    matrix = (values + values.T) / 2
+    matrix[0, -1] = matrix[-1, 0] = 6.0
+    matrix[1, 2] = matrix[2, 1] = -5.9
+    matrix[3, 4] = matrix[4, 3] = np.nan
+    np.fill_diagonal(matrix, np.nan)
+    return matrix
+
+
+@pytest.mark.parametrize("bits, max_error", [(16, 1e-4), (8, 0.025)])
+def test_encoding_round_trip(bits, max_error):
+    matrix = z_score_matrix(40)
+    ids = list(range(1001, 1041))
+    payload = encode_upper_triangle(matrix, ids, bits)
+
+    magic, version, itemsize, n, scale = MATRIX_HEADER.unpack_from(payload)
+    assert (magic, version, itemsize, n) == (MATRIX_MAGIC, 1, bits // 8, 40)
+    assert np.isclose(scale, 6.0 / (2 ** (bits - 1) - 1))
+    assert len(payload) == MATRIX_HEADER.size + 4 * 40 + itemsize * 40 * 39 // 2
+
+    decoded_ids, decoded = decode_upper_triangle(payload)
+    assert decoded_ids == ids
+    assert np.array_equal(np.isnan(decoded), np.isnan(matrix))
+    assert np.nanmax(np.abs(decoded - matrix)) < max_error
+
+
+def test_encoding_errors():
+    with pytest.raises(ValueError):
+        encode_upper_triangle(z_score_matrix(5), list(range(5)), bits=12)
+    with pytest.raises(ValueError):
+        decode_upper_triangle(b"JUNK" + encode_upper_triangle(z_score_matrix(5), list(range(5)))[4:])
+    # Nothing but missing values
+    ids, decoded = decode_upper_triangle(encode_upper_triangle(np.full((3, 3), np.nan), [1, 2, 3]))
+    assert ids == [1, 2, 3] and np.isnan(decoded).all()
+
+
+def test_encoded_matrix_of_the_blend(blend):
+    payload = blend.encoded_matrix({'abstract': 1}, bits=16)
+    assert blend.encoded_matrix({'abstract': 3}, bits=16) is payload
+    ids, decoded = decode_upper_triangle(payload)
+    assert ids == [1, 2, 3, 4]
+    assert np.allclose(decoded, blend.matrices['abstract'], atol=1e-4, equal_nan=True)
+
+
+# Imports dataUtility.mjs with just enough of jQuery and d3 for its top level and prints the decoded matrix
+DECODE_SCRIPT = """
+globalThis.$ = () => ({ data: key => key === "data-values" ? { ids: [] } : "" });
+const color = { brighter: () => color, darker: () => color, hex: () => "#000000" };
+globalThis.d3 = { color: () => color };
+const { readFileSync } = await import("node:fs");
+const { pathToFileURL } = await import("node:url");
+const { decodeSimilarityMatrix } = await import(pathToFileURL(process.argv[1]).href);
+const bytes = readFileSync(process.argv[2]);
+const { ids, similarity } = decodeSimilarityMatrix(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.length));
+console.log(JSON.stringify({ ids, matrix: ids.map(a => ids.map(b => similarity(a, b))) }));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+@pytest.mark.parametrize("bits", [8, 16])
+def test_browser_decoder_matches(tmp_path, bits):
+    matrix = z_score_matrix(12)
+    ids = list(range(101, 113))
+    payload_path = tmp_path / "matrix.bin"
+    payload_path.write_bytes(encode_upper_triangle(matrix, ids, bits))
+    module = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "scripts", "dataUtility.mjs")
+    result = subprocess.run(["node", "--input-type=module", "-e", DECODE_SCRIPT, module, str(payload_path)],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    decoded = json.loads(result.stdout)
+    assert decoded['ids'] == [str(i) for i in ids]
+    browser = np.array([[np.nan if value is None else value for value in row] for row in decoded['matrix']])
+    assert np.allclose(browser, decode_upper_triangle(encode_upper_triangle(matrix, ids, bits))[1], equal_nan=True)
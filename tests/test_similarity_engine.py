@@ -0,0 +1,82 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from similarity_engine import (BYTES_PER_CELL, _store_block, block_rows, database_similarity_block, encode_database_features,
+                               encode_embeddings, load_similarity, pairwise_similarity, save_similarity_ids, upper_offset)
+from update_similarity_matrices_and_author_connections import calculate_similarity, similarity_value_sets
+
+ROWS = pd.DataFrame({
+    'Year': [0.0, 0.5, np.nan, 1.0, 0.25],
+    'Accuracy': [0.9, np.nan, 0.1, 0.4, 0.9],
+    'Sensor': ["imu, microphone", "imu", "", "camera,imu, ppg", np.nan],
+    'Location': ["in-ear", "in-ear", "behind the ear", np.nan, "in-ear"],
+})
+
+
+def test_database_kernel_matches_calculate_similarity():
+    # As in data.csv read as strings, where pandas gives NaN for N/A
+    features = encode_database_features(ROWS[['Year', 'Accuracy']].to_numpy(),
+                                        [similarity_value_sets(ROWS[col].fillna('N/A')) for col in ('Sensor', 'Location')])
+    # Small blocks, so the rows of a block do not start at 0
+    similarity = pairwise_similarity('database', features, len(ROWS), block_size=2, dtype=np.float64)
+    rows = ROWS.to_dict('records')
+    expected = [[calculate_similarity(a, b, ['Year', 'Accuracy'], ['Sensor', 'Location']) for b in rows] for a in rows]
+    assert np.array_equal(similarity, np.array(expected))
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(9, 4))
+
+
+def test_modes_agree_with_the_full_matrix(embeddings, tmp_path):
+    features = encode_embeddings(embeddings)
+    n = len(embeddings)
+    full = pairwise_similarity('cosine', features, n, block_size=4, dtype=np.float64)
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    assert np.allclose(full, unit @ unit.T)
+
+    upper = pairwise_similarity('cosine', features, n, mode="upper", block_size=4, dtype=np.float64)
+    assert np.array_equal(upper, full[np.triu_indices(n, k=1)])
+    assert upper[upper_offset(2, n)] == full[2, 3]
+
+    # Written to memory-mapped files by worker processes
+    path = str(tmp_path / "topk.npy")
+    values, indices = pairwise_similarity('cosine', features, n, path, mode="topk", top_k=3, block_size=4, max_workers=2)
+    save_similarity_ids(path, list(range(100, 100 + n)), "topk", 3)
+    for i in range(n):
+        others = np.argsort(-np.where(np.arange(n) == i, -np.inf, full[i]), kind="stable")[:3]
+        assert indices[i].tolist() == others.tolist()
+        assert np.allclose(values[i], full[i, others])
+    ids, meta, (loaded_values, loaded_indices) = load_similarity(path)
+    assert ids[0] == 100 and meta["top_k"] == 3
+    assert np.array_equal(loaded_indices, indices)
+
+
+def test_blocks_are_sized_from_the_memory_budget():
+    assert block_rows(50_000, memory_budget=256) * 50_000 * BYTES_PER_CELL <= 256 * 2**20
+    assert block_rows(10, memory_budget=1) > 10
+    assert block_rows(10**9, memory_budget=1) == 1
+
+
+@pytest.mark.parametrize("mode", ["full", "topk"])
+def test_database_block_stays_within_the_memory_budget(mode):
+    n, budget = 2000, 4
+    rng = np.random.default_rng(0)
+    numeric = rng.random((n, 2))
+    numeric[rng.random((n, 2)) < 0.1] = np.nan
+    # A value of every study makes the intersections dense
+    features = encode_database_features(numeric, [[{"yes"}] * n, [{"a", "b", "c"} if i % 2 else {"a"} for i in range(n)]])
+    rows = block_rows(n, budget)
+    outputs = (np.zeros((n, n)),) if mode == "full" else (np.zeros((n, 10)), np.zeros((n, 10), dtype=np.int32))
+
+    tracemalloc.start()
+    try:
+        _store_block(database_similarity_block(features, 0, rows), 0, rows, outputs, mode, 10, None)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= budget * 2**20
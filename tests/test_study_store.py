@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from study_store import MISSING, StudyStore, build_study_store, load_study_store
+
+CSV = """ID,Title,Year,Location,Gesture,Interaction_PANEL_Hands-Free
+1,First,2020,"In-Ear, Behind the Ear",Tap (Single),Yes (N=12)
+2,Second,,In-Ear,"Swipe, Tap (Double)",No
+3,Third,2023,,Nod,
+"""
+
+
+def write_csv(path, content=CSV):
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_columns_are_typed_and_split(tmp_path):
+    store = build_study_store(write_csv(tmp_path / "data.csv"))
+    assert store.single_columns == ['Interaction_PANEL_Hands-Free']
+    assert store.multi_columns == ['Location', 'Gesture']
+    assert np.isnan(store.numeric['Year'][1])
+    assert store.values('Gesture') == [["Tap (Single)"], ["Swipe", "Tap (Double)"], ["Nod"]]
+    assert store.values('Gesture', strip_parenthetical=True)[1] == ["Swipe", "Tap"]
+    assert store.value_sets('Location', lowercase=True) == [{"in-ear", "behind the ear"}, {"in-ear"}, set()]
+    assert store.values('Interaction_PANEL_Hands-Free')[2] == [MISSING]
+    assert store.cell('Location')[0] == "In-Ear, Behind the Ear"
+    assert store.raw_cells('Gesture') == ["Tap (Single)", "Swipe, Tap (Double)", "Nod"]
+
+
+def test_saved_store_round_trips(tmp_path):
+    data_path = write_csv(tmp_path / "data.csv")
+    store = build_study_store(data_path)
+    store_path = tmp_path / "study_store.npz"
+    store_path.write_bytes(store.to_bytes())
+    loaded = StudyStore.load(str(store_path))
+    assert loaded.records() == store.records()
+    assert loaded.source_sha256 == store.source_sha256
+    assert loaded.raw == store.raw
+
+
+def test_loading_never_writes_the_store(tmp_path):
+    data_path = write_csv(tmp_path / "data.csv")
+    store_path = tmp_path / "study_store.npz"
+    store_path.write_bytes(build_study_store(data_path).to_bytes())
+    os.utime(store_path, (1, 1))
+    assert len(load_study_store(data_path, str(store_path))) == 3
+
+    # A changed data.csv is parsed in memory, the stale file is left for the update script
+    write_csv(tmp_path / "data.csv", CSV + "4,Fourth,2024,In-Ear,Tap,Yes\n")
+    assert len(load_study_store(data_path, str(store_path))) == 4
+    assert os.stat(store_path).st_mtime == 1
+    assert len(StudyStore.load(str(store_path))) == 3
+
+    # Without any store file nothing is created either
+    assert len(load_study_store(data_path, str(tmp_path / "missing.npz"))) == 4
+    assert not (tmp_path / "missing.npz").exists()
@@ -1,46 +1,50 @@
+import argparse
+import json
 import os
 import numpy as np
 import pandas as pd
-import re
 
-from google import genai
-from google.genai import types
+from ann_index import IVFIndex, update_index
+from author_resolution import resolve_paper_authors
+from citation_metrics import compute_citation_metrics, read_adjacency
+from pipeline import Stage, run_pipeline, print_summary, write_csv_if_changed, write_if_changed
+from similarity_engine import encode_database_features, encode_embeddings, pairwise_similarity
+from study_schema import multi_value_and_string_columns, numerical_columns_log_transformed, numeric_cols
+from study_store import MISSING, build_study_store, load_study_store
 
-import time
-from sklearn.metrics.pairwise import cosine_similarity
+DATA_PATH = 'data.csv'
+STUDY_STORE_PATH = 'study_store.npz'
+EMBEDDINGS_PATH = 'abstract_similarity_datasets/data_with_embeddings.csv'
+DATABASE_SIMILARITY_PATH = 'database_similarity_datasets/normalized_database_similarity.csv'
+ABSTRACT_SIMILARITY_PATH = 'abstract_similarity_datasets/abstract_similarity.csv'
+NORMALIZED_ABSTRACT_SIMILARITY_PATH = 'abstract_similarity_datasets/normalized_abstract_similarity.csv'
+ABSTRACT_INDEX_PATH = 'abstract_similarity_datasets/abstract_ann_index.npz'
+ABSTRACT_NEIGHBOURS_PATH = 'abstract_similarity_datasets/abstract_neighbours.csv'
+AUTHOR_OVERRIDES_PATH = 'interconnections_datasets/author_overrides.csv'
+COAUTHOR_MATRIX_PATH = 'interconnections_datasets/coauthor_matrix.csv'
+CITATION_MATRIX_PATH = 'interconnections_datasets/citation_matrix.csv'
+CITATION_METRICS_PATH = 'interconnections_datasets/citation_metrics.csv'
 
 
-df = pd.read_csv('data.csv')
+def read_data():
+    return pd.read_csv(os.path.join(os.path.dirname(__file__), DATA_PATH))
 
-## DATABASE SIMILARITY RECOMPUTE
 
-# Function to transform values based on partial matches
-def transform_value(value):
-    if pd.isna(value):
-        return np.nan
-    
-    # Convert to string to ensure we can perform string operations
-    value_str = str(value).lower()
-    
-    # Check for patterns
-    if re.search(r'\byes\b', value_str):
-        return 1.0
-    elif re.search(r'\bno\b', value_str):
-        return 0.0
-    elif re.search(r'\blow\b', value_str):
-        return 0.0
-    elif re.search(r'\bmedium\b', value_str):
-        return 0.5
-    elif re.search(r'\bhigh\b', value_str):
-        return 1.0
-    elif re.search(r'\bvisual attention\b', value_str):
-        return 0.5
-    elif re.search(r'\bpartly\b', value_str):
-        return 0.5
-    elif re.search(r'\bn\/a\b', value_str) or value_str == 'n/a':
-        return np.nan
-    else:
-        return np.nan
+def read_store():
+    # Rebuilt on the fly if data.csv changed since the study_store stage last ran
+    return load_study_store(os.path.join(os.path.dirname(__file__), DATA_PATH),
+                            os.path.join(os.path.dirname(__file__), STUDY_STORE_PATH))
+
+
+## STUDY STORE
+
+def study_store_stage():
+    # Parsed once here, every other stage and the app read the typed columns from the store
+    store = build_study_store(os.path.join(os.path.dirname(__file__), DATA_PATH))
+    return write_if_changed(STUDY_STORE_PATH, store.to_bytes())
+
+
+## DATABASE SIMILARITY RECOMPUTE
 
 # Create a function to calculate similarity between two studies
 def calculate_similarity(row1, row2, numeric_columns, string_columns):
@@ -107,125 +111,55 @@ def calculate_similarity(row1, row2, numeric_columns, string_columns):
         return similarity / total_features
     else:
         return 0
-        
-
-# Assign column types for calculation
-single_value_columns = [
-    'Sensing_PANEL_No Additional Sensing', 'Interaction_PANEL_Hands-Free', 'Interaction_PANEL_Eyes-Free', 
-    'Interaction_PANEL_Adaptation of the Interaction Detection Algorithm to User',
-    'Interaction_PANEL_Discreetness of Interaction Techniques', 
-    'Interaction_PANEL_Social Acceptability of Interaction Techniques',
-    'Interaction_PANEL_Accuracy of Interaction Recognition',
-    'Interaction_PANEL_Robustness of Interaction Detection',
-    'Study_PANEL_Elicitation Study',
-    'Study_PANEL_Usability Evaluations',
-    'Study_PANEL_Cognitive Ease Evaluations',
-    'Study_PANEL_Discreetness of Interactions Evaluations',
-    'Study_PANEL_Social Acceptability of Interactions Evaluations',
-    'Study_PANEL_Accuracy of Interactions Evaluations',
-    'Study_PANEL_Alternative Interaction Validity Evaluations',
-    'Device_PANEL_Real-Time Processing', 'Device_PANEL_On-Device Processing'
-]
 
-multi_value_and_string_columns = [
-    'Location', 'Input Body Part', 'Gesture', 'Sensing_PANEL_Sensors', 'Interaction_PANEL_Resolution', 
-    'Study_PANEL_Evaluation of Different Conditions (User-Related)',
-    'Study_PANEL_Evaluation of Different Conditions (Environment-Related)',
-    'Study_PANEL_Evaluation of Different Settings',
-    'Device_PANEL_Earphone Type', 'Device_PANEL_Development Stage',
-    'Motivations_PANEL_Motivations',
-    'Applications_PANEL_Intended Applications', 'Keywords'
-]
 
-numerical_columns_log_transformed = [
-    'Interaction_PANEL_Number of Selected Gestures'
-]
+def similarity_value_sets(cells):
+    # Tokenized as calculate_similarity does: lowercased and split at every comma without stripping, so
+    # "Hand, Head" gives {"hand", " head"} and the published matrix stays unchanged. Missing cells give no values
+    return [set() if cell in ('', MISSING) else set(cell.lower().split(',')) for cell in cells]
 
-single_value_columns_special_treatment = ['Interaction_PANEL_Possible on One Ear']
-
-# Recode values for later calculations
-df_transformed = df.copy()
-df_transformed = df_transformed.drop(columns=['Main Author', 'Study Link', 'Abstract'])
-
-# Apply the transformation to each column in single_value_columns
-for col in single_value_columns:
-    if col in df_transformed.columns:
-        df_transformed[col] = df_transformed[col].apply(transform_value)
-        
-# Apply min-max scaling using pandas
-for col in numerical_columns_log_transformed:
-    if col in df_transformed.columns:
-        # Apply natural log transformation
-        df_transformed[col] = np.log(df_transformed[col]+1) # Adding 1 to avoid log(0)
-        df_transformed[col] = (df_transformed[col] - df_transformed[col].min()) / (df_transformed[col].max() - df_transformed[col].min())
-        
-# Transform the special treatment column
-for col in single_value_columns_special_treatment:
-    if col in df_transformed.columns:
-        # Define a mapping dictionary for exact matching
-        special_mapping = {
-            'Yes': 1.0,
-            'Yes (Performance Loss)': 0.5,
-            'No': 0.0,
-            'N/A': np.nan
-        }
-        
-        # Apply the mapping directly
-        df_transformed[col] = df_transformed[col].map(special_mapping)
-# Get all numeric columns (excluding those in multi_value_and_string_columns)
-# numeric_cols = ['Year', 'Interaction_PANEL_Number of Selected Gestures']
-numeric_cols = ['Interaction_PANEL_Number of Selected Gestures']
-
-
-# Create empty similarity matrix
-study_ids = df_transformed['ID'].tolist()
-n_studies = len(study_ids)
-similarity_matrix = pd.DataFrame(np.zeros((n_studies, n_studies)), 
-                              index=study_ids, 
-                              columns=study_ids)
-
-# Calculate pairwise similarities
-for i, id1 in enumerate(study_ids):
-    row1 = df_transformed.loc[df_transformed['ID'] == id1].iloc[0]
-    
-    # For diagonal elements (self-similarity)
-    similarity_matrix.loc[id1, id1] = 1.0
-    
-    # For upper triangular matrix
-    for j in range(i+1, n_studies):
-        id2 = study_ids[j]
-        row2 = df_transformed.loc[df_transformed['ID'] == id2].iloc[0]
-        
-        # Calculate similarity
-        sim = calculate_similarity(row1, row2, numeric_cols, multi_value_and_string_columns)
-        
-        # Fill both upper and lower triangular parts
-        similarity_matrix.loc[id1, id2] = sim
-        similarity_matrix.loc[id2, id1] = sim  # Symmetric matrix
-
-# Calculate the mean and standard deviation of similarity values, excluding the diagonal
-similarity_values = []
-n = similarity_matrix.shape[0]
-for i in range(n):
-    for j in range(n):
-        if i != j:  # Skip diagonal elements
-            similarity_values.append(similarity_matrix.iloc[i, j])
-            
-mean_similarity = np.mean(similarity_values)
-std_similarity = np.std(similarity_values)
 
-# Create a new matrix with values in standard deviation units
-similarity_matrix_std = similarity_matrix.copy()
-for i in range(n):
-    for j in range(n):
-        if i != j:  # Skip diagonal elements
-            similarity_matrix_std.iloc[i, j] = (similarity_matrix.iloc[i, j] - mean_similarity) / std_similarity
-        else:
-            # Set diagonal elements to NaN to exclude them from the visualization
-            similarity_matrix_std.iloc[i, j] = np.nan
+def database_similarity_features(store):
+    # Numeric columns are log-transformed and min-max scaled, string/multi-value columns are compared
+    # as sets of their raw values (see similarity_value_sets)
+    numeric = []
+    for col in numeric_cols:
+        values = store.numeric[col]
+        if col in numerical_columns_log_transformed:
+            values = np.log(values + 1) # Adding 1 to avoid log(0)
+            values = (values - np.nanmin(values)) / (np.nanmax(values) - np.nanmin(values))
+        numeric.append(values)
+    numeric = np.column_stack(numeric) if numeric else np.zeros((len(store), 0))
+
+    value_sets = [similarity_value_sets(store.raw_cells(col)) for col in multi_value_and_string_columns]
+    return encode_database_features(numeric, value_sets)
+
+
+def compute_database_similarity(store):
+    # Vectorized in row blocks, gives the values of calculate_similarity for every pair of value sets
+    study_ids = store.ids.tolist()
+    similarity = pairwise_similarity('database', database_similarity_features(store), len(study_ids), diagonal=1.0, dtype=np.float64)
+    return pd.DataFrame(similarity, index=study_ids, columns=study_ids)
+
+
+def standardize_off_diagonal(similarity_matrix):
+    # Calculate the mean and standard deviation of similarity values, excluding the diagonal
+    off_diagonal = ~np.eye(similarity_matrix.shape[0], dtype=bool)
+    mean_similarity = np.mean(similarity_matrix.values[off_diagonal])
+    std_similarity = np.std(similarity_matrix.values[off_diagonal])
+
+    # Create a new matrix with values in standard deviation units,
+    # diagonal elements are NaN to exclude them from the visualization
+    similarity_matrix_std = (similarity_matrix - mean_similarity) / std_similarity
+    np.fill_diagonal(similarity_matrix_std.values, np.nan)
+    return similarity_matrix_std
 
-# Save the std similarity matrix to a CSV file
-similarity_matrix_std.to_csv('database_similarity_datasets/normalized_database_similarity.csv')
+
+def database_similarity_stage():
+    similarity_matrix_std = standardize_off_diagonal(compute_database_similarity(read_store()))
+
+    # Save the std similarity matrix to a CSV file
+    return write_csv_if_changed(similarity_matrix_std, DATABASE_SIMILARITY_PATH)
 
 
 ## ABSTRACT SIMILARITY RECOMPUTE
@@ -247,12 +181,10 @@ def standard_normalize(df):
     result.values[mask] = (df.values[mask] - mean_val) / std_val
     
     return result
-    
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client = genai.Client(api_key=GEMINI_API_KEY)
 
-def get_gemini_embeddings(abstract):
+def get_gemini_embeddings(abstract, client):
+    from google.genai import types
 
     result = client.models.embed_content(
             model="gemini-embedding-exp-03-07",
@@ -263,82 +195,190 @@ def get_gemini_embeddings(abstract):
 
     return result.embeddings[0].values
 
-abstract_embeddings_df = pd.read_csv('abstract_similarity_datasets/data_with_embeddings.csv')
-ids_with_embeddings = abstract_embeddings_df['ID'].to_numpy(dtype=int)
-dataset_ids = df['ID'].to_numpy(dtype=int)
-missing_ids = ids_with_embeddings[~np.isin(ids_with_embeddings, dataset_ids)]
 
-new_rows = []
+def read_embeddings():
+    # Embeddings are stored as JSON lists, one row per study
+    path = os.path.join(os.path.dirname(__file__), EMBEDDINGS_PATH)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['ID', 'Abstract', 'Gemini-Embedding'])
+    abstract_embeddings_df = pd.read_csv(path, usecols=['ID', 'Abstract', 'Gemini-Embedding'])
+    abstract_embeddings_df['Gemini-Embedding'] = abstract_embeddings_df['Gemini-Embedding'].apply(json.loads)
+    return abstract_embeddings_df
 
-for missing_id in missing_ids:
-    match = df.loc[df['ID'] == missing_id]
-    if not match.empty:
-        abstract = match['Abstract'].values[0]
-        embedding = get_gemini_embeddings(abstract)
 
-        new_rows.append({
-            'ID': missing_id,
-            'Abstract': abstract,
-            'Gemini-Embedding': embedding
-        })
+def embeddings_stage(embed=None):
+    df = read_store().frame(['ID', 'Abstract'])
+    abstract_embeddings_df = read_embeddings()
 
-# Create new DataFrame with the same column structure
-new_abstract_embeddings = pd.DataFrame(new_rows, columns=['ID', 'Abstract', 'Gemini-Embedding'])
+    # Only studies without an embedding (new or with a changed abstract) are sent to the API
+    known = dict(zip(abstract_embeddings_df['ID'].astype(int), abstract_embeddings_df['Abstract']))
+    missing = df[[known.get(int(study_id)) != abstract for study_id, abstract in zip(df['ID'], df['Abstract'])]]
 
-# Append to the existing embeddings DataFrame
-abstract_embeddings_df = pd.concat([abstract_embeddings_df, new_abstract_embeddings], ignore_index=True)
-abstract_embeddings_df.to_csv('abstract_similarity_datasets/data_with_embeddings.csv')
+    if embed is None and not missing.empty:
+        from google import genai
+        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        embed = lambda abstract: get_gemini_embeddings(abstract, client)
 
-# Calculate cosine sims again
-# 1. Extract embeddings as a list of vectors
-embeddings = np.array(abstract_embeddings_df['Gemini-Embedding'].tolist())
+    new_rows = [{'ID': int(study_id), 'Abstract': abstract, 'Gemini-Embedding': list(embed(abstract))}
+                for study_id, abstract in zip(missing['ID'], missing['Abstract'])]
 
-# 2. Calculate pairwise cosine similarities
-similarity_matrix = cosine_similarity(embeddings)
+    # Replace outdated rows, drop studies that were removed from data.csv and keep the order of data.csv
+    abstract_embeddings_df = pd.concat([abstract_embeddings_df[~abstract_embeddings_df['ID'].isin(missing['ID'])],
+                                        pd.DataFrame(new_rows, columns=['ID', 'Abstract', 'Gemini-Embedding'])], ignore_index=True)
+    abstract_embeddings_df = abstract_embeddings_df.set_index('ID').reindex(df['ID'].astype(int)).reset_index()
 
-# 3. Create a DataFrame to store the similarities with paper IDs as indices
-paper_ids = abstract_embeddings_df['ID'].tolist()
-similarity_df = pd.DataFrame(similarity_matrix, index=paper_ids, columns=paper_ids)
-np.fill_diagonal(similarity_df.values, np.nan)
-similarity_df.to_csv('abstract_similarity_datasets/abstract_similarity.csv')
+    abstract_embeddings_df['Gemini-Embedding'] = abstract_embeddings_df['Gemini-Embedding'].apply(json.dumps)
+    return write_csv_if_changed(abstract_embeddings_df, EMBEDDINGS_PATH, index=False)
 
-# Apply standard normalization
-normalized_similarity_df = standard_normalize(similarity_df)
-normalized_similarity_df.to_csv('abstract_similarity_datasets/normalized_abstract_similarity.csv')
 
+def abstract_similarity_stage():
+    abstract_embeddings_df = read_embeddings()
 
-## Author Connection Update
-df_id_authors = df[['ID', 'Authors']].copy()
-
-# Build exact co-author matrix from comma-separated author strings
-coauthor_matrix = pd.DataFrame(0, index=np.arange(1, len(df_id_authors)+1), columns=np.arange(1, len(df_id_authors)+1))
-ids = df_id_authors['ID'].to_numpy(dtype=int)
-
-def normalize_name(name: str) -> str:
-    # lowercase + collapse internal whitespace
-    return ' '.join(name.strip().lower().split())
-
-def to_author_set(value) -> set:
-    # Accept list or single comma-separated string
-    if isinstance(value, list):
-        names = value
-    elif isinstance(value, str):
-        # split on commas that separate authors
-        names = [n for n in (x.strip() for x in value.split(',')) if n]
+    # Calculate cosine sims again
+    # 1. Extract embeddings as a list of vectors
+    embeddings = np.array(abstract_embeddings_df['Gemini-Embedding'].tolist())
+
+    # 2. Calculate pairwise cosine similarities
+    similarity_matrix = pairwise_similarity('cosine', encode_embeddings(embeddings), len(embeddings), dtype=np.float64)
+
+    # 3. Create a DataFrame to store the similarities with paper IDs as indices
+    paper_ids = abstract_embeddings_df['ID'].tolist()
+    similarity_df = pd.DataFrame(similarity_matrix, index=paper_ids, columns=paper_ids)
+    np.fill_diagonal(similarity_df.values, np.nan)
+    written = write_csv_if_changed(similarity_df, ABSTRACT_SIMILARITY_PATH)
+
+    # Apply standard normalization
+    normalized_similarity_df = standard_normalize(similarity_df)
+    return write_csv_if_changed(normalized_similarity_df, NORMALIZED_ABSTRACT_SIMILARITY_PATH) or written
+
+
+# Number of most similar studies listed per study in abstract_neighbours.csv
+NEIGHBOURS_PER_STUDY = 10
+
+
+def abstract_index_stage():
+    abstract_embeddings_df = read_embeddings()
+    ids = abstract_embeddings_df['ID'].astype(int).tolist()
+    index_path = os.path.join(os.path.dirname(__file__), ABSTRACT_INDEX_PATH)
+
+    # The index is updated in place, only new or changed embeddings are inserted
+    if os.path.exists(index_path):
+        index = IVFIndex.load(index_path)
     else:
-        names = []
-    return {normalize_name(n) for n in names}
-
-# Map ID -> normalized author set (robust to missing rows)
-id_to_authors = {int(row['ID']): to_author_set(row['Authors']) for _, row in df_id_authors.iterrows()}
-
-# Only connect papers sharing at least one EXACT author name (distance == 0)
-for id_i in ids:
-    authors_i = id_to_authors.get(id_i, set())
-    for id_j in range(id_i + 1, len(ids) + 1):
-        authors_j = id_to_authors.get(id_j, set())
-        if authors_i and authors_j and authors_i.intersection(authors_j):
-            coauthor_matrix.loc[id_i, id_j] = 1
-            coauthor_matrix.loc[id_j, id_i] = 1  # symmetric
-
-coauthor_matrix.to_csv('interconnections_datasets/coauthor_matrix.csv')
\ No newline at end of file
+        index = IVFIndex(len(abstract_embeddings_df['Gemini-Embedding'].iloc[0]) if ids else 1)
+    inserted, removed = update_index(index, ids, abstract_embeddings_df['Gemini-Embedding'].tolist())
+    print(f"Abstract index: {inserted} studies inserted, {removed} removed, {len(index)} indexed")
+
+    # np.savez output is not byte-stable, so the index is only rewritten if it changed
+    written = False
+    if inserted or removed or not os.path.exists(index_path):
+        index.save(index_path)
+        written = True
+
+    neighbours = [{'ID': study_id, 'Rank': rank, 'Neighbour ID': neighbour_id, 'Similarity': similarity}
+                  for study_id in ids
+                  for rank, (neighbour_id, similarity) in enumerate(index.query_id(study_id, NEIGHBOURS_PER_STUDY), start=1)]
+    neighbours_df = pd.DataFrame(neighbours, columns=['ID', 'Rank', 'Neighbour ID', 'Similarity'])
+    return write_csv_if_changed(neighbours_df, ABSTRACT_NEIGHBOURS_PATH, index=False) or written
+
+
+## Author Connection Update
+
+def coauthor_pairs(df_id_authors):
+    """Return the (ID, ID) pairs of papers sharing at least one canonical author, in both orders."""
+    # Canonical author IDs, so spelling variants like "J. Hummel" and "Jonas Hummel" count as the same
+    # person (manual merges go into interconnections_datasets/author_overrides.csv)
+    id_to_authors, _ = resolve_paper_authors(df_id_authors)
+
+    # Invert the mapping so only papers that actually share an author are compared
+    author_to_papers = {}
+    for paper_id, author_ids in id_to_authors.items():
+        for author_id in author_ids:
+            author_to_papers.setdefault(author_id, set()).add(paper_id)
+
+    pairs = set()
+    for paper_ids in author_to_papers.values():
+        pairs.update((id_i, id_j) for id_i in paper_ids for id_j in paper_ids if id_i != id_j)
+    return sorted(pairs)
+
+
+def coauthor_stage():
+    df_id_authors = read_store().frame(['ID', 'Authors'])
+
+    # Connect papers sharing at least one canonical author, symmetric since both orders are in the pairs
+    paper_ids = pd.Index(np.arange(1, len(df_id_authors)+1))
+    pairs = np.asarray(coauthor_pairs(df_id_authors), dtype=np.int64).reshape(-1, 2)
+    rows = paper_ids.get_indexer(pairs[:, 0])
+    columns = paper_ids.get_indexer(pairs[:, 1])
+    known = (rows >= 0) & (columns >= 0)
+    matrix = np.zeros((len(paper_ids), len(paper_ids)), dtype=np.int64)
+    matrix[rows[known], columns[known]] = 1
+    coauthor_matrix = pd.DataFrame(matrix, index=paper_ids, columns=paper_ids)
+
+    return write_csv_if_changed(coauthor_matrix, COAUTHOR_MATRIX_PATH)
+
+
+def citation_metrics_stage():
+    studies = read_store().frame(['ID', 'Year'])
+    ids = studies['ID'].astype(int).tolist()
+    years = pd.to_numeric(studies['Year'], errors='coerce').tolist()
+    base_dir = os.path.dirname(__file__)
+
+    # Degrees, PageRank, transitive reach and coauthor components, so the timeline does not scan the dense matrices
+    metrics = compute_citation_metrics(read_adjacency(os.path.join(base_dir, CITATION_MATRIX_PATH), ids),
+                                       read_adjacency(os.path.join(base_dir, COAUTHOR_MATRIX_PATH), ids), ids, years)
+    for _, row in metrics[metrics['Cites Later Studies'] != ""].iterrows():
+        print(f"Paper {row['ID']} cites {row['Cites Later Studies']} from a later year, check the citation matrix")
+    return write_csv_if_changed(metrics, CITATION_METRICS_PATH, index=False)
+
+# Database columns read by the similarity, only changes to these rebuild the database similarity
+DATABASE_SIMILARITY_COLUMNS = ['ID'] + numeric_cols + multi_value_and_string_columns
+
+# Stages reading the study store are still fingerprinted on the data.csv columns they use, so e.g. editing
+# an abstract rebuilds the store but not the database similarity
+STAGES = [
+    Stage('study_store', study_store_stage,
+          inputs={DATA_PATH: None},
+          outputs=[STUDY_STORE_PATH],
+          description="typed columnar copy of data.csv read by the other stages and the app"),
+    Stage('database_similarity', database_similarity_stage,
+          inputs={DATA_PATH: DATABASE_SIMILARITY_COLUMNS},
+          outputs=[DATABASE_SIMILARITY_PATH],
+          depends_on=['study_store'],
+          description="feature-based similarity between the studies in data.csv"),
+    Stage('embeddings', embeddings_stage,
+          inputs={DATA_PATH: ['ID', 'Abstract']},
+          outputs=[EMBEDDINGS_PATH],
+          depends_on=['study_store'],
+          description="Gemini embeddings of new or changed abstracts"),
+    Stage('abstract_similarity', abstract_similarity_stage,
+          inputs={EMBEDDINGS_PATH: None},
+          outputs=[ABSTRACT_SIMILARITY_PATH, NORMALIZED_ABSTRACT_SIMILARITY_PATH],
+          depends_on=['embeddings'],
+          description="cosine similarity of the abstract embeddings"),
+    Stage('abstract_index', abstract_index_stage,
+          inputs={EMBEDDINGS_PATH: None},
+          outputs=[ABSTRACT_INDEX_PATH, ABSTRACT_NEIGHBOURS_PATH],
+          depends_on=['embeddings'],
+          description="nearest-neighbour index of the abstract embeddings and the top neighbours per study"),
+    Stage('coauthor_graph', coauthor_stage,
+          inputs={DATA_PATH: ['ID', 'Authors'], AUTHOR_OVERRIDES_PATH: None},
+          outputs=[COAUTHOR_MATRIX_PATH],
+          depends_on=['study_store'],
+          description="papers sharing at least one author"),
+    Stage('citation_metrics', citation_metrics_stage,
+          inputs={DATA_PATH: ['ID', 'Year'], CITATION_MATRIX_PATH: None, COAUTHOR_MATRIX_PATH: None},
+          outputs=[CITATION_METRICS_PATH],
+          depends_on=['coauthor_graph'],
+          description="per-study citation and coauthor graph metrics for the timeline"),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the similarity matrices and author connections that are out of date.")
+    parser.add_argument("--stage", action="append", choices=[stage.name for stage in STAGES],
+                        help="only run this stage (and the stages it depends on), can be given multiple times")
+    parser.add_argument("--force", action="store_true", help="rebuild the selected stages even if they are up to date")
+    args = parser.parse_args()
+
+    print_summary(run_pipeline(STAGES, selected=args.stage, force=args.force))